@@ -1,18 +1,30 @@
+import json
 import logging
 import os
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 import torch
 from core.schemas.object_detection import (
+    BinaryInputSchema,
     Device,
+    InputSampleMetadataSchema,
     InputSampleSchema,
     InputSchema,
     OutputSchema,
 )
 from core.serialization.array import array_to_string
-from core.serialization.image import image_from_string
+from core.serialization.detections import (
+    BINARY_CONTENT_TYPE,
+    BINARY_PROTOCOL_VERSION,
+    DETECTIONS_DTYPE,
+    JSON_PROTOCOL_VERSION,
+    decode_samples,
+    encode_detections,
+    is_binary_message,
+)
+from core.serialization.image import image_from_binary, image_from_string
 from imutils import resize
 from ts.context import Context
 from ts.torch_handler.base_handler import BaseHandler
@@ -65,10 +77,6 @@ class ObjectDetectionModelHandler(BaseHandler):
     def _fill_confidence_threshold(self, confidence_threshold: Optional[float]):
         self.confidence_threshold = confidence_threshold
 
-    def _fill_image_width(self, overridden_image_width: Optional[int]):
-        if overridden_image_width is not None:
-            self.image_width = overridden_image_width
-
     def initialize(self, context: Context):
         """
         Initialize model. This will be called during model loading time
@@ -93,25 +101,63 @@ class ObjectDetectionModelHandler(BaseHandler):
 
         self.initialized = True
 
-    def preprocess(self, data: List[Dict[str, str]]) -> List[np.ndarray]:
-        validated_data = InputSchema(
-            samples=[InputSampleSchema.parse_obj(sample) for sample in data]
-        )
+    def _fill_sample_parameters(self, samples: List[InputSampleMetadataSchema]):
+        if len(samples) == 0:
+            return
 
-        if len(validated_data.samples) == 0:
-            return []
-
-        first_sample = validated_data.samples[0]
+        first_sample = samples[0]
 
         self._fill_labels_to_predict(first_sample.labels_to_predict)
         self._fill_confidence_threshold(first_sample.confidence_threshold)
-        self._fill_image_width(first_sample.overridden_image_width)
 
+    def _preprocess_samples(
+        self, samples: List[InputSampleMetadataSchema], images: List[np.ndarray]
+    ) -> List[np.ndarray]:
+        if len(samples) == 0:
+            return []
+
+        # the width overridden by a request only applies to its own images, the
+        # configured one being advertised to the clients
+        image_width = samples[0].overridden_image_width or self.image_width
+
+        # the portrait images are narrowed so that their height does not exceed the
+        # inference width either
         return [
-            resize(image_from_string(sample.data), width=self.image_width)
-            for sample in validated_data.samples
+            resize(
+                image,
+                width=min(
+                    image_width,
+                    max(round(image_width * image.shape[1] / image.shape[0]), 1),
+                ),
+            )
+            for image in images
         ]
 
+    def preprocess(
+        self, data: List[Dict[str, str]]
+    ) -> Tuple[List[InputSampleMetadataSchema], List[np.ndarray]]:
+        validated_data = InputSchema(
+            samples=[InputSampleSchema.parse_obj(sample) for sample in data]
+        )
+
+        return validated_data.samples, self._preprocess_samples(
+            validated_data.samples,
+            [image_from_string(sample.data) for sample in validated_data.samples],
+        )
+
+    def preprocess_binary(
+        self, data: bytes
+    ) -> Tuple[List[InputSampleMetadataSchema], List[np.ndarray]]:
+        binary_images, samples = decode_samples(data)
+        validated_data = BinaryInputSchema(
+            samples=[InputSampleMetadataSchema.parse_obj(sample) for sample in samples]
+        )
+
+        return validated_data.samples, self._preprocess_samples(
+            validated_data.samples,
+            [image_from_binary(binary_image) for binary_image in binary_images],
+        )
+
     def inference(self, data: List[np.ndarray], *args, **kwargs) -> List[pd.DataFrame]:
         with torch.no_grad():
             self.model.eval()
@@ -142,30 +188,90 @@ class ObjectDetectionModelHandler(BaseHandler):
 
         return filtered_predictions
 
-    def postprocess(self, data: List[pd.DataFrame]) -> List[Dict[str, str]]:
+    def postprocess(self, data: List[pd.DataFrame]) -> List[Dict[str, Any]]:
         filtered_predictions = self._filter_predictions(data)
 
+        # the supported protocols and the inference width are advertised to the
+        # clients using the JSON one
         return [
-            OutputSchema(results=array_to_string(prediction.values)).dict()
+            OutputSchema(
+                results=array_to_string(prediction.values),
+                protocol_versions=[JSON_PROTOCOL_VERSION, BINARY_PROTOCOL_VERSION],
+                image_width=self.image_width,
+            ).dict()
             for prediction in filtered_predictions
         ]
 
+    def postprocess_binary(self, data: List[pd.DataFrame]) -> bytes:
+        filtered_predictions = self._filter_predictions(data)
+        detections, class_names = [], {}
+
+        for prediction in filtered_predictions:
+            # the columns of the predictions are the box corners, the confidence, the
+            # class id and the class name
+            sample_detections = np.empty(len(prediction), dtype=DETECTIONS_DTYPE)
+            for column_index, field_name in enumerate(DETECTIONS_DTYPE.names):
+                sample_detections[field_name] = prediction.iloc[:, column_index]
+
+            detections.append(sample_detections)
+            class_names.update(
+                zip(prediction.iloc[:, 5].astype(int), prediction.iloc[:, 6])
+            )
+
+        return encode_detections(detections, class_names, image_width=self.image_width)
+
+    def _preprocess_request(
+        self, request: Dict[str, Any]
+    ) -> Tuple[List[InputSampleMetadataSchema], List[np.ndarray], bool]:
+        body = request.get("data") or request.get("body")
+
+        if is_binary_message(body):
+            return (*self.preprocess_binary(body), True)
+
+        if isinstance(body, (bytes, bytearray)):
+            body = json.loads(body)
+
+        return (*self.preprocess(body["instances"]), False)
+
     def handle(
-        self, data: List[Dict[str, str]], context: Context
-    ) -> List[Dict[str, str]]:
+        self, data: List[Dict[str, Any]], context: Context
+    ) -> List[Union[Dict[str, Any], bytes]]:
         """
         Invoke by TorchServe for prediction request.
         Do pre-processing of data, prediction using model and postprocessing of
         prediction output.
 
-        :param data: Input data for prediction
+        Each request is either a JSON one, whose body holds the instances, or a binary
+        one as encoded by core.serialization.detections, which is answered in kind.
+        The images of all the requests batched by TorchServe are predicted at once.
+
+        :param data: Input data for prediction, one item per request
         :param context: Initial context contains model server system properties.
-        :return: prediction output
+        :return: prediction output, one item per request
         """
-        if len(data) == 0:
-            return []
+        preprocessed_requests = [self._preprocess_request(request) for request in data]
+
+        model_input = [
+            image for _, images, _ in preprocessed_requests for image in images
+        ]
+        model_output = self.inference(model_input) if model_input else []
+
+        responses = []
+        output_index = 0
+
+        for request_index, (samples, images, is_binary) in enumerate(
+            preprocessed_requests
+        ):
+            request_output = model_output[output_index : output_index + len(images)]
+            output_index += len(images)
+
+            # the predictions are filtered with the parameters of their own request
+            self._fill_sample_parameters(samples)
 
-        model_input = self.preprocess(data)
-        model_output = self.inference(model_input)
+            if is_binary:
+                context.set_response_content_type(request_index, BINARY_CONTENT_TYPE)
+                responses.append(self.postprocess_binary(request_output))
+            else:
+                responses.append({"predictions": self.postprocess(request_output)})
 
-        return self.postprocess(model_output)
+        return responses
@@ -0,0 +1,178 @@
+import importlib
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.schemas.object_detection import Device
+from core.serialization.array import array_from_string
+from core.serialization.detections import (
+    BINARY_CONTENT_TYPE,
+    decode_detections,
+    encode_samples,
+)
+from core.serialization.image import image_to_binary, image_to_string
+
+pytest.importorskip("torch")
+pytest.importorskip("ts")
+
+PROJECT_DIRECTORY = os.path.dirname(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+
+
+class StubModel:
+    """Predict a person and a dog on each image, the width of the image as xmax"""
+
+    def __init__(self):
+        self.calls: List[List[np.ndarray]] = []
+
+    def eval(self):
+        pass
+
+    def __call__(self, images: List[np.ndarray]) -> List[pd.DataFrame]:
+        self.calls.append(images)
+
+        return [
+            pd.DataFrame(
+                [
+                    [0.0, 0.0, float(image.shape[1]), 1.0, 0.9, 0, "person"],
+                    [0.0, 0.0, float(image.shape[1]), 1.0, 0.3, 16, "dog"],
+                ],
+                columns=["xmin", "ymin", "xmax", "ymax", "confidence", "class", "name"],
+            )
+            for image in images
+        ]
+
+
+class FakeContext:
+    def __init__(self):
+        self.content_types: Dict[int, str] = {}
+
+    def set_response_content_type(self, request_index: int, content_type: str):
+        self.content_types[request_index] = content_type
+
+
+@pytest.fixture(name="handler")
+def fixture_handler(monkeypatch):
+    # the handler is packaged by torchserve along with its config and model modules
+    monkeypatch.chdir(PROJECT_DIRECTORY)
+    monkeypatch.setenv("MODEL_NAME", "object-detection")
+    monkeypatch.syspath_prepend(os.path.join(PROJECT_DIRECTORY, "object_detection"))
+    monkeypatch.syspath_prepend(
+        os.path.join(PROJECT_DIRECTORY, "object_detection", "modules")
+    )
+    model_handler = importlib.import_module("model_handler")
+
+    handler = model_handler.ObjectDetectionModelHandler(
+        device=Device.CPU, image_width=32
+    )
+    handler.model = StubModel()
+
+    return handler
+
+
+def make_image(width: int) -> np.ndarray:
+    return np.zeros((width // 2, width, 3), dtype=np.uint8)
+
+
+def test_handle_requests_batch(handler):
+    json_instances = [
+        {
+            "data": image_to_string(make_image(64), ".png"),
+            "labels_to_predict": ["person"],
+        }
+    ]
+    binary_body = encode_samples(
+        [image_to_binary(make_image(64), ".png")] * 2,
+        [{"confidence_threshold": 0.2}] * 2,
+    )
+    context = FakeContext()
+
+    responses = handler.handle(
+        [
+            {"body": {"instances": json_instances}},
+            {"data": json.dumps({"instances": json_instances * 3}).encode()},
+            {"body": binary_body},
+            {"body": {"instances": []}},
+        ],
+        context,
+    )
+
+    # the six images of the batch are predicted at once, at the inference width
+    assert len(handler.model.calls) == 1
+    assert [image.shape[1] for image in handler.model.calls[0]] == [32] * 6
+
+    assert len(responses) == 4
+    assert [len(response["predictions"]) for response in responses[:2]] == [1, 3]
+    for prediction in responses[0]["predictions"] + responses[1]["predictions"]:
+        results = array_from_string(prediction["results"])
+        assert results[:, 6].tolist() == ["person"]
+        assert prediction["image_width"] == 32
+
+    # the binary request is answered in kind, filtered by its own parameters
+    assert context.content_types == {2: BINARY_CONTENT_TYPE}
+    detections, class_names = decode_detections(responses[2])
+    assert len(detections) == 2
+    for sample_detections in detections:
+        np.testing.assert_allclose(sample_detections["score"], [0.9, 0.3])
+        np.testing.assert_allclose(sample_detections["x_max"], [32, 32])
+    assert class_names == {0: "person", 16: "dog"}
+
+    assert responses[3] == {"predictions": []}
+
+
+def test_handle_empty_requests(handler):
+    assert handler.handle([{"body": {"instances": []}}], FakeContext()) == [
+        {"predictions": []}
+    ]
+    assert not handler.model.calls
+
+
+def test_handle_overridden_image_width(handler):
+    overridden_instances = [
+        {"data": image_to_string(make_image(64), ".png"), "overridden_image_width": 16}
+    ]
+    instances = [{"data": image_to_string(make_image(64), ".png")}]
+
+    responses = handler.handle(
+        [
+            {"body": {"instances": overridden_instances}},
+            {"body": {"instances": instances}},
+        ],
+        FakeContext(),
+    )
+
+    # the overridden width only applies to the images of its request
+    assert [image.shape[1] for image in handler.model.calls[0]] == [16, 32]
+    assert handler.image_width == 32
+    for response in responses:
+        assert response["predictions"][0]["image_width"] == 32
+
+
+def test_handle_portrait_images(handler):
+    portrait_image = np.zeros((64, 16, 3), dtype=np.uint8)
+    instances = [
+        {"data": image_to_string(portrait_image, ".png")},
+        {"data": image_to_string(make_image(64), ".png")},
+    ]
+    overridden_instances = [
+        {"data": image_to_string(portrait_image, ".png"), "overridden_image_width": 16}
+    ]
+
+    handler.handle(
+        [
+            {"body": {"instances": instances}},
+            {"body": {"instances": overridden_instances}},
+        ],
+        FakeContext(),
+    )
+
+    # the height of the portrait images is bounded by the inference width as well
+    assert [image.shape[:2] for image in handler.model.calls[0]] == [
+        (32, 8),
+        (16, 32),
+        (16, 4),
+    ]
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Optional
 
 from core.client.model_instantiator import ModelInstantiatorClient
 from core.client.object_detection import ObjectDetectionClient
@@ -6,6 +7,9 @@ from core.google.cloud_run_job_manager import CloudRunJobManager
 from core.google.firestore_client import FirestoreClient
 from core.google.storage_client import StorageClient
 from core.google.vertex_ai_manager import VertexAIManager
+from core.services.batch_size_controller import BatchSizeController
+from core.services.detection_cache import DetectionCache
+from core.services.frame_cache import FRAME_CACHE_DIRECTORY, FrameCache
 from fastapi import Depends
 from omegaconf import DictConfig
 
@@ -51,7 +55,28 @@ def use_cloud_run_job_manager() -> CloudRunJobManager:
 
 
 @lru_cache
-def use_object_detection_client() -> ObjectDetectionClient:
+def use_detection_cache(
+    config: DictConfig = Depends(use_config),
+) -> Optional[DetectionCache]:
+    detection_cache_config = config.object_detection.detection_cache
+
+    if detection_cache_config.enabled is not True:
+        return None
+
+    return DetectionCache(
+        max_bytes_number=detection_cache_config.max_bytes_number,
+        cache_directory=detection_cache_config.directory,
+        max_disk_bytes_number=detection_cache_config.max_disk_bytes_number,
+    )
+
+
+@lru_cache
+def use_object_detection_client(
+    config: DictConfig = Depends(use_config),
+    detection_cache: Optional[DetectionCache] = Depends(use_detection_cache),
+) -> ObjectDetectionClient:
+    batch_size_control_config = config.object_detection.batch_size_control
+
     return ObjectDetectionClient(
         vertex_ai_manager=VertexAIManager(
             key_path=GOOGLE_APPLICATION_CREDENTIALS,
@@ -63,6 +88,27 @@ def use_object_detection_client() -> ObjectDetectionClient:
             host=MODEL_INSTANTIATOR_HOST,
         ),
         model_name=OBJECT_DETECTION_MODEL_NAME,
+        max_concurrent_requests=config.object_detection.max_concurrent_requests,
+        detection_cache=detection_cache,
+        overridden_image_width=config.object_detection.overridden_image_width,
+        batch_size_controller=BatchSizeController(
+            initial_batch_size=batch_size_control_config.initial_batch_size,
+            max_batch_size=batch_size_control_config.max_batch_size,
+            latency_target=batch_size_control_config.latency_target,
+        ),
+    )
+
+
+@lru_cache
+def use_frame_cache(config: DictConfig = Depends(use_config)) -> Optional[FrameCache]:
+    frame_cache_config = config.preprocessing.frame_cache
+
+    if frame_cache_config.enabled is not True:
+        return None
+
+    return FrameCache(
+        cache_directory=frame_cache_config.directory or FRAME_CACHE_DIRECTORY,
+        max_bytes_number=frame_cache_config.max_bytes_number,
     )
 
 
@@ -72,6 +118,7 @@ def use_people_counter(
     object_detection_client: ObjectDetectionClient = Depends(
         use_object_detection_client
     ),
+    frame_cache: Optional[FrameCache] = Depends(use_frame_cache),
 ) -> PeopleCounter:
     return PeopleCounter(
         object_detection_client=object_detection_client,
@@ -79,4 +126,7 @@ def use_people_counter(
         algorithm_config=config.algorithm,
         image_width=config.preprocessing.image_width,
         video_outputs_directory=config.paths.outputs_directory,
+        frame_queue_size=config.preprocessing.frame_queue_size,
+        video_reader_backend=config.preprocessing.video_reader_backend,
+        frame_cache=frame_cache,
     )
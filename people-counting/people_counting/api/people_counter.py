@@ -4,6 +4,7 @@ from datetime import datetime
 from typing import List, Optional
 
 from core.api_exceptions import abort
+from core.exceptions import DependencyError
 from core.google.cloud_run_job_manager import CloudRunJobManager
 from core.google.firestore_client import FirestoreClient
 from core.google.storage_client import StorageClient
@@ -18,7 +19,8 @@ from core.schemas.people_counting import (
     PeopleCounterRealTimeInput,
     PeopleCounterRealTimeOutput,
 )
-from core.services.asset_reader import make_asset, make_assets
+from core.services.asset_reader import make_asset
+from core.services.reader_common import is_path_asset_type_coherent
 from core.tools import extract_file_extension
 from fastapi import APIRouter, Depends, Response
 from omegaconf import DictConfig
@@ -34,6 +36,7 @@ from people_counting.api.dependencies import (
 )
 from people_counting.common import Statistics
 from people_counting.environment_variables import (
+    CHECKPOINTS_STORAGE_DIRECTORY,
     COUNTED_VIDEOS_BUCKET,
     FIRESTORE_RESULTS_COLLECTION,
     MODEL_INSTANTIATOR_HOST,
@@ -93,6 +96,29 @@ def _validate_video_storage_paths(
         )
 
 
+def _get_videos_ids(
+    videos_storage_paths: List[GSPath], storage_client: StorageClient
+) -> List[str]:
+    videos_ids = []
+
+    for video_storage_path in videos_storage_paths:
+        if (
+            is_path_asset_type_coherent(
+                asset_path=video_storage_path, asset_type=AssetType.VIDEO
+            )
+            is False
+        ):
+            raise ValueError(f"The asset '{video_storage_path}' is not a video")
+
+        videos_ids.append(
+            storage_client.get_blob_hash(
+                *GSPath(video_storage_path).to_bucket_and_blob_names()
+            )
+        )
+
+    return videos_ids
+
+
 def _create_counted_video_storage_path(
     asset_id: str,
     asset_path: str,
@@ -161,12 +187,14 @@ def count_people(
     except ValueError as value_error:
         abort(code=status.HTTP_400_BAD_REQUEST, detail=str(value_error))
 
-    video_assets = make_assets(
-        assets_paths=people_counter_input.videos_storage_paths,
-        storage_client=storage_client,
-        asset_type=AssetType.VIDEO,
-    )
-    assets_ids = [video_asset.get_hash() for video_asset in video_assets]
+    # the videos are not downloaded here, they are fully validated by the job
+    try:
+        assets_ids = _get_videos_ids(
+            videos_storage_paths=people_counter_input.videos_storage_paths,
+            storage_client=storage_client,
+        )
+    except (ValueError, DependencyError) as exception:
+        abort(code=status.HTTP_400_BAD_REQUEST, detail=str(exception))
 
     _upload_people_job_document(
         firestore_client=firestore_client,
@@ -180,11 +208,13 @@ def count_people(
         counted_videos_storage_paths = [
             _create_counted_video_storage_path(
                 asset_id=asset_id,
-                asset_path=video_asset.asset_path,
+                asset_path=video_storage_path,
                 counted_videos_bucket=COUNTED_VIDEOS_BUCKET,
                 job_id=job_id,
             )
-            for asset_id, video_asset in zip(assets_ids, video_assets)
+            for asset_id, video_storage_path in zip(
+                assets_ids, people_counter_input.videos_storage_paths
+            )
         ]
 
     job_name = f"count-people-{job_id}"
@@ -200,11 +230,16 @@ def count_people(
         "FIRESTORE_RESULTS_COLLECTION": FIRESTORE_RESULTS_COLLECTION,
         "JOB_ID": job_id,
         "VIDEOS_STORAGE_PATHS": " ".join(people_counter_input.videos_storage_paths),
+        "ASSETS_IDS": " ".join(assets_ids),
     }
     if counted_videos_storage_paths is not None:
         job_environment_variables["COUNTED_VIDEOS_STORAGE_PATHS"] = " ".join(
             counted_videos_storage_paths
         )
+    if CHECKPOINTS_STORAGE_DIRECTORY is not None:
+        job_environment_variables[
+            "CHECKPOINTS_STORAGE_DIRECTORY"
+        ] = CHECKPOINTS_STORAGE_DIRECTORY
 
     cloud_run_job_manager.create_job(
         job_name=job_name,
@@ -0,0 +1,121 @@
+"""
+Measure the MultiTracker update time per frame depending on the number of tracked
+persons, with the trackers kept in the current process and split among worker
+processes.
+
+Usage: python -m people_counting.benchmarks.multi_tracker --persons 1 10 30 60
+"""
+import argparse
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from people_counting.multi_tracker import MultiTracker
+
+
+def make_synthetic_frames(
+    persons_number: int,
+    frames_number: int,
+    frame_shape: Tuple[int, int] = (300, 400),
+    box_size: int = 24,
+    seed: int = 0,
+) -> Tuple[List[np.ndarray], np.ndarray]:
+    """
+    Build frames of textured squares moving on a noisy background, along with the
+    bounding boxes of the squares on the first frame.
+    """
+    random_generator = np.random.default_rng(seed)
+    height, width = frame_shape
+    background = random_generator.integers(0, 64, (height, width, 3), dtype=np.uint8)
+    textures = random_generator.integers(
+        128, 256, (persons_number, box_size, box_size, 3), dtype=np.uint8
+    )
+    positions = np.column_stack(
+        [
+            random_generator.integers(0, width - box_size, persons_number),
+            random_generator.integers(0, height - box_size, persons_number),
+        ]
+    ).astype(float)
+    velocities = random_generator.uniform(-1.5, 1.5, (persons_number, 2))
+
+    first_boxes = np.column_stack([positions, positions + box_size]).astype(int)
+    frames = []
+
+    for _ in range(frames_number):
+        frame = background.copy()
+
+        for texture, (x_position, y_position) in zip(textures, positions.astype(int)):
+            frame[
+                y_position : y_position + box_size, x_position : x_position + box_size
+            ] = texture
+
+        frames.append(frame)
+        positions = np.clip(
+            positions + velocities, 0, (width - box_size, height - box_size)
+        )
+
+    return frames, first_boxes
+
+
+def time_multi_tracker(
+    frames: List[np.ndarray],
+    first_boxes: np.ndarray,
+    max_workers: Optional[int],
+) -> float:
+    multi_tracker = MultiTracker(max_workers=max_workers)
+    multi_tracker.start(frames[0], first_boxes)
+
+    start_time = time.perf_counter()
+    for frame in frames[1:]:
+        multi_tracker.update(frame)
+    duration = time.perf_counter() - start_time
+
+    multi_tracker.close()
+
+    return duration / max(len(frames) - 1, 1)
+
+
+def run_benchmark(
+    persons_numbers: List[int], frames_number: int, max_workers: Optional[int]
+) -> pd.DataFrame:
+    rows = []
+
+    for persons_number in persons_numbers:
+        frames, first_boxes = make_synthetic_frames(
+            persons_number=persons_number, frames_number=frames_number
+        )
+        sequential_time = time_multi_tracker(frames, first_boxes, max_workers=1)
+        parallel_time = time_multi_tracker(frames, first_boxes, max_workers=max_workers)
+
+        rows.append(
+            {
+                "persons_number": persons_number,
+                "sequential_ms_per_frame": 1000 * sequential_time,
+                "parallel_ms_per_frame": 1000 * parallel_time,
+                "speedup": sequential_time / parallel_time,
+            }
+        )
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--persons", type=int, nargs="+", default=[1, 5, 10, 30, 60])
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count())
+    parser.add_argument("--output-path", type=str, default=None)
+    arguments = parser.parse_args()
+
+    results = run_benchmark(
+        persons_numbers=arguments.persons,
+        frames_number=arguments.frames,
+        max_workers=arguments.max_workers,
+    )
+    print(results.to_string(index=False))
+
+    if arguments.output_path is not None:
+        results.to_csv(arguments.output_path, index=False)
@@ -0,0 +1,192 @@
+"""
+Compare the tracker backends speed and counting accuracy on synthetic videos of
+persons crossing the line, the keyframes detections being the true bounding boxes.
+
+Usage: python -m people_counting.benchmarks.tracker_backends --persons 5 20
+"""
+import argparse
+import time
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from people_counting.centroid_tracker import CentroidTracker
+from people_counting.common import Statistics
+from people_counting.crossing_counter import CrossingCounter
+from people_counting.multi_tracker import MultiTracker
+from people_counting.tracker_backends import (
+    KalmanTracker,
+    OpticalFlowTracker,
+    TrackerBackend,
+    TrackerBackendName,
+)
+
+
+def make_synthetic_crossings(
+    persons_number: int,
+    frames_number: int,
+    frame_shape: Tuple[int, int] = (300, 400),
+    box_size: int = 24,
+    seed: int = 0,
+) -> Tuple[List[np.ndarray], List[np.ndarray]]:
+    """
+    Build frames of textured squares crossing the frame vertically once, entering at
+    random times, on a noisy background, along with the (N, 4) arrays of the
+    bounding boxes of the visible squares in each frame.
+    """
+    random_generator = np.random.default_rng(seed)
+    height, width = frame_shape
+    background = random_generator.integers(0, 64, (height, width, 3), dtype=np.uint8)
+    textures = random_generator.integers(
+        128, 256, (persons_number, box_size, box_size, 3), dtype=np.uint8
+    )
+    directions = random_generator.choice([-1, 1], persons_number)
+    speeds = random_generator.uniform(1.0, 3.0, persons_number)
+    crossing_durations = np.ceil((height + box_size) / speeds).astype(int)
+    start_frame_numbers = random_generator.integers(
+        0, np.maximum(frames_number - crossing_durations, 1)
+    )
+    x_positions = random_generator.integers(0, width - box_size, persons_number)
+    # the persons going down enter from the top, the other ones from the bottom
+    start_y_positions = np.where(directions > 0, -box_size, height)
+
+    frames = []
+    frames_bounding_boxes = []
+
+    for frame_number in range(frames_number):
+        frame = background.copy()
+        y_positions = (
+            start_y_positions
+            + directions * speeds * (frame_number - start_frame_numbers)
+        ).astype(int)
+        visible = (
+            (frame_number >= start_frame_numbers)
+            & (y_positions > -box_size)
+            & (y_positions < height)
+        )
+        bounding_boxes = []
+
+        for texture, x_position, y_position in zip(
+            textures[visible], x_positions[visible], y_positions[visible]
+        ):
+            y_min, y_max = max(y_position, 0), min(y_position + box_size, height)
+            frame[y_min:y_max, x_position : x_position + box_size] = texture[
+                y_min - y_position : y_max - y_position
+            ]
+            bounding_boxes.append((x_position, y_min, x_position + box_size, y_max))
+
+        frames.append(frame)
+        frames_bounding_boxes.append(np.array(bounding_boxes, dtype=int).reshape(-1, 4))
+
+    return frames, frames_bounding_boxes
+
+
+def create_tracker_backend(tracker_backend_name: TrackerBackendName) -> TrackerBackend:
+    if tracker_backend_name == TrackerBackendName.KALMAN:
+        return KalmanTracker()
+
+    if tracker_backend_name == TrackerBackendName.OPTICAL_FLOW:
+        return OpticalFlowTracker()
+
+    return MultiTracker(max_workers=1)
+
+
+def count_crossings(
+    frames: List[np.ndarray],
+    frames_bounding_boxes: List[np.ndarray],
+    inference_periodicity: int,
+    tracker_backend: TrackerBackend,
+) -> Tuple[Statistics, float]:
+    """
+    Count the crossings with the true bounding boxes as the keyframes detections, and
+    return the statistics along with the tracking time.
+    """
+    crossing_counter = CrossingCounter(
+        centroid_tracker=CentroidTracker(max_disappeared=5, max_distance=40),
+        line_placement_ratio=0.5,
+    )
+    tracking_time = 0.0
+
+    for frame_number, (frame, bounding_boxes) in enumerate(
+        zip(frames, frames_bounding_boxes)
+    ):
+        start_time = time.perf_counter()
+
+        if frame_number % inference_periodicity == 0:
+            tracker_backend.start(frame, bounding_boxes)
+        else:
+            bounding_boxes = tracker_backend.update(frame)
+
+        tracking_time += time.perf_counter() - start_time
+
+        crossing_counter.update(
+            bounding_boxes, frame_height=frame.shape[0], time_offset=frame_number
+        )
+
+    tracker_backend.close()
+
+    return crossing_counter.statistics, tracking_time
+
+
+def run_benchmark(
+    persons_numbers: List[int], frames_number: int, inference_periodicity: int
+) -> pd.DataFrame:
+    rows = []
+
+    for persons_number in persons_numbers:
+        frames, frames_bounding_boxes = make_synthetic_crossings(
+            persons_number=persons_number, frames_number=frames_number
+        )
+        # the true bounding boxes are used on every frame as the reference counts
+        reference_statistics, _ = count_crossings(
+            frames, frames_bounding_boxes, 1, KalmanTracker()
+        )
+
+        for tracker_backend_name in TrackerBackendName:
+            statistics, tracking_time = count_crossings(
+                frames,
+                frames_bounding_boxes,
+                inference_periodicity,
+                create_tracker_backend(tracker_backend_name),
+            )
+
+            rows.append(
+                {
+                    "persons_number": persons_number,
+                    "tracker_backend": tracker_backend_name.value,
+                    "tracking_fps": frames_number / tracking_time,
+                    "went_up_count": statistics.went_up_count,
+                    "went_down_count": statistics.went_down_count,
+                    "reference_went_up_count": reference_statistics.went_up_count,
+                    "reference_went_down_count": reference_statistics.went_down_count,
+                    "count_error": abs(
+                        statistics.went_up_count - reference_statistics.went_up_count
+                    )
+                    + abs(
+                        statistics.went_down_count
+                        - reference_statistics.went_down_count
+                    ),
+                }
+            )
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--persons", type=int, nargs="+", default=[1, 5, 20])
+    parser.add_argument("--frames", type=int, default=600)
+    parser.add_argument("--inference-periodicity", type=int, default=15)
+    parser.add_argument("--output-path", type=str, default=None)
+    arguments = parser.parse_args()
+
+    results = run_benchmark(
+        persons_numbers=arguments.persons,
+        frames_number=arguments.frames,
+        inference_periodicity=arguments.inference_periodicity,
+    )
+    print(results.to_string(index=False))
+
+    if arguments.output_path is not None:
+        results.to_csv(arguments.output_path, index=False)
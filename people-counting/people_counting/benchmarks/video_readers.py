@@ -0,0 +1,84 @@
+"""
+Compare the video reader backends speed when reading the sampled frames of a video
+at the image width, along with the mean difference between their frames.
+
+Usage: python -m people_counting.benchmarks.video_readers video.mp4 --time-steps 0.2
+"""
+import argparse
+import resource
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from core.schemas.asset import VideoAsset, VideoReaderBackend
+
+
+def read_frames(
+    video_asset: VideoAsset, reader_backend: VideoReaderBackend, width: int
+) -> List[np.ndarray]:
+    return list(video_asset.get_frames(width=width, reader_backend=reader_backend))
+
+
+def run_benchmark(
+    video_path: str, time_steps: List[Optional[float]], width: int
+) -> pd.DataFrame:
+    rows = []
+
+    for time_step in time_steps:
+        video_asset = VideoAsset(asset_path=video_path, time_step=time_step)
+        reference_frames = None
+
+        for reader_backend in VideoReaderBackend:
+            start_time = time.perf_counter()
+            start_cpu_time = time.process_time()
+            # the CPU time of the ffmpeg subprocess is reported separately
+            start_children_cpu_time = resource.getrusage(
+                resource.RUSAGE_CHILDREN
+            ).ru_utime
+            frames = read_frames(video_asset, reader_backend, width)
+            reading_time = time.perf_counter() - start_time
+
+            if reference_frames is None:
+                reference_frames = frames
+
+            rows.append(
+                {
+                    "time_step": video_asset.time_step,
+                    "reader_backend": reader_backend.value,
+                    "frames_number": len(frames),
+                    "reading_fps": len(frames) / reading_time,
+                    "cpu_time": time.process_time() - start_cpu_time,
+                    "children_cpu_time": resource.getrusage(
+                        resource.RUSAGE_CHILDREN
+                    ).ru_utime
+                    - start_children_cpu_time,
+                    "mean_difference": np.mean(
+                        [
+                            np.abs(frame.astype(int) - reference_frame).mean()
+                            for frame, reference_frame in zip(frames, reference_frames)
+                        ]
+                    ),
+                }
+            )
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("video_path", type=str)
+    parser.add_argument("--time-steps", type=float, nargs="+", default=[None])
+    parser.add_argument("--width", type=int, default=400)
+    parser.add_argument("--output-path", type=str, default=None)
+    arguments = parser.parse_args()
+
+    results = run_benchmark(
+        video_path=arguments.video_path,
+        time_steps=arguments.time_steps,
+        width=arguments.width,
+    )
+    print(results.to_string(index=False))
+
+    if arguments.output_path is not None:
+        results.to_csv(arguments.output_path, index=False)
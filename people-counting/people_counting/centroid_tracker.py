@@ -1,79 +1,146 @@
-from collections import OrderedDict
-from typing import Dict, List
+from enum import Enum
+from typing import Dict, List, Tuple, Union
 
 import numpy as np
+from scipy.optimize import linear_sum_assignment
 from scipy.spatial import distance as dist
 
-from people_counting.common import BoundingBox
+from people_counting.common import BoundingBox, bounding_boxes_to_array
+
+
+class Matching(str, Enum):
+    # each input is matched to its closest object, an object can then be matched twice
+    GREEDY = "greedy"
+    # inputs and objects are matched one to one, minimizing the total distance
+    OPTIMAL = "optimal"
 
 
 class CentroidTracker:
-    def __init__(self, max_disappeared: int = 50, max_distance: int = 50):
+    """
+    Associate the centroids of the bounding boxes from one frame to the next.
+
+    The state of the registered objects is kept in contiguous arrays (ids, centroids
+    and disappearance counts), in registration order, so that matching, aging and
+    expiry are vectorized.
+    """
+
+    def __init__(
+        self,
+        max_disappeared: int = 50,
+        max_distance: int = 50,
+        matching: Matching = Matching.GREEDY,
+    ):
         self.next_object_id = 0
-        self.objects: Dict[int, np.ndarray] = OrderedDict()
-        self.disappeared: Dict[int, int] = OrderedDict()
+        self.object_ids = np.zeros(0, dtype=int)
+        self.centroids = np.zeros((0, 2), dtype=int)
+        self.disappeared = np.zeros(0, dtype=int)
         self.max_disappeared = max_disappeared
         self.max_distance = max_distance
-
-    def register(self, centroid: np.ndarray):
-        self.objects[self.next_object_id] = centroid
-        self.disappeared[self.next_object_id] = 0
-        self.next_object_id += 1
+        self.matching = Matching(matching)
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {
+            "next_object_id": np.array(self.next_object_id),
+            "object_ids": self.object_ids,
+            "centroids": self.centroids,
+            "disappeared": self.disappeared,
+        }
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        self.next_object_id = int(state["next_object_id"])
+        self.object_ids = state["object_ids"]
+        self.centroids = state["centroids"]
+        self.disappeared = state["disappeared"]
+
+    @property
+    def objects(self) -> Dict[int, np.ndarray]:
+        return dict(zip(self.object_ids.tolist(), self.centroids))
+
+    @staticmethod
+    def compute_centroids(
+        bounding_boxes: Union[List[BoundingBox], np.ndarray]
+    ) -> np.ndarray:
+        if not isinstance(bounding_boxes, np.ndarray):
+            bounding_boxes = bounding_boxes_to_array(bounding_boxes)
+
+        # truncation towards zero, as done by BoundingBox.center
+        return np.trunc((bounding_boxes[:, :2] + bounding_boxes[:, 2:]) / 2.0).astype(
+            int
+        )
+
+    def register(self, centroids: np.ndarray):
+        centroids = np.asarray(centroids, dtype=int).reshape(-1, 2)
+        new_object_ids = np.arange(
+            self.next_object_id, self.next_object_id + len(centroids)
+        )
+
+        self.object_ids = np.concatenate([self.object_ids, new_object_ids])
+        self.centroids = np.concatenate([self.centroids, centroids])
+        self.disappeared = np.concatenate(
+            [self.disappeared, np.zeros(len(centroids), dtype=int)]
+        )
+        self.next_object_id += len(centroids)
 
     def unregister(self, object_id: int):
-        del self.objects[object_id]
-        del self.disappeared[object_id]
-
-    # pylint: disable=too-many-locals
-    def update(self, bounding_boxes: List[BoundingBox]) -> Dict[int, np.ndarray]:
+        self._keep(self.object_ids != object_id)
+
+    def _keep(self, mask: np.ndarray):
+        self.object_ids = self.object_ids[mask]
+        self.centroids = self.centroids[mask]
+        self.disappeared = self.disappeared[mask]
+
+    def _age(self, disappeared_mask: np.ndarray):
+        self.disappeared[disappeared_mask] += 1
+        self._keep(self.disappeared <= self.max_disappeared)
+
+    def _match(self, distances: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the matched (input indexes, object indexes) from the
+        (inputs number, objects number) distances matrix.
+        """
+        if self.matching == Matching.OPTIMAL:
+            inputs_indexes, objects_indexes = linear_sum_assignment(distances)
+            matched = distances[inputs_indexes, objects_indexes] <= self.max_distance
+
+            return inputs_indexes[matched], objects_indexes[matched]
+
+        inputs_indexes = np.where(distances.min(axis=1) <= self.max_distance)[0]
+
+        return inputs_indexes, distances[inputs_indexes].argmin(axis=1)
+
+    def update(
+        self, bounding_boxes: Union[List[BoundingBox], np.ndarray]
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Match the received bounding boxes with the registered objects, and return the
+        ids and centroids arrays of the objects still registered.
+        """
         if len(bounding_boxes) == 0:
-            for object_id in list(self.disappeared.keys()):
-                self.disappeared[object_id] += 1
-
-                if self.disappeared[object_id] > self.max_disappeared:
-                    self.unregister(object_id)
-
-            return self.objects
-
-        input_centroids = np.zeros((len(bounding_boxes), 2), dtype="int")
-
-        for index, bounding_box in enumerate(bounding_boxes):
-            input_centroids[index] = bounding_box.center
-
-        if len(self.objects) == 0:
-            for input_centroid in input_centroids:
-                self.register(input_centroid)
-
-        else:
-            object_ids = list(self.objects)
-            object_centroids = [self.objects[key] for key in self.objects]
-            distances = dist.cdist(np.array(input_centroids), object_centroids)
-            found_objects_input_idx = np.where(
-                np.min(distances, axis=1) <= self.max_distance
-            )[0]
-            found_objects_idx = distances[found_objects_input_idx].argmin(axis=1)
-            disappeared_objects_idx = set(range(len(object_centroids))).difference(
-                set(found_objects_idx)
-            )
-            new_inputs_idx = set(range(len(input_centroids))).difference(
-                set(found_objects_input_idx)
-            )
-
-            for found_object_idx, found_object_input_idx in zip(
-                found_objects_idx, found_objects_input_idx
-            ):
-                object_id = object_ids[found_object_idx]
-                self.objects[object_id] = input_centroids[found_object_input_idx]
-                self.disappeared[object_id] = 0
-
-            for disappeared_object_idx in disappeared_objects_idx:
-                object_id = object_ids[disappeared_object_idx]
-                self.disappeared[object_id] += 1
-
-                if self.disappeared[object_id] > self.max_disappeared:
-                    self.unregister(object_id)
-
-            for new_input_idx in new_inputs_idx:
-                self.register(input_centroids[new_input_idx])
-
-        return self.objects
+            self._age(np.ones(len(self.object_ids), dtype=bool))
+
+            return self.object_ids, self.centroids
+
+        input_centroids = self.compute_centroids(bounding_boxes)
+
+        if len(self.object_ids) == 0:
+            self.register(input_centroids)
+
+            return self.object_ids, self.centroids
+
+        distances = dist.cdist(input_centroids, self.centroids)
+        inputs_indexes, objects_indexes = self._match(distances)
+
+        # the centroids returned by the previous update are left untouched
+        self.centroids = self.centroids.copy()
+        self.centroids[objects_indexes] = input_centroids[inputs_indexes]
+        self.disappeared[objects_indexes] = 0
+
+        disappeared_mask = np.ones(len(self.object_ids), dtype=bool)
+        disappeared_mask[objects_indexes] = False
+        self._age(disappeared_mask)
+
+        new_inputs_mask = np.ones(len(input_centroids), dtype=bool)
+        new_inputs_mask[inputs_indexes] = False
+        self.register(input_centroids[new_inputs_mask])
+
+        return self.object_ids, self.centroids
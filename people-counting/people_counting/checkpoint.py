@@ -0,0 +1,146 @@
+import io
+import logging
+import os
+from typing import Optional
+
+import numpy as np
+from core.exceptions import DependencyError
+from core.google.storage_client import StorageClient
+from core.path import GSPath
+from omegaconf import DictConfig
+
+from people_counting.crossing_counter import CrossingCounter
+from people_counting.tracker_backends import TrackerBackendName
+
+logger = logging.getLogger(__name__)
+
+
+def is_resume_exact(algorithm_config: DictConfig) -> bool:
+    """
+    Whether a run resumed from a checkpoint counts exactly as an uninterrupted one,
+    which is not the case with the kalman tracker backend, whose velocities are
+    carried from one keyframe to the next and are not saved
+    """
+    return (
+        TrackerBackendName(algorithm_config.tracker_backend)
+        != TrackerBackendName.KALMAN
+    )
+
+
+class CheckpointStore:
+    """
+    Save and load the counting state of a video at a local or a GCS path, so that an
+    interrupted run can be resumed from the last checkpoint.
+
+    Checkpoints are taken on detected keyframes, where the correlation trackers are
+    restarted from the detections and the motion gate from the detected frame: the
+    counting state and the frame number are then enough to resume, without the
+    trackers state, under the conditions of is_resume_exact.
+    """
+
+    def __init__(
+        self, checkpoint_path: str, storage_client: Optional[StorageClient] = None
+    ):
+        self.checkpoint_path = checkpoint_path
+        self.storage_client = storage_client
+
+        if self.is_remote and self.storage_client is None:
+            raise ValueError(
+                f"A storage client is required for the checkpoint path "
+                f"{self.checkpoint_path}"
+            )
+
+    @property
+    def is_remote(self) -> bool:
+        return GSPath.is_valid(self.checkpoint_path)
+
+    def _write(self, content: bytes):
+        if self.is_remote:
+            bucket_name, blob_name = GSPath(
+                self.checkpoint_path
+            ).to_bucket_and_blob_names()
+            self.storage_client.upload_blob_from_bytes(
+                bucket_name=bucket_name, blob_name=blob_name, content=content
+            )
+            return
+
+        if checkpoint_directory := os.path.dirname(self.checkpoint_path):
+            os.makedirs(checkpoint_directory, exist_ok=True)
+
+        # the previous checkpoint is replaced atomically
+        temporary_path = f"{self.checkpoint_path}.tmp"
+        with open(temporary_path, "wb") as checkpoint_file:
+            checkpoint_file.write(content)
+        os.replace(temporary_path, self.checkpoint_path)
+
+    def _read(self) -> Optional[bytes]:
+        if self.is_remote:
+            bucket_name, blob_name = GSPath(
+                self.checkpoint_path
+            ).to_bucket_and_blob_names()
+
+            try:
+                return self.storage_client.download_blob(
+                    bucket_name=bucket_name, blob_name=blob_name
+                )
+            except DependencyError:
+                return None
+
+        if not os.path.exists(self.checkpoint_path):
+            return None
+
+        with open(self.checkpoint_path, "rb") as checkpoint_file:
+            return checkpoint_file.read()
+
+    def save(self, frame_number: int, crossing_counter: CrossingCounter):
+        """
+        Save the state of the crossing counter, which has counted the frames before
+        frame_number.
+        """
+        buffer = io.BytesIO()
+        np.savez(
+            buffer, frame_number=np.array(frame_number), **crossing_counter.get_state()
+        )
+        self._write(buffer.getvalue())
+
+        logger.info(f"Checkpoint saved at frame {frame_number}: {self.checkpoint_path}")
+
+    def load(self, crossing_counter: CrossingCounter) -> int:
+        """
+        Restore the state of the crossing counter from the checkpoint if there is
+        one, and return the frame number to resume from.
+        """
+        content = self._read()
+
+        if content is None:
+            return 0
+
+        with np.load(io.BytesIO(content)) as checkpoint:
+            state = dict(checkpoint)
+
+        frame_number = int(state.pop("frame_number"))
+        crossing_counter.set_state(state)
+
+        logger.info(
+            f"Resuming from the checkpoint at frame {frame_number}: "
+            f"{self.checkpoint_path}"
+        )
+
+        return frame_number
+
+    def delete(self):
+        if self.is_remote:
+            bucket_name, blob_name = GSPath(
+                self.checkpoint_path
+            ).to_bucket_and_blob_names()
+
+            try:
+                self.storage_client.delete_blob(
+                    bucket_name=bucket_name, blob_name=blob_name
+                )
+            except DependencyError:
+                pass
+            return
+
+        if os.path.exists(self.checkpoint_path):
+            os.unlink(self.checkpoint_path)
@@ -1,8 +1,9 @@
 import logging
 from dataclasses import dataclass
 from enum import Enum
-from typing import List, Tuple
+from typing import Dict, List, Tuple
 
+import numpy as np
 import pandas as pd
 from core.schemas.people_counting import Detection, Direction
 
@@ -13,28 +14,99 @@ def init_logger(level: int):
 
 
 class Statistics:
-    def __init__(self):
-        self.passed_people_directions = []
-        self.timestamps = []
+    """
+    Record the crossings with their timestamps, in arrays grown by doubling their
+    capacity, along with running counters and the crossings counts per interval of
+    histogram_interval seconds.
+    """
 
-    def add_went_up(self, timestamp: float):
-        self.passed_people_directions.append(Direction.UP)
-        self.timestamps.append(timestamp)
+    # the directions are stored as their index in this array
+    directions = np.array([Direction.UP, Direction.DOWN], dtype=object)
 
-    def add_went_down(self, timestamp: float):
-        self.passed_people_directions.append(Direction.DOWN)
-        self.timestamps.append(timestamp)
+    def __init__(self, histogram_interval: float = 60.0, capacity: int = 64):
+        self.histogram_interval = histogram_interval
+        self.went_up_count = 0
+        self.went_down_count = 0
+
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._direction_codes = np.zeros(capacity, dtype=np.int8)
+        # (intervals number, directions number) crossings counts
+        self._histogram = np.zeros((0, len(self.directions)), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.went_up_count + self.went_down_count
 
     @property
-    def went_up_count(self) -> int:
-        return len(
-            [elem for elem in self.passed_people_directions if elem == Direction.UP]
-        )
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[: len(self)]
 
     @property
-    def went_down_count(self) -> int:
-        return len(
-            [elem for elem in self.passed_people_directions if elem == Direction.DOWN]
+    def direction_codes(self) -> np.ndarray:
+        return self._direction_codes[: len(self)]
+
+    def _add(self, timestamp: float, direction_code: int):
+        crossings_number = len(self)
+
+        if crossings_number == len(self._timestamps):
+            capacity = max(2 * crossings_number, 1)
+            self._timestamps = np.resize(self._timestamps, capacity)
+            self._direction_codes = np.resize(self._direction_codes, capacity)
+
+        self._timestamps[crossings_number] = timestamp
+        self._direction_codes[crossings_number] = direction_code
+
+        interval_index = int(timestamp // self.histogram_interval)
+        if interval_index >= len(self._histogram):
+            self._histogram = np.concatenate(
+                [
+                    self._histogram,
+                    np.zeros(
+                        (
+                            interval_index + 1 - len(self._histogram),
+                            len(self.directions),
+                        ),
+                        dtype=np.int64,
+                    ),
+                ]
+            )
+        self._histogram[interval_index, direction_code] += 1
+
+    def add_went_up(self, timestamp: float):
+        self._add(timestamp, 0)
+        self.went_up_count += 1
+
+    def add_went_down(self, timestamp: float):
+        self._add(timestamp, 1)
+        self.went_down_count += 1
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {
+            "histogram_interval": np.array(self.histogram_interval),
+            "timestamps": self.timestamps,
+            "direction_codes": self.direction_codes,
+            "histogram": self._histogram,
+        }
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        self.histogram_interval = float(state["histogram_interval"])
+        self._timestamps = state["timestamps"].astype(np.float64)
+        self._direction_codes = state["direction_codes"].astype(np.int8)
+        self._histogram = state["histogram"].astype(np.int64)
+        self.went_up_count = int(np.count_nonzero(self._direction_codes == 0))
+        self.went_down_count = len(self._direction_codes) - self.went_up_count
+
+    def to_histogram(self) -> pd.DataFrame:
+        """
+        Return the number of crossings in each direction per interval, indexed by
+        the start timestamp of the intervals.
+        """
+        return pd.DataFrame(
+            data=self._histogram,
+            columns=[direction.value for direction in self.directions],
+            index=pd.Index(
+                np.arange(len(self._histogram)) * self.histogram_interval,
+                name="timestamp",
+            ),
         )
 
     def to_df(self) -> pd.DataFrame:
@@ -42,7 +114,7 @@ class Statistics:
             columns=["timestamp", "count"],
             data={
                 "timestamp": self.timestamps,
-                "count": self.passed_people_directions,
+                "count": self.directions[self.direction_codes],
             },
         )
 
@@ -50,7 +122,7 @@ class Statistics:
         return [
             Detection(timestamp=timestamp, direction=direction)
             for timestamp, direction in zip(
-                self.timestamps, self.passed_people_directions
+                self.timestamps.tolist(), self.directions[self.direction_codes]
             )
         ]
 
@@ -76,3 +148,26 @@ class BoundingBox:
     @property
     def center(self) -> Tuple[int, int]:
         return int((self.x_min + self.x_max) / 2), int((self.y_min + self.y_max) / 2.0)
+
+
+def bounding_boxes_to_array(bounding_boxes: List[BoundingBox]) -> np.ndarray:
+    """Convert the bounding boxes to a (N, 4) x_min, y_min, x_max, y_max array"""
+    return np.array(
+        [
+            (
+                bounding_box.x_min,
+                bounding_box.y_min,
+                bounding_box.x_max,
+                bounding_box.y_max,
+            )
+            for bounding_box in bounding_boxes
+        ],
+        dtype=int,
+    ).reshape(-1, 4)
+
+
+def bounding_boxes_from_array(bounding_boxes: np.ndarray) -> List[BoundingBox]:
+    return [
+        BoundingBox(x_min=x_min, y_min=y_min, x_max=x_max, y_max=y_max)
+        for x_min, y_min, x_max, y_max in bounding_boxes
+    ]
@@ -0,0 +1,105 @@
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from core.schemas.people_counting import Detection, Direction
+
+from people_counting.centroid_tracker import CentroidTracker
+from people_counting.common import Statistics
+from people_counting.track_table import TrackTable
+
+
+class CrossingCounter:
+    """
+    Associate the tracked bounding boxes from one frame to the next and count the
+    objects crossing the horizontal line, in each direction.
+
+    This is the only stateful step across keyframes, and it only needs the bounding
+    boxes of each frame: it can thus be replayed on bounding boxes computed elsewhere.
+    """
+
+    def __init__(
+        self,
+        centroid_tracker: CentroidTracker,
+        line_placement_ratio: float,
+        trajectory_history_size: int = 0,
+        on_crossing: Optional[Callable[[Detection], None]] = None,
+    ):
+        self.centroid_tracker = centroid_tracker
+        self.line_placement_ratio = line_placement_ratio
+        self.statistics = Statistics()
+        self.track_table = TrackTable(history_size=trajectory_history_size)
+        # called with each crossing as soon as it is counted
+        self.on_crossing = on_crossing
+
+    @property
+    def _stateful_components(self) -> Dict[str, Any]:
+        return {
+            "centroid_tracker": self.centroid_tracker,
+            "track_table": self.track_table,
+            "statistics": self.statistics,
+        }
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        """Return the state of the counting, as a flat dictionary of arrays"""
+        return {
+            f"{component_name}.{key}": value
+            for component_name, component in self._stateful_components.items()
+            for key, value in component.get_state().items()
+        }
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        for component_name, component in self._stateful_components.items():
+            prefix = f"{component_name}."
+            component.set_state(
+                {
+                    key[len(prefix) :]: value
+                    for key, value in state.items()
+                    if key.startswith(prefix)
+                }
+            )
+
+    def update(
+        self, bounding_boxes: np.ndarray, frame_height: int, time_offset: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Count the crossings of the frame from its (N, 4) bounding boxes array, and
+        return the ids and centroids arrays of the tracked objects.
+        """
+        line_vertical_position = int(self.line_placement_ratio * frame_height)
+
+        object_ids, centroids = self.centroid_tracker.update(bounding_boxes)
+        tracked = self.track_table.update(object_ids, centroids)
+
+        first_vertical_positions = self.track_table.first_centroids[:, 1]
+        vertical_positions = centroids[:, 1]
+        countable = tracked & ~self.track_table.counted
+
+        went_up = (
+            countable
+            & (vertical_positions < line_vertical_position)
+            & (line_vertical_position <= first_vertical_positions)
+        )
+        went_down = (
+            countable
+            & (first_vertical_positions <= line_vertical_position)
+            & (line_vertical_position < vertical_positions)
+        )
+
+        # the crossings are recorded in the order of the objects
+        for index in np.flatnonzero(went_up | went_down):
+            if went_up[index]:
+                self.statistics.add_went_up(time_offset)
+            else:
+                self.statistics.add_went_down(time_offset)
+
+            if self.on_crossing is not None:
+                self.on_crossing(
+                    Detection(
+                        timestamp=time_offset,
+                        direction=Direction.UP if went_up[index] else Direction.DOWN,
+                    )
+                )
+
+        self.track_table.counted |= went_up | went_down
+
+        return object_ids, centroids
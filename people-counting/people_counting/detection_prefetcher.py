@@ -0,0 +1,138 @@
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from people_counting.common import BoundingBox
+from people_counting.model import Model
+
+
+# pylint: disable=too-few-public-methods
+class _BufferedFrame:
+    __slots__ = ("frame_number", "frame", "detections_future", "batch_index")
+
+    def __init__(self, frame_number: int, frame: np.ndarray):
+        self.frame_number = frame_number
+        self.frame = frame
+        # only filled for keyframes, once their batch has been submitted
+        self.detections_future: Optional[Future] = None
+        self.batch_index: Optional[int] = None
+
+    @property
+    def is_keyframe(self) -> bool:
+        return self.batch_index is not None
+
+    def detections(self) -> Optional[List[BoundingBox]]:
+        if self.detections_future is None:
+            return None
+
+        return self.detections_future.result()[self.batch_index]
+
+
+class KeyframeDetectionPrefetcher:
+    """
+    Run the keyframes detections ahead of the tracking loop.
+
+    Keyframes detections only depend on the frames themselves, so they can be sent in
+    batches to the detection endpoint on a background executor while the previous
+    frames are being tracked. Frames are buffered until the detections of the
+    lookahead keyframes have been submitted, and at most max_buffered_frames of them
+    are kept when the keyframes are sparse.
+    """
+
+    def __init__(
+        self,
+        model: Model,
+        lookahead_keyframes: int = 8,
+        batch_size: int = 4,
+        max_workers: int = 2,
+        max_buffered_frames: int = 256,
+    ):
+        if lookahead_keyframes < batch_size:
+            raise ValueError(
+                f"lookahead_keyframes ({lookahead_keyframes}) should be greater "
+                f"or equal to batch_size ({batch_size})"
+            )
+
+        self.model = model
+        self.lookahead_keyframes = lookahead_keyframes
+        self.batch_size = max(batch_size, 1)
+        self.max_workers = max_workers
+        self.max_buffered_frames = max(max_buffered_frames, 1)
+
+    def _submit(
+        self,
+        executor: ThreadPoolExecutor,
+        pending_keyframes: List[_BufferedFrame],
+    ):
+        if len(pending_keyframes) == 0:
+            return
+
+        detections_future = executor.submit(
+            self.model.predict_batch,
+            [buffered_frame.frame for buffered_frame in pending_keyframes],
+        )
+
+        for buffered_frame in pending_keyframes:
+            buffered_frame.detections_future = detections_future
+
+        pending_keyframes.clear()
+
+    def prefetch(
+        self,
+        frames: Iterator[Tuple[int, np.ndarray]],
+        is_keyframe: Callable[[int, np.ndarray], bool],
+    ) -> Iterator[Tuple[int, np.ndarray, Optional[List[BoundingBox]]]]:
+        """
+        Yield (frame_number, frame, detections) tuples in the order of the received
+        frames, detections being None for the frames which are not keyframes.
+        is_keyframe is called with each (frame_number, frame), in order.
+        """
+        buffered_frames: Deque[_BufferedFrame] = deque()
+        pending_keyframes: List[_BufferedFrame] = []
+        buffered_keyframes_number = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for frame_number, frame in frames:
+                buffered_frame = _BufferedFrame(frame_number=frame_number, frame=frame)
+                buffered_frames.append(buffered_frame)
+
+                if is_keyframe(frame_number, frame):
+                    buffered_frame.batch_index = len(pending_keyframes)
+                    pending_keyframes.append(buffered_frame)
+                    buffered_keyframes_number += 1
+
+                    if len(pending_keyframes) == self.batch_size:
+                        self._submit(executor, pending_keyframes)
+
+                # release the oldest frames as soon as enough keyframes are in flight
+                while (
+                    buffered_keyframes_number > self.lookahead_keyframes
+                    or len(buffered_frames) > self.max_buffered_frames
+                ):
+                    oldest_frame = buffered_frames.popleft()
+
+                    if oldest_frame.is_keyframe:
+                        buffered_keyframes_number -= 1
+
+                        # the batch of the keyframe may not be full yet
+                        if oldest_frame.detections_future is None:
+                            self._submit(executor, pending_keyframes)
+
+                    yield (
+                        oldest_frame.frame_number,
+                        oldest_frame.frame,
+                        oldest_frame.detections(),
+                    )
+
+            self._submit(executor, pending_keyframes)
+
+            while len(buffered_frames) > 0:
+                oldest_frame = buffered_frames.popleft()
+
+                yield (
+                    oldest_frame.frame_number,
+                    oldest_frame.frame,
+                    oldest_frame.detections(),
+                )
@@ -13,3 +13,5 @@ FIRESTORE_RESULTS_COLLECTION = os.environ["FIRESTORE_RESULTS_COLLECTION"]
 FIRESTORE_JOBS_COLLECTION = os.environ["FIRESTORE_JOBS_COLLECTION"]
 VIDEOS_TO_COUNT_BUCKET = os.environ["VIDEOS_TO_COUNT_BUCKET"]
 COUNTED_VIDEOS_BUCKET = os.environ["COUNTED_VIDEOS_BUCKET"]
+# local or GCS directory where the counting jobs checkpoint their runs, if given
+CHECKPOINTS_STORAGE_DIRECTORY = os.environ.get("CHECKPOINTS_STORAGE_DIRECTORY")
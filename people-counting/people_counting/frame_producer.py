@@ -0,0 +1,146 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Optional, Tuple
+
+import numpy as np
+
+# marks the end of the produced frames
+_END_OF_FRAMES = object()
+
+
+@dataclass
+class FrameProducerMetrics:
+    frames_number: int = 0
+    # sum and maximum of the queue depths observed by the consumer at each frame
+    queue_depth_sum: int = 0
+    queue_depth_max: int = 0
+    # time spent by the consumer waiting for a frame to be produced
+    consumer_stall_time: float = 0.0
+    # time spent by the producer waiting for the consumer to free the queue
+    producer_stall_time: float = 0.0
+
+    @property
+    def queue_depth_mean(self) -> float:
+        if self.frames_number == 0:
+            return 0.0
+
+        return self.queue_depth_sum / self.frames_number
+
+
+class _ProducerError:
+    # pylint: disable=too-few-public-methods
+    def __init__(self, exception: BaseException):
+        self.exception = exception
+
+
+class FrameProducer:
+    """
+    Decode and preprocess frames on a background thread, feeding a bounded queue.
+
+    OpenCV releases the GIL while decoding, color-converting and resizing, so this work
+    overlaps with the consumer loop. The bounded queue caps the memory used by the
+    frames produced in advance.
+    """
+
+    def __init__(
+        self,
+        queue_size: int = 32,
+        put_timeout: float = 0.1,
+    ):
+        self.queue_size = max(queue_size, 1)
+        self.put_timeout = put_timeout
+        self.metrics = FrameProducerMetrics()
+
+    def _produce(
+        self,
+        frames: Iterable[np.ndarray],
+        transform: Callable[[np.ndarray], np.ndarray],
+        frames_queue: queue.Queue,
+        stop_event: threading.Event,
+    ):
+        def put(item) -> bool:
+            try:
+                frames_queue.put_nowait(item)
+
+                return True
+            except queue.Full:
+                pass
+
+            # only the time blocked on a full queue is a stall
+            start_time = time.perf_counter()
+
+            try:
+                while not stop_event.is_set():
+                    try:
+                        frames_queue.put(item, timeout=self.put_timeout)
+                    except queue.Full:
+                        continue
+
+                    return True
+
+                return False
+            finally:
+                self.metrics.producer_stall_time += time.perf_counter() - start_time
+
+        try:
+            for frame_number, frame in enumerate(frames):
+                if not put((frame_number, transform(frame))):
+                    return
+        # pylint: disable=broad-exception-caught
+        except BaseException as exception:
+            put(_ProducerError(exception))
+            return
+
+        put(_END_OF_FRAMES)
+
+    def produce(
+        self,
+        frames: Iterable[np.ndarray],
+        transform: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        """
+        Yield (frame_number, transformed_frame) tuples, the frames iteration and their
+        transformation being run on a background thread.
+        """
+        self.metrics = FrameProducerMetrics()
+        frames_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        stop_event = threading.Event()
+        producer_thread = threading.Thread(
+            target=self._produce,
+            kwargs={
+                "frames": frames,
+                "transform": transform or (lambda frame: frame),
+                "frames_queue": frames_queue,
+                "stop_event": stop_event,
+            },
+            name="frame-producer",
+            daemon=True,
+        )
+        producer_thread.start()
+
+        try:
+            while True:
+                queue_depth = frames_queue.qsize()
+                start_time = time.perf_counter()
+                item = frames_queue.get()
+                self.metrics.consumer_stall_time += time.perf_counter() - start_time
+
+                if item is _END_OF_FRAMES:
+                    return
+
+                if isinstance(item, _ProducerError):
+                    raise item.exception
+
+                self.metrics.frames_number += 1
+                self.metrics.queue_depth_sum += queue_depth
+                self.metrics.queue_depth_max = max(
+                    self.metrics.queue_depth_max, queue_depth
+                )
+
+                yield item
+        finally:
+            # also reached when the consumer stops iterating before the end
+            stop_event.set()
+            producer_thread.join()
@@ -1,13 +1,19 @@
+import logging
 import os
+from functools import partial
 from typing import List, Optional
 
 from core.client.people_counting import make_results_document_id
+from core.schemas.asset import VideoAsset
 from core.schemas.people_counting import PeopleCounterAssetResultsDocument
-from core.services.asset_reader import make_asset
+from core.services.asset_reader import make_asset, make_streamed_video_asset
 from joblib import Parallel, delayed
 
+from people_counting.checkpoint import CheckpointStore, is_resume_exact
 from people_counting.config import config as cfg
 from people_counting.jobs.environment_variables import (
+    ASSETS_IDS,
+    CHECKPOINTS_STORAGE_DIRECTORY,
     COUNTED_VIDEOS_STORAGE_PATHS,
     FIRESTORE_RESULTS_COLLECTION,
     JOB_ID,
@@ -23,6 +29,55 @@ from people_counting.jobs.services import (
     create_storage_client,
 )
 from people_counting.people_counter import count_people_with_upload
+from people_counting.segment_counting import (
+    count_people_by_segments,
+    is_segment_counting_exact,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _validate_asset_id(video_storage_path: str, video_asset: VideoAsset, asset_id: str):
+    # a video read while it is downloaded is only hashed once fully downloaded
+    content_hash = (
+        video_asset.get_hash()
+        if video_asset.streamed_file is None
+        else video_asset.streamed_file.get_hash()
+    )
+
+    if content_hash != asset_id:
+        logger.warning(
+            f"The content hash of the asset {video_storage_path} ({content_hash}) "
+            f"differs from its id ({asset_id}): it is either a composite object or "
+            f"it has been modified since the job submission"
+        )
+
+
+def _is_segment_counting_enabled() -> bool:
+    if cfg.algorithm.segment_counting.enabled is not True:
+        return False
+
+    if not is_segment_counting_exact(cfg.algorithm):
+        logger.warning(
+            "Segment counting is disabled, as its statistics would differ from the "
+            "sequential ones with motion gating or with the "
+            f"{cfg.algorithm.tracker_backend} tracker backend"
+        )
+        return False
+
+    return True
+
+
+def _is_checkpointing_enabled() -> bool:
+    if not is_resume_exact(cfg.algorithm):
+        logger.warning(
+            "Checkpointing is disabled, as a resumed counting would differ from an "
+            f"uninterrupted one with the {cfg.algorithm.tracker_backend} tracker "
+            f"backend"
+        )
+        return False
+
+    return True
 
 
 def run_asset_counting(
@@ -34,10 +89,13 @@ def run_asset_counting(
     object_detection_model_name: str,
     model_instantiator_host: str,
     firestore_results_collection: str,
+    asset_id: Optional[str] = None,
+    checkpoints_storage_directory: Optional[str] = None,
 ):
     storage_client = create_storage_client()
     firestore_client = create_firestore_client()
-    people_counter = create_people_counter(
+    people_counter_factory = partial(
+        create_people_counter,
         project_id=project_id,
         region=region,
         model_instantiator_host=model_instantiator_host,
@@ -45,17 +103,68 @@ def run_asset_counting(
         config=cfg,
     )
 
-    video_asset = make_asset(
-        asset_path=video_storage_path, storage_client=storage_client
-    )
-    asset_id = video_asset.get_hash()
+    segment_counting_enabled = _is_segment_counting_enabled()
 
-    statistics = count_people_with_upload(
-        people_counter=people_counter,
-        storage_client=storage_client,
-        video_asset=video_asset,
-        counted_video_storage_path=counted_video_storage_path,
-    )
+    streamed_download_config = cfg.preprocessing.streamed_download
+    if streamed_download_config.enabled is True:
+        video_asset = make_streamed_video_asset(
+            asset_path=video_storage_path,
+            storage_client=storage_client,
+            chunk_size=streamed_download_config.chunk_bytes_number,
+            header_bytes_number=streamed_download_config.header_bytes_number,
+        )
+    else:
+        video_asset = make_asset(
+            asset_path=video_storage_path, storage_client=storage_client
+        )
+
+    try:
+        # the asset id given at the submission is kept for the results to match the job
+        if asset_id is None:
+            asset_id = video_asset.get_hash()
+
+        if counted_video_storage_path is None and segment_counting_enabled is True:
+            statistics = count_people_by_segments(
+                people_counter_factory=people_counter_factory,
+                video_asset=video_asset,
+                segments_number=cfg.algorithm.segment_counting.segments_number,
+            )
+        else:
+            checkpoint_store = None
+            # the counted video being rendered from the first frame, it is not resumable
+            if (
+                counted_video_storage_path is None
+                and checkpoints_storage_directory is not None
+                and _is_checkpointing_enabled()
+            ):
+                checkpoint_store = CheckpointStore(
+                    checkpoint_path=os.path.join(
+                        checkpoints_storage_directory, job_id, f"{asset_id}.npz"
+                    ),
+                    storage_client=storage_client,
+                )
+
+            statistics = count_people_with_upload(
+                people_counter=people_counter_factory(),
+                storage_client=storage_client,
+                video_asset=video_asset,
+                counted_video_storage_path=counted_video_storage_path,
+                checkpoint_store=checkpoint_store,
+            )
+
+            if checkpoint_store is not None:
+                checkpoint_store.delete()
+
+        _validate_asset_id(
+            video_storage_path=video_storage_path,
+            video_asset=video_asset,
+            asset_id=asset_id,
+        )
+    except Exception:
+        # the video is not downloaded any further once its counting has failed
+        if video_asset.streamed_file is not None:
+            video_asset.streamed_file.close()
+        raise
 
     people_counter_document = PeopleCounterAssetResultsDocument(
         asset_id=asset_id,
@@ -81,6 +190,8 @@ def main(
     job_id: str,
     videos_storage_paths: List[str],
     counted_videos_storage_paths: Optional[List[str]],
+    assets_ids: Optional[List[str]] = None,
+    checkpoints_storage_directory: Optional[str] = None,
 ):
     if counted_videos_storage_paths is not None:
         if len(videos_storage_paths) != len(counted_videos_storage_paths):
@@ -91,7 +202,20 @@ def main(
     else:
         counted_videos_storage_paths = [None] * len(videos_storage_paths)
 
-    return Parallel(n_jobs=os.cpu_count())(
+    if assets_ids is not None:
+        if len(videos_storage_paths) != len(assets_ids):
+            raise ValueError(
+                "If assets_ids is specified, its length should be the same as "
+                "videos_storage_paths"
+            )
+    else:
+        assets_ids = [None] * len(videos_storage_paths)
+
+    # the segments of each video being tracked in parallel processes, the videos are
+    # counted one after the other, as the nested processes would fall back to threads
+    n_jobs = 1 if _is_segment_counting_enabled() else os.cpu_count()
+
+    return Parallel(n_jobs=n_jobs)(
         delayed(run_asset_counting)(
             video_storage_path=video_storage_path,
             counted_video_storage_path=counted_video_storage_path,
@@ -101,9 +225,11 @@ def main(
             object_detection_model_name=object_detection_model_name,
             model_instantiator_host=model_instantiator_host,
             firestore_results_collection=firestore_results_collection,
+            asset_id=asset_id,
+            checkpoints_storage_directory=checkpoints_storage_directory,
         )
-        for video_storage_path, counted_video_storage_path in zip(
-            videos_storage_paths, counted_videos_storage_paths
+        for video_storage_path, counted_video_storage_path, asset_id in zip(
+            videos_storage_paths, counted_videos_storage_paths, assets_ids
         )
     )
 
@@ -118,4 +244,6 @@ if __name__ == "__main__":
         job_id=JOB_ID,
         videos_storage_paths=VIDEOS_STORAGE_PATHS,
         counted_videos_storage_paths=COUNTED_VIDEOS_STORAGE_PATHS,
+        assets_ids=ASSETS_IDS,
+        checkpoints_storage_directory=CHECKPOINTS_STORAGE_DIRECTORY,
     )
@@ -0,0 +1,76 @@
+"""
+Count the people of a live stream, logging each crossing as soon as it is counted.
+
+Usage: python -m people_counting.jobs.count_stream --source rtsp://camera/stream \
+    --project-id project --region europe-west1 --object-detection-model-name model \
+    --model-instantiator-host host
+"""
+import argparse
+import logging
+
+from core.schemas.people_counting import Detection
+
+from people_counting.common import Statistics
+from people_counting.config import config as cfg
+from people_counting.jobs.services import create_people_counter
+from people_counting.stream_counting import StreamFrameSource, count_people_in_stream
+
+logging.basicConfig(level="INFO")
+logger = logging.getLogger(__name__)
+
+
+def log_crossing(detection: Detection):
+    logger.info(f"Crossing: {detection.json()}")
+
+
+def main(
+    source: str,
+    project_id: str,
+    region: str,
+    object_detection_model_name: str,
+    model_instantiator_host: str,
+) -> Statistics:
+    stream_counting_config = cfg.stream_counting
+
+    statistics = count_people_in_stream(
+        people_counter=create_people_counter(
+            project_id=project_id,
+            region=region,
+            model_instantiator_host=model_instantiator_host,
+            object_detection_model_name=object_detection_model_name,
+            config=cfg,
+        ),
+        frame_source=StreamFrameSource(
+            source=source,
+            time_step=stream_counting_config.time_step,
+            queue_size=stream_counting_config.queue_size,
+            reconnection_delay=stream_counting_config.reconnection_delay,
+            close_timeout=stream_counting_config.close_timeout,
+        ),
+        on_crossing=log_crossing,
+    )
+
+    logger.info(
+        f"The stream {source} counted {statistics.went_up_count} people going up and "
+        f"{statistics.went_down_count} going down"
+    )
+
+    return statistics
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", type=str, required=True)
+    parser.add_argument("--project-id", type=str, required=True)
+    parser.add_argument("--region", type=str, required=True)
+    parser.add_argument("--object-detection-model-name", type=str, required=True)
+    parser.add_argument("--model-instantiator-host", type=str, required=True)
+    arguments = parser.parse_args()
+
+    main(
+        source=arguments.source,
+        project_id=arguments.project_id,
+        region=arguments.region,
+        object_detection_model_name=arguments.object_detection_model_name,
+        model_instantiator_host=arguments.model_instantiator_host,
+    )
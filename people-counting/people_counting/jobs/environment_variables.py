@@ -9,10 +9,15 @@ FIRESTORE_RESULTS_COLLECTION = os.environ["FIRESTORE_RESULTS_COLLECTION"]
 
 JOB_ID = os.environ["JOB_ID"]
 VIDEOS_STORAGE_PATHS = os.environ["VIDEOS_STORAGE_PATHS"]
+# the assets ids computed from the storage metadata when the job was submitted
+ASSETS_IDS = os.environ.get("ASSETS_IDS")
 COUNTED_VIDEOS_STORAGE_PATHS = os.environ.get("COUNTED_VIDEOS_STORAGE_PATHS")
+# local or GCS directory where the counting runs are checkpointed, if given
+CHECKPOINTS_STORAGE_DIRECTORY = os.environ.get("CHECKPOINTS_STORAGE_DIRECTORY")
 
 # deserialization
 VIDEOS_STORAGE_PATHS = VIDEOS_STORAGE_PATHS.split()
+ASSETS_IDS = None if ASSETS_IDS is None else ASSETS_IDS.split()
 COUNTED_VIDEOS_STORAGE_PATHS = (
     None
     if COUNTED_VIDEOS_STORAGE_PATHS is None
@@ -1,8 +1,13 @@
+from typing import Optional
+
 from core.client.model_instantiator import ModelInstantiatorClient
 from core.client.object_detection import ObjectDetectionClient
 from core.google.firestore_client import FirestoreClient
 from core.google.storage_client import StorageClient
 from core.google.vertex_ai_manager import VertexAIManager
+from core.services.batch_size_controller import BatchSizeController
+from core.services.detection_cache import DetectionCache
+from core.services.frame_cache import FRAME_CACHE_DIRECTORY, FrameCache
 from omegaconf import DictConfig
 
 from people_counting.people_counter import PeopleCounter
@@ -13,6 +18,10 @@ def create_object_detection_client(
     region: str,
     model_instantiator_host: str,
     object_detection_model_name: str,
+    max_concurrent_requests: int = 4,
+    detection_cache: Optional[DetectionCache] = None,
+    overridden_image_width: Optional[int] = None,
+    batch_size_controller: Optional[BatchSizeController] = None,
 ) -> ObjectDetectionClient:
     return ObjectDetectionClient(
         vertex_ai_manager=VertexAIManager(
@@ -23,6 +32,10 @@ def create_object_detection_client(
             host=model_instantiator_host,
         ),
         model_name=object_detection_model_name,
+        max_concurrent_requests=max_concurrent_requests,
+        detection_cache=detection_cache,
+        overridden_image_width=overridden_image_width,
+        batch_size_controller=batch_size_controller,
     )
 
 
@@ -33,11 +46,29 @@ def create_people_counter(
     object_detection_model_name: str,
     config: DictConfig,
 ) -> PeopleCounter:
+    detection_cache_config = config.object_detection.detection_cache
+    batch_size_control_config = config.object_detection.batch_size_control
     object_detection_client = create_object_detection_client(
         project_id=project_id,
         region=region,
         model_instantiator_host=model_instantiator_host,
         object_detection_model_name=object_detection_model_name,
+        max_concurrent_requests=config.object_detection.max_concurrent_requests,
+        detection_cache=(
+            DetectionCache(
+                max_bytes_number=detection_cache_config.max_bytes_number,
+                cache_directory=detection_cache_config.directory,
+                max_disk_bytes_number=detection_cache_config.max_disk_bytes_number,
+            )
+            if detection_cache_config.enabled is True
+            else None
+        ),
+        overridden_image_width=config.object_detection.overridden_image_width,
+        batch_size_controller=BatchSizeController(
+            initial_batch_size=batch_size_control_config.initial_batch_size,
+            max_batch_size=batch_size_control_config.max_batch_size,
+            latency_target=batch_size_control_config.latency_target,
+        ),
     )
 
     return PeopleCounter(
@@ -46,6 +77,17 @@ def create_people_counter(
         algorithm_config=config.algorithm,
         image_width=config.preprocessing.image_width,
         video_outputs_directory=config.paths.outputs_directory,
+        frame_queue_size=config.preprocessing.frame_queue_size,
+        video_reader_backend=config.preprocessing.video_reader_backend,
+        frame_cache=(
+            FrameCache(
+                cache_directory=config.preprocessing.frame_cache.directory
+                or FRAME_CACHE_DIRECTORY,
+                max_bytes_number=config.preprocessing.frame_cache.max_bytes_number,
+            )
+            if config.preprocessing.frame_cache.enabled is True
+            else None
+        ),
     )
 
 
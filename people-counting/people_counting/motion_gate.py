@@ -0,0 +1,80 @@
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+
+
+class MotionGate:
+    """
+    Decide which frames are sent to detection, from the changes since the last
+    detected frame measured by frame differencing at a reduced resolution.
+
+    A keyframe is only detected if the frame changed since the last detection:
+    otherwise the people standing in the scene, if any, keep being followed by the
+    correlation trackers. When a change appears after a skipped keyframe, the frame
+    is detected right away instead of waiting for the next keyframe. The decision
+    only depends on the frames, so the detections can still be prefetched.
+    """
+
+    def __init__(
+        self,
+        inference_periodicity: int,
+        width: int = 64,
+        pixel_threshold: int = 25,
+        motion_ratio_threshold: float = 0.002,
+    ):
+        self.inference_periodicity = inference_periodicity
+        self.width = width
+        # minimum difference of a pixel value for the pixel to be considered changed
+        self.pixel_threshold = pixel_threshold
+        # minimum ratio of changed pixels for the frame to be considered changed
+        self.motion_ratio_threshold = motion_ratio_threshold
+
+        self.detected_frames_number = 0
+        self.skipped_keyframes_number = 0
+
+        # downscaled version of the last detected frame
+        self._reference_frame: Optional[np.ndarray] = None
+        self._keyframe_skipped = False
+
+    def _downscale(self, frame: np.ndarray) -> np.ndarray:
+        height = max(round(frame.shape[0] * self.width / frame.shape[1]), 1)
+        frame = cv.resize(frame, (self.width, height), interpolation=cv.INTER_AREA)
+
+        if frame.ndim == 3:
+            frame = cv.cvtColor(frame, cv.COLOR_RGB2GRAY)
+
+        return cv.GaussianBlur(frame, (5, 5), 0)
+
+    def _has_changed(self, downscaled_frame: np.ndarray) -> bool:
+        if self._reference_frame is None:
+            return True
+
+        changed_pixels_ratio = np.count_nonzero(
+            cv.absdiff(downscaled_frame, self._reference_frame) > self.pixel_threshold
+        ) / float(downscaled_frame.size)
+
+        return changed_pixels_ratio >= self.motion_ratio_threshold
+
+    def __call__(self, frame_number: int, frame: np.ndarray) -> bool:
+        """Return whether the frame should be detected, frames being given in order"""
+        is_keyframe = frame_number % self.inference_periodicity == 0
+
+        # the frame is only compared when it may be detected
+        if not is_keyframe and not self._keyframe_skipped:
+            return False
+
+        downscaled_frame = self._downscale(frame)
+
+        if self._has_changed(downscaled_frame):
+            self.detected_frames_number += 1
+            self._reference_frame = downscaled_frame
+            self._keyframe_skipped = False
+
+            return True
+
+        if is_keyframe:
+            self.skipped_keyframes_number += 1
+            self._keyframe_skipped = True
+
+        return False
@@ -0,0 +1,197 @@
+import multiprocessing
+import os
+from multiprocessing.connection import Connection
+from multiprocessing.sharedctypes import RawArray
+from typing import List, Optional, Tuple
+
+import dlib
+import numpy as np
+
+from people_counting.tracker_backends import TrackerBackend
+
+
+def _start_trackers(
+    frame: np.ndarray, bounding_boxes: np.ndarray
+) -> List[dlib.correlation_tracker]:
+    trackers = []
+
+    for x_min, y_min, x_max, y_max in bounding_boxes:
+        tracker = dlib.correlation_tracker()
+        tracker.start_track(
+            frame, dlib.rectangle(int(x_min), int(y_min), int(x_max), int(y_max))
+        )
+        trackers.append(tracker)
+
+    return trackers
+
+
+def _update_trackers(
+    trackers: List[dlib.correlation_tracker], frame: np.ndarray
+) -> np.ndarray:
+    bounding_boxes = np.zeros((len(trackers), 4), dtype=int)
+
+    for index, tracker in enumerate(trackers):
+        tracker.update(frame)
+        position = tracker.get_position()
+        bounding_boxes[index] = (
+            position.left(),
+            position.top(),
+            position.right(),
+            position.bottom(),
+        )
+
+    return bounding_boxes
+
+
+def _frame_view(frame_buffer: RawArray, shape: Tuple[int, ...]) -> np.ndarray:
+    return np.frombuffer(frame_buffer, dtype=np.uint8)[: np.prod(shape)].reshape(shape)
+
+
+def _tracking_worker(connection: Connection, frame_buffer: RawArray):
+    """Own a group of trackers, reading the frames from the shared frame buffer"""
+    trackers: List[dlib.correlation_tracker] = []
+
+    while True:
+        command, shape, bounding_boxes = connection.recv()
+
+        if command == "start":
+            trackers = _start_trackers(_frame_view(frame_buffer, shape), bounding_boxes)
+            connection.send(None)
+
+        elif command == "update":
+            connection.send(
+                _update_trackers(trackers, _frame_view(frame_buffer, shape))
+            )
+
+        else:
+            return
+
+
+class MultiTracker(TrackerBackend):
+    """
+    Own the correlation trackers of every tracked person and update them together.
+
+    dlib holds the GIL while updating a tracker, so the trackers are split into groups
+    owned by persistent worker processes. The frame is converted once per frame to the
+    contiguous uint8 layout expected by dlib, directly into a buffer shared with the
+    workers. Trackers are kept in the current process when there are not enough of
+    them to make up for the inter-process communication.
+    """
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        min_trackers_per_worker: int = 4,
+    ):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.min_trackers_per_worker = max(min_trackers_per_worker, 1)
+        # used when the trackers are kept in the current process
+        self.trackers: List[dlib.correlation_tracker] = []
+        # number of trackers owned by each active worker, in the trackers order
+        self.workers_trackers_numbers: List[int] = []
+
+        self._frame_buffer: Optional[RawArray] = None
+        self._workers: List[multiprocessing.Process] = []
+        self._connections: List[Connection] = []
+
+    def __len__(self) -> int:
+        return len(self.trackers) + sum(self.workers_trackers_numbers)
+
+    def _spawn_workers(self, frame_bytes_number: int):
+        self.close()
+
+        context = multiprocessing.get_context("spawn")
+        self._frame_buffer = RawArray("B", frame_bytes_number)
+
+        for _ in range(self.max_workers):
+            parent_connection, child_connection = context.Pipe()
+            worker = context.Process(
+                target=_tracking_worker,
+                args=(child_connection, self._frame_buffer),
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+            self._connections.append(parent_connection)
+
+    def _share_frame(self, frame: np.ndarray) -> Tuple[int, ...]:
+        if len(self._frame_buffer) < frame.size:
+            raise ValueError(
+                f"The frame of shape {frame.shape} does not fit in the shared buffer "
+                f"of the frame the trackers were started with"
+            )
+
+        # the conversion to uint8 happens here, once for all the workers
+        _frame_view(self._frame_buffer, frame.shape)[...] = frame
+
+        return frame.shape
+
+    def start(self, frame: np.ndarray, bounding_boxes: np.ndarray):
+        """
+        Replace the current trackers with new ones, starting from the (N, 4)
+        bounding boxes array whose columns are x_min, y_min, x_max, y_max.
+        """
+        bounding_boxes = np.asarray(bounding_boxes, dtype=int).reshape(-1, 4)
+        workers_number = min(
+            self.max_workers, len(bounding_boxes) // self.min_trackers_per_worker
+        )
+
+        if workers_number <= 1:
+            self.workers_trackers_numbers = []
+            self.trackers = _start_trackers(
+                np.ascontiguousarray(frame, dtype=np.uint8), bounding_boxes
+            )
+            return
+
+        if self._frame_buffer is None or len(self._frame_buffer) < frame.size:
+            self._spawn_workers(frame_bytes_number=frame.size)
+
+        shape = self._share_frame(frame)
+        workers_bounding_boxes = np.array_split(bounding_boxes, workers_number)
+
+        for connection, worker_bounding_boxes in zip(
+            self._connections, workers_bounding_boxes
+        ):
+            connection.send(("start", shape, worker_bounding_boxes))
+
+        for connection in self._connections[:workers_number]:
+            connection.recv()
+
+        self.trackers = []
+        self.workers_trackers_numbers = [
+            len(worker_bounding_boxes)
+            for worker_bounding_boxes in workers_bounding_boxes
+        ]
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Update every tracker with the given frame and return their positions as a
+        (N, 4) array whose columns are x_min, y_min, x_max, y_max.
+        """
+        if len(self.workers_trackers_numbers) == 0:
+            return _update_trackers(
+                self.trackers, np.ascontiguousarray(frame, dtype=np.uint8)
+            )
+
+        shape = self._share_frame(frame)
+        active_connections = self._connections[: len(self.workers_trackers_numbers)]
+
+        for connection in active_connections:
+            connection.send(("update", shape, None))
+
+        return np.concatenate(
+            [connection.recv() for connection in active_connections]
+        ).reshape(-1, 4)
+
+    def close(self):
+        for connection in self._connections:
+            connection.send(("close", None, None))
+            connection.close()
+
+        for worker in self._workers:
+            worker.join()
+
+        self._frame_buffer = None
+        self._workers = []
+        self._connections = []
+        self.workers_trackers_numbers = []
@@ -1,23 +1,42 @@
 import logging
 import os
 import tempfile
-from typing import Dict, List, Optional
+from collections import deque
+from typing import Callable, Deque, Iterator, List, Optional, Tuple
 
-import dlib
+import numpy as np
 from core.client.object_detection import ObjectDetectionClient
 from core.google.storage_client import StorageClient
 from core.path import GSPath
-from core.schemas.asset import VideoAsset
+from core.schemas.asset import VideoAsset, VideoReaderBackend
+from core.schemas.people_counting import Detection
+from core.services.frame_cache import FrameCache
 from core.timing import TimingMeta
 from core.tools import extract_file_extension
 from imutils import resize
 from omegaconf import DictConfig
 
 from people_counting.centroid_tracker import CentroidTracker
-from people_counting.common import BoundingBox, Statistics, Status
-from people_counting.config import config
+from people_counting.checkpoint import CheckpointStore
+from people_counting.common import (
+    BoundingBox,
+    Statistics,
+    Status,
+    bounding_boxes_from_array,
+    bounding_boxes_to_array,
+)
+from people_counting.crossing_counter import CrossingCounter
+from people_counting.detection_prefetcher import KeyframeDetectionPrefetcher
+from people_counting.frame_producer import FrameProducer
 from people_counting.model import Model
-from people_counting.trackable_object import TrackableObject
+from people_counting.motion_gate import MotionGate
+from people_counting.multi_tracker import MultiTracker
+from people_counting.tracker_backends import (
+    KalmanTracker,
+    OpticalFlowTracker,
+    TrackerBackend,
+    TrackerBackendName,
+)
 from people_counting.video_renderer import VideoRenderer
 
 logger = logging.getLogger(__name__)
@@ -31,6 +50,9 @@ class PeopleCounter(metaclass=TimingMeta):
         image_width: int,
         confidence_threshold: float,
         video_outputs_directory: Optional[str] = None,
+        frame_queue_size: Optional[int] = None,
+        video_reader_backend: VideoReaderBackend = VideoReaderBackend.OPENCV,
+        frame_cache: Optional[FrameCache] = None,
     ):
         self.model = Model(
             object_detection_client=object_detection_client,
@@ -39,21 +61,323 @@ class PeopleCounter(metaclass=TimingMeta):
         self.algorithm_config = algorithm_config
         self.image_width = image_width
         self.video_outputs_directory = video_outputs_directory
+        self.video_reader_backend = VideoReaderBackend(video_reader_backend)
+        # the preprocessed frames are read from and written to this cache if given
+        self.frame_cache = frame_cache
+
+        # decoding and resizing are run on a background thread if a queue size is given
+        self.frame_producer: Optional[FrameProducer] = (
+            FrameProducer(queue_size=frame_queue_size)
+            if frame_queue_size is not None
+            else None
+        )
+
+        self.detection_prefetcher: Optional[KeyframeDetectionPrefetcher] = None
+        if self.algorithm_config.detection_prefetching.enabled is True:
+            self.detection_prefetcher = KeyframeDetectionPrefetcher(
+                model=self.model,
+                lookahead_keyframes=(
+                    self.algorithm_config.detection_prefetching.lookahead_keyframes
+                ),
+                batch_size=self.algorithm_config.detection_prefetching.batch_size,
+                max_workers=self.algorithm_config.detection_prefetching.max_workers,
+                max_buffered_frames=(
+                    self.algorithm_config.detection_prefetching.lookahead_keyframes
+                    * self.algorithm_config.inference_periodicity
+                ),
+            )
 
         if self.video_outputs_directory is not None:
             os.makedirs(video_outputs_directory, exist_ok=True)
 
-    # pylint: disable=too-many-branches,too-many-locals,too-many-statements
+    def _is_keyframe(self, frame_number: int) -> bool:
+        return frame_number % self.algorithm_config.inference_periodicity == 0
+
+    def _is_checkpoint(self, frame_number: int) -> bool:
+        return (
+            frame_number
+            % (
+                self.algorithm_config.inference_periodicity
+                * self.algorithm_config.checkpointing.keyframes_interval
+            )
+            == 0
+        )
+
+    def _resize(self, frame: np.ndarray) -> np.ndarray:
+        if frame.shape[1] == self.image_width:
+            return frame
+
+        return resize(frame, width=self.image_width)
+
+    def _iterate_frames(
+        self,
+        video_asset: VideoAsset,
+        start_index: int = 0,
+        stop_index: Optional[int] = None,
+    ) -> Iterator[Tuple[int, np.ndarray]]:
+        # the frames are resized by the video reader, which may decode them directly
+        # at the image width
+        frames = video_asset.get_frames(
+            start_index=start_index,
+            stop_index=stop_index,
+            width=self.image_width,
+            reader_backend=self.video_reader_backend,
+            frame_cache=self.frame_cache,
+        )
+
+        if self.frame_producer is not None:
+            for frame_number, frame in self.frame_producer.produce(
+                frames=frames, transform=self._resize
+            ):
+                yield start_index + frame_number, frame
+
+            metrics = self.frame_producer.metrics
+            logger.info(
+                f"Frame producer metrics: {metrics.frames_number} frames, "
+                f"mean queue depth {metrics.queue_depth_mean:.1f}, "
+                f"max queue depth {metrics.queue_depth_max}, "
+                f"consumer stall time {metrics.consumer_stall_time:.2f}s, "
+                f"producer stall time {metrics.producer_stall_time:.2f}s"
+            )
+        else:
+            for frame_number, frame in enumerate(frames, start=start_index):
+                yield frame_number, self._resize(frame)
+
+        if self.frame_cache is not None:
+            logger.info(
+                f"Frame cache: {self.frame_cache.hits_number} hits, "
+                f"{self.frame_cache.misses_number} misses"
+            )
+
+    def _create_detection_gate(self) -> Callable[[int, np.ndarray], bool]:
+        """
+        Return the function deciding whether a frame is detected, which is given the
+        frames in order
+        """
+        motion_gating_config = self.algorithm_config.motion_gating
+
+        if motion_gating_config.enabled is True:
+            return MotionGate(
+                inference_periodicity=self.algorithm_config.inference_periodicity,
+                width=motion_gating_config.width,
+                pixel_threshold=motion_gating_config.pixel_threshold,
+                motion_ratio_threshold=motion_gating_config.motion_ratio_threshold,
+            )
+
+        return lambda frame_number, _: self._is_keyframe(frame_number)
+
+    def _detect(
+        self,
+        frames: Iterator[Tuple[int, np.ndarray]],
+        enable_detection_prefetching: bool = True,
+    ) -> Iterator[Tuple[int, np.ndarray, Optional[List[BoundingBox]]]]:
+        """
+        Yield (frame_number, frame, detections) tuples, detections being None for the
+        frames which are not detected.
+        """
+        is_detected = self._create_detection_gate()
+
+        if self.detection_prefetcher is not None and enable_detection_prefetching:
+            yield from self.detection_prefetcher.prefetch(
+                frames=frames, is_keyframe=is_detected
+            )
+
+        else:
+            for frame_number, frame in frames:
+                detections = (
+                    self.model.predict(frame)
+                    if is_detected(frame_number, frame)
+                    else None
+                )
+
+                yield frame_number, frame, detections
+
+        operating_point = (
+            self.model.object_detection_client.batch_size_controller.operating_point
+        )
+        logger.info(
+            f"Object detection batch size: {operating_point.batch_size}, "
+            f"{operating_point.requests_number} requests at this size, "
+            f"failure rate {operating_point.failure_rate:.2f}"
+        )
+
+        detection_cache = self.model.object_detection_client.detection_cache
+        if detection_cache is not None:
+            logger.info(
+                f"Detection cache: {detection_cache.hits_number} hits, "
+                f"{detection_cache.misses_number} misses, "
+                f"hit ratio {detection_cache.hit_ratio:.2f}, "
+                f"saved latency {detection_cache.saved_latency:.2f}s"
+            )
+
+        if isinstance(is_detected, MotionGate):
+            logger.info(
+                f"Motion gating: {is_detected.detected_frames_number} frames detected, "
+                f"{is_detected.skipped_keyframes_number} keyframes skipped"
+            )
+
+    def _create_tracker_backend(
+        self, tracker_max_workers: Optional[int] = None
+    ) -> TrackerBackend:
+        tracker_backend_name = TrackerBackendName(self.algorithm_config.tracker_backend)
+
+        if tracker_backend_name == TrackerBackendName.KALMAN:
+            return KalmanTracker(
+                max_distance_height_ratio=(
+                    self.algorithm_config.centroid_tracker.max_distance_height_ratio
+                )
+            )
+
+        if tracker_backend_name == TrackerBackendName.OPTICAL_FLOW:
+            return OpticalFlowTracker()
+
+        return MultiTracker(
+            max_workers=(
+                tracker_max_workers or self.algorithm_config.multi_tracker.max_workers
+            ),
+            min_trackers_per_worker=(
+                self.algorithm_config.multi_tracker.min_trackers_per_worker
+            ),
+        )
+
+    def _get_counting_band(self, frame_height: int) -> Tuple[int, int]:
+        """
+        Return the (top, bottom) rows of the band around the line where the objects
+        are detected and tracked, the whole frame if the counting band is disabled
+        """
+        counting_band_config = self.algorithm_config.counting_band
+
+        if counting_band_config.enabled is not True:
+            return 0, frame_height
+
+        line_vertical_position = int(
+            self.algorithm_config.line_placement_ratio * frame_height
+        )
+        half_band_height = int(counting_band_config.height_ratio * frame_height / 2)
+
+        return (
+            max(line_vertical_position - half_band_height, 0),
+            min(line_vertical_position + half_band_height, frame_height),
+        )
+
+    def track_frames(
+        self,
+        frames: Iterator[Tuple[int, np.ndarray]],
+        enable_detection_prefetching: bool = True,
+        tracker_max_workers: Optional[int] = None,
+    ) -> Iterator[Tuple[int, np.ndarray, Status, np.ndarray]]:
+        """
+        Yield (frame_number, frame, status, bounding_boxes) tuples from the
+        (frame_number, resized_frame) tuples, bounding_boxes being a (N, 4) array.
+
+        The trackers are restarted from the detections at each keyframe, so with the
+        correlation trackers the bounding boxes only depend on the frames since the
+        last keyframe. Detection prefetching reads the frames ahead of the tracking,
+        it should be disabled when the latency of each frame matters.
+
+        With the counting band enabled, only the band of the frames around the line
+        is detected and tracked, the bounding boxes being mapped back to the frame.
+        """
+        tracker_backend = self._create_tracker_backend(
+            tracker_max_workers=tracker_max_workers
+        )
+        # full frames of the cropped frames being detected, in order
+        full_frames: Deque[np.ndarray] = deque()
+
+        def cropped_frames() -> Iterator[Tuple[int, np.ndarray]]:
+            for frame_number, frame in frames:
+                full_frames.append(frame)
+                top, bottom = self._get_counting_band(frame.shape[0])
+
+                yield frame_number, frame[top:bottom]
+
+        try:
+            for frame_number, cropped_frame, detections in self._detect(
+                cropped_frames(),
+                enable_detection_prefetching=enable_detection_prefetching,
+            ):
+                frame = full_frames.popleft()
+
+                if detections is not None:
+                    status = Status.DETECTING
+                    bounding_boxes = bounding_boxes_to_array(detections)
+                    tracker_backend.start(cropped_frame, bounding_boxes)
+
+                else:
+                    status = Status.TRACKING
+                    bounding_boxes = tracker_backend.update(cropped_frame)
+
+                top, _ = self._get_counting_band(frame.shape[0])
+                bounding_boxes[:, [1, 3]] += top
+
+                yield frame_number, frame, status, bounding_boxes
+        finally:
+            tracker_backend.close()
+
+    def track(
+        self,
+        video_asset: VideoAsset,
+        start_index: int = 0,
+        stop_index: Optional[int] = None,
+        tracker_max_workers: Optional[int] = None,
+    ) -> Iterator[Tuple[int, np.ndarray, Status, np.ndarray]]:
+        """
+        Track the sampled frames of the video from start_index (included) to
+        stop_index (excluded), start_index being expected to be a keyframe.
+
+        tracker_max_workers overrides the number of worker processes of the
+        correlation trackers given by the config.
+        """
+        if not self._is_keyframe(start_index):
+            raise ValueError(f"The start index {start_index} is not a keyframe")
+
+        return self.track_frames(
+            self._iterate_frames(
+                video_asset, start_index=start_index, stop_index=stop_index
+            ),
+            tracker_max_workers=tracker_max_workers,
+        )
+
+    def create_crossing_counter(
+        self,
+        frame_height: int,
+        frame_width: int,
+        on_crossing: Optional[Callable[[Detection], None]] = None,
+    ) -> CrossingCounter:
+        """
+        Create a crossing counter for the frames of the given size, before resizing
+        """
+        return CrossingCounter(
+            centroid_tracker=CentroidTracker(
+                max_disappeared=self.algorithm_config.centroid_tracker.max_disappeared,
+                max_distance=frame_height
+                / frame_width
+                * self.image_width
+                * self.algorithm_config.centroid_tracker.max_distance_height_ratio,
+                matching=self.algorithm_config.centroid_tracker.matching,
+            ),
+            line_placement_ratio=self.algorithm_config.line_placement_ratio,
+            trajectory_history_size=self.algorithm_config.trajectory_history_size,
+            on_crossing=on_crossing,
+        )
+
     def run(
         self,
         video_asset: VideoAsset,
         video_output_path: Optional[str] = None,
         enable_video_showing: bool = False,
         video_is_rgb_color: bool = True,
+        checkpoint_store: Optional[CheckpointStore] = None,
     ) -> Statistics:
         enable_video_writing = video_output_path is not None
         video_rendering_enabled = enable_video_writing or enable_video_showing
 
+        if checkpoint_store is not None and video_rendering_enabled is True:
+            raise ValueError(
+                "Checkpointing is not supported while rendering the video, the "
+                "rendered video would miss the frames before the checkpoint"
+            )
+
         video_renderer = None
         if video_rendering_enabled is True:
             video_renderer = VideoRenderer(
@@ -64,100 +388,50 @@ class PeopleCounter(metaclass=TimingMeta):
                 enable_video_showing=enable_video_showing,
             )
 
-        centroid_tracker = CentroidTracker(
-            max_disappeared=self.algorithm_config.centroid_tracker.max_disappeared,
-            max_distance=video_asset.asset_meta.height
-            / video_asset.asset_meta.width
-            * self.image_width
-            * self.algorithm_config.centroid_tracker.max_distance_height_ratio,
+        crossing_counter = self.create_crossing_counter(
+            frame_height=video_asset.asset_meta.height,
+            frame_width=video_asset.asset_meta.width,
         )
 
-        statistics = Statistics()
-        trackable_objects: Dict[int, TrackableObject] = {}
-        trackers: List[dlib.correlation_tracker] = []
-
-        for frame_number, frame in enumerate(video_asset.content):
-            time_offset = frame_number * video_asset.time_step
-            frame = resize(frame, width=self.image_width)
-            drawn_frame = frame.copy()
-
-            if frame_number % self.algorithm_config.inference_periodicity == 0:
-                status = Status.DETECTING
-                bounding_boxes = self.model.predict(frame)
-
-                trackers: List[dlib.correlation_tracker] = []
+        start_index = 0
+        if checkpoint_store is not None:
+            start_index = checkpoint_store.load(crossing_counter)
 
-                for bounding_box in bounding_boxes:
-                    tracker = dlib.correlation_tracker()
-                    rectangle = dlib.rectangle(
-                        bounding_box.x_min,
-                        bounding_box.y_min,
-                        bounding_box.x_max,
-                        bounding_box.y_max,
-                    )
-                    tracker.start_track(frame, rectangle)
-                    trackers.append(tracker)
-
-                    if video_rendering_enabled:
-                        drawn_frame = video_renderer.draw_bounding_box(
-                            drawn_frame, bounding_box
-                        )
-
-            else:
-                status = Status.TRACKING
-                bounding_boxes: List[BoundingBox] = []
-
-                for tracker in trackers:
-                    tracker.update(frame)
-                    tracker_position = tracker.get_position()
-                    bounding_box = BoundingBox(
-                        x_min=tracker_position.left(),
-                        y_min=tracker_position.top(),
-                        x_max=tracker_position.right(),
-                        y_max=tracker_position.bottom(),
-                    )
-                    bounding_boxes.append(bounding_box)
-
-                    if video_rendering_enabled:
-                        drawn_frame = video_renderer.draw_bounding_box(
-                            drawn_frame, bounding_box
-                        )
-
-            line_vertical_position = int(
-                config.algorithm.line_placement_ratio * frame.shape[0]
+        is_checkpoint_due = False
+        for frame_number, frame, status, bounding_boxes in self.track(
+            video_asset, start_index=start_index
+        ):
+            is_checkpoint_due = is_checkpoint_due or (
+                frame_number > start_index and self._is_checkpoint(frame_number)
             )
 
-            objects = centroid_tracker.update(bounding_boxes)
+            # the checkpoints are taken on the detected keyframes, from which the
+            # trackers and the motion gate restart as they do when resuming, a
+            # checkpoint on a keyframe skipped by the motion gate being postponed
+            if (
+                checkpoint_store is not None
+                and is_checkpoint_due
+                and status == Status.DETECTING
+                and self._is_keyframe(frame_number)
+            ):
+                checkpoint_store.save(frame_number, crossing_counter)
+                is_checkpoint_due = False
+
+            object_ids, centroids = crossing_counter.update(
+                bounding_boxes=bounding_boxes,
+                frame_height=frame.shape[0],
+                time_offset=frame_number * video_asset.time_step,
+            )
 
-            for object_id, centroid in objects.items():
-                tracked_object = trackable_objects.get(object_id)
+            if video_rendering_enabled is True:
+                drawn_frame = frame.copy()
 
-                if tracked_object is None:
-                    tracked_object = TrackableObject(object_id, centroid)
+                for bounding_box in bounding_boxes_from_array(bounding_boxes):
+                    drawn_frame = video_renderer.draw_bounding_box(
+                        drawn_frame, bounding_box
+                    )
 
-                else:
-                    tracked_object.centroids.append(centroid)
-
-                    if not tracked_object.counted:
-                        if (
-                            centroid[1]
-                            < line_vertical_position
-                            <= tracked_object.centroids[0][1]
-                        ):
-                            statistics.add_went_up(time_offset)
-                            tracked_object.counted = True
-
-                        elif (
-                            tracked_object.centroids[0][1]
-                            <= line_vertical_position
-                            < centroid[1]
-                        ):
-                            statistics.add_went_down(time_offset)
-                            tracked_object.counted = True
-
-                trackable_objects[object_id] = tracked_object
-
-                if video_rendering_enabled is True:
+                for object_id, centroid in zip(object_ids.tolist(), centroids):
                     drawn_frame = video_renderer.draw_object_id(
                         frame=drawn_frame,
                         object_id=object_id,
@@ -165,16 +439,15 @@ class PeopleCounter(metaclass=TimingMeta):
                         centroid_y=centroid[1],
                     )
 
-            if video_rendering_enabled is True:
                 drawn_frame = video_renderer.draw_statistics_on_frame(
                     frame=drawn_frame,
-                    statistics=statistics,
+                    statistics=crossing_counter.statistics,
                     status=status,
                     frame_number=frame_number,
                 )
                 video_renderer.render(drawn_frame, to_bgr=video_is_rgb_color)
 
-        return statistics
+        return crossing_counter.statistics
 
 
 # todo: this method should maybe placed elsewhere as it uses gcloud notions that are
@@ -184,6 +457,7 @@ def count_people_with_upload(
     storage_client: StorageClient,
     video_asset: VideoAsset,
     counted_video_storage_path: Optional[GSPath],
+    checkpoint_store: Optional[CheckpointStore] = None,
 ) -> Statistics:
     if counted_video_storage_path is not None:
         extension = extract_file_extension(video_asset.asset_path)
@@ -209,6 +483,7 @@ def count_people_with_upload(
 
     statistics = people_counter.run(
         video_asset=video_asset,
+        checkpoint_store=checkpoint_store,
     )
 
     return statistics
@@ -0,0 +1,162 @@
+import logging
+import os
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+from core.schemas.asset import VideoAsset
+from joblib import Parallel, delayed
+from omegaconf import DictConfig
+
+from people_counting.common import Statistics
+from people_counting.people_counter import PeopleCounter
+from people_counting.tracker_backends import TrackerBackendName
+
+logger = logging.getLogger(__name__)
+
+# (frame_number, frame_height, bounding_boxes) of a tracked frame
+TrackedFrame = Tuple[int, int, np.ndarray]
+
+
+def compute_segments(
+    frames_number: int, inference_periodicity: int, segments_number: int
+) -> List[Tuple[int, int]]:
+    """
+    Split the sampled frames into at most segments_number contiguous
+    (start_index, stop_index) segments, whose boundaries are keyframes.
+
+    The correlation trackers are restarted at each keyframe, so a segment starting on
+    a keyframe is tracked exactly as it would be in a sequential run: the segments
+    do not need to overlap. This only holds under the conditions of
+    is_segment_counting_exact.
+    """
+    keyframes_number = -(-frames_number // inference_periodicity)
+    segments_number = max(min(segments_number, keyframes_number), 1)
+
+    boundaries = [
+        int(keyframes_boundary) * inference_periodicity
+        for keyframes_boundary in np.linspace(
+            0, keyframes_number, segments_number + 1
+        ).round()
+    ]
+    boundaries[-1] = frames_number
+
+    return [
+        (start_index, stop_index)
+        for start_index, stop_index in zip(boundaries[:-1], boundaries[1:])
+        if start_index < stop_index
+    ]
+
+
+def is_segment_counting_exact(algorithm_config: DictConfig) -> bool:
+    """
+    Whether the segments are tracked exactly as in a sequential run, which requires
+    the correlation trackers without motion gating: the motion gate compares the
+    frames with the last detected one, and the other tracker backends keep a state
+    across the keyframes, both being reset at the start of each segment
+    """
+    return algorithm_config.motion_gating.enabled is not True and (
+        TrackerBackendName(algorithm_config.tracker_backend) == TrackerBackendName.DLIB
+    )
+
+
+def compute_tracker_max_workers(
+    segments_number: int, max_workers: Optional[int] = None
+) -> int:
+    """
+    Share the CPUs between the correlation trackers of the segments tracked in
+    parallel, so that they do not spawn the number of CPUs of worker processes each
+    """
+    cpus_number = os.cpu_count() or 1
+    segment_max_workers = max(cpus_number // max(segments_number, 1), 1)
+
+    if max_workers is not None:
+        segment_max_workers = min(segment_max_workers, max_workers)
+
+    return segment_max_workers
+
+
+def _track_segment(
+    people_counter_factory: Callable[[], PeopleCounter],
+    video_asset: VideoAsset,
+    start_index: int,
+    stop_index: int,
+    tracker_max_workers: int,
+) -> List[TrackedFrame]:
+    people_counter = people_counter_factory()
+
+    return [
+        (frame_number, frame.shape[0], bounding_boxes)
+        for frame_number, frame, _, bounding_boxes in people_counter.track(
+            video_asset,
+            start_index=start_index,
+            stop_index=stop_index,
+            tracker_max_workers=tracker_max_workers,
+        )
+    ]
+
+
+def count_people_by_segments(
+    people_counter_factory: Callable[[], PeopleCounter],
+    video_asset: VideoAsset,
+    segments_number: Optional[int] = None,
+) -> Statistics:
+    """
+    Count the people of the video by tracking its segments in parallel processes.
+
+    Detection, decoding and correlation tracking, which make up for most of the
+    running time, are run independently on each segment. The tracked bounding boxes
+    are then replayed in order through a single crossing counter: the identities of
+    the objects crossing a segment boundary are kept, so the statistics are the same
+    as the ones of PeopleCounter.run if is_segment_counting_exact, and may differ
+    around the segment boundaries otherwise.
+    """
+    people_counter = people_counter_factory()
+    segments = compute_segments(
+        frames_number=video_asset.asset_meta.sampled_frames_number,
+        inference_periodicity=people_counter.algorithm_config.inference_periodicity,
+        segments_number=segments_number or os.cpu_count() or 1,
+    )
+    tracker_max_workers = compute_tracker_max_workers(
+        segments_number=len(segments),
+        max_workers=people_counter.algorithm_config.multi_tracker.max_workers,
+    )
+    logger.info(
+        f"Tracking {video_asset.asset_path} by segments: {segments}, with at most "
+        f"{tracker_max_workers} tracker workers each"
+    )
+
+    # the segments are spread over the whole video, which is waited for if it is
+    # still being downloaded, the download thread not being sent to the workers
+    if video_asset.streamed_file is not None:
+        video_asset.streamed_file.wait_for()
+
+    # the workers receive copies of the asset, which must not delete the shared file
+    segment_video_asset = video_asset.copy(
+        update={"delete": False, "streamed_file": None}
+    )
+
+    segments_tracked_frames = Parallel(n_jobs=len(segments))(
+        delayed(_track_segment)(
+            people_counter_factory=people_counter_factory,
+            video_asset=segment_video_asset,
+            start_index=start_index,
+            stop_index=stop_index,
+            tracker_max_workers=tracker_max_workers,
+        )
+        for start_index, stop_index in segments
+    )
+
+    crossing_counter = people_counter.create_crossing_counter(
+        frame_height=video_asset.asset_meta.height,
+        frame_width=video_asset.asset_meta.width,
+    )
+
+    for tracked_frames in segments_tracked_frames:
+        for frame_number, frame_height, bounding_boxes in tracked_frames:
+            crossing_counter.update(
+                bounding_boxes=bounding_boxes,
+                frame_height=frame_height,
+                time_offset=frame_number * video_asset.time_step,
+            )
+
+    return crossing_counter.statistics
@@ -0,0 +1,228 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Iterator, Optional, Tuple
+
+import cv2 as cv
+import numpy as np
+from core.schemas.asset import bgr_to_rgb, resize_to_width
+from core.schemas.people_counting import Detection
+
+from people_counting.common import Statistics
+from people_counting.people_counter import PeopleCounter
+
+logger = logging.getLogger(__name__)
+
+
+class StreamFrameSource:
+    """
+    Read the frames of an unbounded source (a named pipe, a stream URL or a growing
+    file) on a background thread, keeping only the latest ones.
+
+    When the consumer falls behind, the oldest buffered frame is dropped instead of
+    queueing the frames forever, so the latency of each frame stays bounded. The
+    frames are yielded with their time offset since the start of the stream: the
+    media time for regular files, the wall clock time for live sources.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        time_step: Optional[float] = None,
+        queue_size: int = 2,
+        reconnection_delay: Optional[float] = None,
+        to_rgb: bool = True,
+        transform: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        close_timeout: float = 5.0,
+    ):
+        self.source = source
+        self.time_step = time_step
+        self.queue_size = max(queue_size, 1)
+        # the source is reopened after this delay when it ends, it is not otherwise
+        self.reconnection_delay = reconnection_delay
+        self.to_rgb = to_rgb
+        self.transform = transform or (lambda frame: frame)
+        # a read blocked on the source cannot be interrupted, the reading thread is
+        # only waited for this number of seconds when closing
+        self.close_timeout = close_timeout
+
+        self.read_frames_number = 0
+        self.dropped_frames_number = 0
+
+        self._frames: Deque[Tuple[float, np.ndarray]] = deque(maxlen=self.queue_size)
+        self._condition = threading.Condition()
+        self._stop_event = threading.Event()
+        self._ended = False
+        self._exception: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def is_live(self) -> bool:
+        return not os.path.isfile(self.source)
+
+    def _read(self) -> Iterator[Tuple[float, np.ndarray]]:
+        """Yield (time_offset, frame) tuples, reopening the source when it ends"""
+        start_time = time.monotonic()
+        frames_number = 0
+
+        while not self._stop_event.is_set():
+            video_capture = cv.VideoCapture(self.source)
+
+            try:
+                if not video_capture.isOpened():
+                    raise ValueError(
+                        f"Could not open the following source: {self.source}"
+                    )
+
+                if frames_number > 0 and not self.is_live:
+                    video_capture.set(cv.CAP_PROP_POS_FRAMES, frames_number)
+
+                while not self._stop_event.is_set():
+                    is_read, frame = video_capture.read()
+                    if not is_read:
+                        break
+
+                    frames_number += 1
+                    time_offset = (
+                        time.monotonic() - start_time
+                        if self.is_live
+                        else video_capture.get(cv.CAP_PROP_POS_MSEC) / 1000
+                    )
+
+                    yield time_offset, frame
+            finally:
+                video_capture.release()
+
+            if self.reconnection_delay is None:
+                return
+
+            logger.info(
+                f"The source {self.source} ended, reopening it in "
+                f"{self.reconnection_delay}s"
+            )
+            self._stop_event.wait(self.reconnection_delay)
+
+    def _put(self, time_offset: float, frame: np.ndarray):
+        with self._condition:
+            if len(self._frames) == self.queue_size:
+                self.dropped_frames_number += 1
+
+            # the deque being bounded, the oldest frame is dropped when it is full
+            self._frames.append((time_offset, frame))
+            self._condition.notify()
+
+    def _produce(self):
+        next_time_offset = 0.0
+
+        try:
+            for time_offset, frame in self._read():
+                self.read_frames_number += 1
+
+                if self.time_step is not None:
+                    if time_offset < next_time_offset:
+                        continue
+
+                    next_time_offset += self.time_step * (
+                        1 + (time_offset - next_time_offset) // self.time_step
+                    )
+
+                if self.to_rgb is True:
+                    frame = bgr_to_rgb(frame)
+
+                self._put(time_offset, self.transform(frame))
+        # pylint: disable=broad-exception-caught
+        except BaseException as exception:
+            self._exception = exception
+
+        with self._condition:
+            self._ended = True
+            self._condition.notify()
+
+    def __iter__(self) -> Iterator[Tuple[float, np.ndarray]]:
+        self._thread = threading.Thread(target=self._produce, daemon=True)
+        self._thread.start()
+
+        try:
+            while True:
+                with self._condition:
+                    self._condition.wait_for(lambda: self._frames or self._ended)
+
+                    if not self._frames:
+                        break
+
+                    item = self._frames.popleft()
+
+                yield item
+        finally:
+            self.close()
+
+        if self._exception is not None:
+            raise self._exception
+
+    def close(self):
+        self._stop_event.set()
+
+        if self._thread is not None:
+            self._thread.join(self.close_timeout)
+
+            # the thread being a daemon, it does not prevent the process from exiting
+            if self._thread.is_alive():
+                logger.warning(
+                    f"The reading of the source {self.source} is still blocked "
+                    f"{self.close_timeout}s after closing it, leaving it behind"
+                )
+
+
+def count_people_in_stream(
+    people_counter: PeopleCounter,
+    frame_source: StreamFrameSource,
+    on_crossing: Callable[[Detection], None],
+) -> Statistics:
+    """
+    Count the people of an unbounded frame source, calling on_crossing with each
+    crossing as soon as it is counted, and return the statistics once the source
+    ends or is closed.
+
+    The frames dropped by the source are skipped by the whole pipeline: the frames
+    are numbered in the order they are consumed, so that the keyframes are kept
+    evenly spaced. They are resized to the image width of the people counter, as the
+    frames of a video asset are.
+    """
+    # time offsets of the frames read by the tracking, not counted yet
+    time_offsets: Deque[float] = deque()
+
+    def numbered_frames() -> Iterator[Tuple[int, np.ndarray]]:
+        for frame_number, (time_offset, frame) in enumerate(frame_source):
+            time_offsets.append(time_offset)
+
+            if frame.shape[1] != people_counter.image_width:
+                frame = resize_to_width(frame, people_counter.image_width)
+
+            yield frame_number, frame
+
+    crossing_counter = None
+
+    for _, frame, _, bounding_boxes in people_counter.track_frames(
+        numbered_frames(), enable_detection_prefetching=False
+    ):
+        if crossing_counter is None:
+            crossing_counter = people_counter.create_crossing_counter(
+                frame_height=frame.shape[0],
+                frame_width=frame.shape[1],
+                on_crossing=on_crossing,
+            )
+
+        crossing_counter.update(
+            bounding_boxes=bounding_boxes,
+            frame_height=frame.shape[0],
+            time_offset=time_offsets.popleft(),
+        )
+
+    logger.info(
+        f"The stream {frame_source.source} ended, {frame_source.read_frames_number} "
+        f"frames read, {frame_source.dropped_frames_number} dropped"
+    )
+
+    return crossing_counter.statistics if crossing_counter else Statistics()
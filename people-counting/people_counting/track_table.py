@@ -0,0 +1,120 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+
+class TrackTable:
+    """
+    Keep the state of the tracked objects needed by the counting rule: their first
+    and last centroids and whether they were counted, and optionally the last
+    history_size centroids of their trajectory in a ring buffer.
+
+    The rows are aligned with the ids registered by the CentroidTracker on each
+    update, so the objects it unregisters are evicted and the memory is bounded by
+    the number of objects tracked at once.
+    """
+
+    def __init__(self, history_size: int = 0):
+        self.history_size = history_size
+        self.object_ids = np.zeros(0, dtype=int)
+        self.first_centroids = np.zeros((0, 2), dtype=int)
+        self.last_centroids = np.zeros((0, 2), dtype=int)
+        self.counted = np.zeros(0, dtype=bool)
+        # (objects number, history size, 2) ring buffers of the last centroids
+        self.history = np.zeros((0, history_size, 2), dtype=int)
+        # number of centroids written in each ring buffer
+        self.history_lengths = np.zeros(0, dtype=int)
+
+    def __len__(self) -> int:
+        return len(self.object_ids)
+
+    def get_state(self) -> Dict[str, np.ndarray]:
+        return {
+            "object_ids": self.object_ids,
+            "first_centroids": self.first_centroids,
+            "last_centroids": self.last_centroids,
+            "counted": self.counted,
+            "history": self.history,
+            "history_lengths": self.history_lengths,
+        }
+
+    def set_state(self, state: Dict[str, np.ndarray]):
+        if state["history"].shape[1] != self.history_size:
+            raise ValueError(
+                f"The history size of the state {state['history'].shape[1]} differs "
+                f"from the one of the table {self.history_size}"
+            )
+
+        self.object_ids = state["object_ids"]
+        self.first_centroids = state["first_centroids"]
+        self.last_centroids = state["last_centroids"]
+        self.counted = state["counted"]
+        self.history = state["history"]
+        self.history_lengths = state["history_lengths"]
+
+    def _find(self, object_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Return the rows of the given ids in the table, and the mask of the ids
+        which were found.
+        """
+        # the ids are registered in increasing order by the CentroidTracker
+        rows = np.searchsorted(self.object_ids, object_ids)
+        rows = np.minimum(rows, max(len(self.object_ids) - 1, 0))
+        found = (
+            self.object_ids[rows] == object_ids
+            if len(self.object_ids) > 0
+            else np.zeros(len(object_ids), dtype=bool)
+        )
+
+        return rows, found
+
+    def update(self, object_ids: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """
+        Replace the table rows with the given registered objects, evicting the ones
+        which are not registered anymore, and return the mask of the objects which
+        were already tracked.
+        """
+        rows, tracked = self._find(object_ids)
+        tracked_rows = rows[tracked]
+
+        first_centroids = centroids.copy()
+        first_centroids[tracked] = self.first_centroids[tracked_rows]
+
+        counted = np.zeros(len(object_ids), dtype=bool)
+        counted[tracked] = self.counted[tracked_rows]
+
+        history_lengths = np.zeros(len(object_ids), dtype=int)
+        history_lengths[tracked] = self.history_lengths[tracked_rows]
+
+        history = np.zeros((len(object_ids), self.history_size, 2), dtype=int)
+        history[tracked] = self.history[tracked_rows]
+        if self.history_size > 0:
+            history[
+                np.arange(len(object_ids)), history_lengths % self.history_size
+            ] = centroids
+
+        self.object_ids = object_ids
+        self.first_centroids = first_centroids
+        self.last_centroids = centroids
+        self.counted = counted
+        self.history = history
+        self.history_lengths = history_lengths + 1
+
+        return tracked
+
+    def get_trajectory(self, object_id: int) -> np.ndarray:
+        """
+        Return the last centroids of the object, at most history_size of them, from
+        the oldest to the latest.
+        """
+        rows, found = self._find(np.array([object_id]))
+
+        if not found[0]:
+            raise KeyError(f"The object {object_id} is not tracked")
+
+        history_length = self.history_lengths[rows[0]]
+        trajectory = np.roll(
+            self.history[rows[0]], -history_length % max(self.history_size, 1), axis=0
+        )
+
+        return trajectory[-min(history_length, self.history_size) :]
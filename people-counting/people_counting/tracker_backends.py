@@ -0,0 +1,225 @@
+from abc import ABC, abstractmethod
+from enum import Enum
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial import distance as dist
+
+
+class TrackerBackendName(str, Enum):
+    # correlation trackers, see MultiTracker
+    DLIB = "dlib"
+    # constant velocity Kalman filters, which do not read the frames
+    KALMAN = "kalman"
+    # sparse Lucas-Kanade optical flow of points sampled in the boxes
+    OPTICAL_FLOW = "optical_flow"
+
+
+class TrackerBackend(ABC):
+    """
+    Follow the detected bounding boxes between two keyframes: the tracking is
+    started from the detections of a keyframe, then updated with each following
+    frame until the next keyframe.
+    """
+
+    @abstractmethod
+    def start(self, frame: np.ndarray, bounding_boxes: np.ndarray):
+        """
+        Replace the tracked boxes with the (N, 4) bounding boxes array whose columns
+        are x_min, y_min, x_max, y_max.
+        """
+
+    @abstractmethod
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Update the tracked boxes with the given frame and return them as a (N, 4)
+        array, in the order of the boxes the tracking was started with.
+        """
+
+    def close(self):
+        """Release the resources held by the backend"""
+
+
+class KalmanTracker(TrackerBackend):
+    """
+    Predict the boxes between keyframes with one constant velocity Kalman filter
+    per box, on the centroid position and velocity, the box size being kept.
+
+    The frames are not read: the velocities are estimated from the successive
+    detections, the detections of a keyframe being matched to the predicted boxes
+    by an optimal assignment of their centroids. The velocities being carried from
+    one keyframe to the next, they are reset at the start of a video segment or when
+    resuming from a checkpoint.
+    """
+
+    # state transition of the (x, y, x velocity, y velocity) states for one frame
+    transition = np.array(
+        [[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], dtype=float
+    )
+    observation = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], dtype=float)
+
+    def __init__(
+        self,
+        max_distance_height_ratio: float = 0.2,
+        process_noise: float = 1.0,
+        measurement_noise: float = 4.0,
+        initial_velocity_variance: float = 100.0,
+    ):
+        self.max_distance_height_ratio = max_distance_height_ratio
+        self.process_covariance = process_noise * np.diag([0.25, 0.25, 1.0, 1.0])
+        self.measurement_covariance = measurement_noise * np.eye(2)
+        self.initial_covariance = np.diag(
+            [measurement_noise, measurement_noise] + [initial_velocity_variance] * 2
+        )
+
+        # (N, 4) states, (N, 4, 4) covariances and (N, 2) sizes of the boxes
+        self.states = np.zeros((0, 4))
+        self.covariances = np.zeros((0, 4, 4))
+        self.sizes = np.zeros((0, 2))
+
+    def _predict(self):
+        self.states = self.states @ self.transition.T
+        self.covariances = (
+            self.transition @ self.covariances @ self.transition.T
+            + self.process_covariance
+        )
+
+    def _correct(self, indexes: np.ndarray, measurements: np.ndarray):
+        covariances = self.covariances[indexes]
+        innovation_covariances = (
+            self.observation @ covariances @ self.observation.T
+            + self.measurement_covariance
+        )
+        gains = covariances @ self.observation.T @ np.linalg.inv(innovation_covariances)
+        innovations = measurements - self.states[indexes] @ self.observation.T
+
+        self.states[indexes] += np.einsum("nij,nj->ni", gains, innovations)
+        self.covariances[indexes] = (np.eye(4) - gains @ self.observation) @ covariances
+
+    def _to_bounding_boxes(self) -> np.ndarray:
+        half_sizes = self.sizes / 2
+
+        return np.rint(
+            np.column_stack(
+                [self.states[:, :2] - half_sizes, self.states[:, :2] + half_sizes]
+            )
+        ).astype(int)
+
+    def start(self, frame: np.ndarray, bounding_boxes: np.ndarray):
+        bounding_boxes = np.asarray(bounding_boxes, dtype=float).reshape(-1, 4)
+        centroids = (bounding_boxes[:, :2] + bounding_boxes[:, 2:]) / 2
+
+        states = np.column_stack([centroids, np.zeros((len(centroids), 2))])
+        covariances = np.repeat(
+            self.initial_covariance[np.newaxis], len(centroids), axis=0
+        )
+
+        if len(self.states) > 0 and len(centroids) > 0:
+            # the keyframe is the step following the last updated frame
+            self._predict()
+
+            distances = dist.cdist(centroids, self.states[:, :2])
+            boxes_indexes, tracks_indexes = linear_sum_assignment(distances)
+            matched = distances[boxes_indexes, tracks_indexes] <= (
+                self.max_distance_height_ratio * frame.shape[0]
+            )
+            boxes_indexes = boxes_indexes[matched]
+            tracks_indexes = tracks_indexes[matched]
+
+            self._correct(tracks_indexes, centroids[boxes_indexes])
+            states[boxes_indexes] = self.states[tracks_indexes]
+            covariances[boxes_indexes] = self.covariances[tracks_indexes]
+
+        self.states = states
+        self.covariances = covariances
+        self.sizes = bounding_boxes[:, 2:] - bounding_boxes[:, :2]
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        self._predict()
+
+        return self._to_bounding_boxes()
+
+
+class OpticalFlowTracker(TrackerBackend):
+    """
+    Move each box by the median displacement of a grid of points sampled in it, the
+    points of all the boxes being followed together with a single pyramidal
+    Lucas-Kanade optical flow computation per frame.
+    """
+
+    def __init__(
+        self,
+        grid_size: int = 4,
+        window_size: int = 15,
+        pyramid_levels: int = 2,
+    ):
+        self.grid_size = grid_size
+        self.window_size = window_size
+        self.pyramid_levels = pyramid_levels
+
+        self.bounding_boxes = np.zeros((0, 4), dtype=float)
+        # (P, 1, 2) float32 points, and the index of the box of each point
+        self.points = np.zeros((0, 1, 2), dtype=np.float32)
+        self.points_boxes_indexes = np.zeros(0, dtype=int)
+        self.previous_frame: Optional[np.ndarray] = None
+
+    @staticmethod
+    def _to_grayscale(frame: np.ndarray) -> np.ndarray:
+        if frame.ndim == 3:
+            return cv.cvtColor(frame, cv.COLOR_RGB2GRAY)
+
+        return np.ascontiguousarray(frame, dtype=np.uint8)
+
+    def _sample_points(self, bounding_boxes: np.ndarray) -> np.ndarray:
+        """Return the (N, grid_size ** 2, 2) points of the grids of the inner boxes"""
+        # the points are sampled in the inner half of the boxes, away from the edges
+        grid_ratios = (np.arange(self.grid_size) + 0.5) / self.grid_size / 2 + 0.25
+        x_ratios, y_ratios = np.meshgrid(grid_ratios, grid_ratios)
+        ratios = np.column_stack([x_ratios.ravel(), y_ratios.ravel()])
+
+        minimums = bounding_boxes[:, np.newaxis, :2]
+        sizes = bounding_boxes[:, np.newaxis, 2:] - minimums
+
+        return minimums + ratios[np.newaxis] * sizes
+
+    def start(self, frame: np.ndarray, bounding_boxes: np.ndarray):
+        self.bounding_boxes = np.asarray(bounding_boxes, dtype=float).reshape(-1, 4)
+        points = self._sample_points(self.bounding_boxes)
+
+        self.points = points.reshape(-1, 1, 2).astype(np.float32)
+        self.points_boxes_indexes = np.repeat(
+            np.arange(len(self.bounding_boxes)), points.shape[1]
+        )
+        self.previous_frame = self._to_grayscale(frame)
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        frame = self._to_grayscale(frame)
+
+        if len(self.points) > 0:
+            points, statuses, _ = cv.calcOpticalFlowPyrLK(
+                self.previous_frame,
+                frame,
+                self.points,
+                None,
+                winSize=(self.window_size, self.window_size),
+                maxLevel=self.pyramid_levels,
+            )
+            found = statuses.ravel() == 1
+            displacements = (points - self.points).reshape(-1, 2)[found]
+            found_boxes_indexes = self.points_boxes_indexes[found]
+
+            for box_index in np.unique(found_boxes_indexes):
+                self.bounding_boxes[box_index] += np.tile(
+                    np.median(displacements[found_boxes_indexes == box_index], axis=0),
+                    2,
+                )
+
+            # the lost points are not followed anymore
+            self.points = points[found]
+            self.points_boxes_indexes = found_boxes_indexes
+
+        self.previous_frame = frame
+
+        return np.rint(self.bounding_boxes).astype(int)
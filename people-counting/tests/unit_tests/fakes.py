@@ -0,0 +1,84 @@
+"""Fakes of the object detection endpoint shared by the counting tests"""
+import os
+from typing import List, Optional
+
+import cv2 as cv
+import numpy as np
+import pandas as pd
+from core.schemas.object_detection import PREDICTION_COLUMNS
+from core.services.batch_size_controller import BatchSizeController
+from omegaconf import DictConfig
+
+from people_counting.config import config
+from people_counting.people_counter import PeopleCounter
+
+
+class FakeObjectDetectionClient:
+    """Detect the white squares of the frames"""
+
+    def __init__(self):
+        self.batch_size_controller = BatchSizeController()
+        self.detection_cache = None
+
+    @staticmethod
+    def _detect(image: np.ndarray) -> pd.DataFrame:
+        rows, columns = np.nonzero(image.max(axis=2) > 200)
+        if len(rows) == 0:
+            return pd.DataFrame([], columns=PREDICTION_COLUMNS)
+
+        return pd.DataFrame(
+            [
+                [
+                    columns.min(),
+                    rows.min(),
+                    columns.max() + 1,
+                    rows.max() + 1,
+                    0.9,
+                    0,
+                    "person",
+                ]
+            ],
+            columns=PREDICTION_COLUMNS,
+        )
+
+    def predict_batch(self, images: List[np.ndarray], **_) -> List[pd.DataFrame]:
+        return [self._detect(image) for image in images]
+
+
+def create_fake_people_counter(
+    pids_path: Optional[str] = None,
+    algorithm_config: Optional[DictConfig] = None,
+    **_,
+) -> PeopleCounter:
+    # the processes creating the people counters are recorded if a path is given
+    if pids_path is not None:
+        with open(pids_path, "a", encoding="utf-8") as pids_file:
+            pids_file.write(f"{os.getpid()}\n")
+
+    return PeopleCounter(
+        object_detection_client=FakeObjectDetectionClient(),
+        algorithm_config=algorithm_config or config.algorithm,
+        image_width=64,
+        confidence_threshold=0.5,
+    )
+
+
+def write_crossings_video(video_path: str, scale: int = 1):
+    """
+    Write a 10 FPS video of a white square going down through the line, then of
+    another one going up, of 64 x 48 frames times the scale
+    """
+    video_writer = cv.VideoWriter(
+        video_path, cv.VideoWriter_fourcc(*"MJPG"), 10, (64 * scale, 48 * scale)
+    )
+
+    for frame_number in range(60):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        position = frame_number if frame_number < 30 else 59 - frame_number
+        left = 8 if frame_number < 30 else 40
+        frame[4 + position : 12 + position, left : left + 8] = 255
+        video_writer.write(
+            cv.resize(frame, None, fx=scale, fy=scale, interpolation=cv.INTER_NEAREST)
+        )
+
+    video_writer.release()
@@ -0,0 +1,155 @@
+import importlib
+from typing import Callable, List, Optional
+
+import pytest
+from core.exceptions import DependencyError
+from core.schemas.people_counting import PeopleCounterInput, PeopleCounterOutput
+from fastapi import HTTPException, Response
+
+from people_counting.config import config
+
+API_ENVIRONMENT_VARIABLES = {
+    "PROJECT_ID": "project",
+    "REGION": "region",
+    "IMAGE_NAME": "image",
+    "OBJECT_DETECTION_MODEL_NAME": "model",
+    "MODEL_INSTANTIATOR_HOST": "host",
+    "FIRESTORE_RESULTS_COLLECTION": "results",
+    "FIRESTORE_JOBS_COLLECTION": "jobs",
+    "VIDEOS_TO_COUNT_BUCKET": "videos",
+    "COUNTED_VIDEOS_BUCKET": "counted-videos",
+}
+
+
+class FakeStorageClient:
+    def __init__(self, blobs_hashes: dict):
+        self.blobs_hashes = blobs_hashes
+
+    def get_blob_hash(self, bucket_name: str, blob_name: str) -> str:
+        if blob_name not in self.blobs_hashes:
+            raise DependencyError(
+                f"The blob {blob_name} has not been found in the bucket {bucket_name}"
+            )
+
+        return self.blobs_hashes[blob_name]
+
+
+class FakeFirestoreClient:
+    def __init__(self):
+        self.documents = {}
+
+    def upload_document(self, collection_name: str, document_id: str, content: dict):
+        self.documents[document_id] = content
+
+
+class FakeCloudRunJobManager:
+    def __init__(self):
+        self.jobs_configs = {}
+        self.run_jobs_names: List[str] = []
+
+    def create_job(self, job_name: str, job_config, override_if_existing: bool):
+        self.jobs_configs[job_name] = job_config
+
+    def run_job(self, job_name: str):
+        self.run_jobs_names.append(job_name)
+
+
+@pytest.fixture(name="people_counter_api")
+def fixture_people_counter_api(monkeypatch):
+    for name, value in API_ENVIRONMENT_VARIABLES.items():
+        monkeypatch.setenv(name, value)
+
+    return importlib.import_module("people_counting.api.people_counter")
+
+
+@pytest.fixture(name="cloud_run_job_manager")
+def fixture_cloud_run_job_manager() -> FakeCloudRunJobManager:
+    return FakeCloudRunJobManager()
+
+
+@pytest.fixture(name="firestore_client")
+def fixture_firestore_client() -> FakeFirestoreClient:
+    return FakeFirestoreClient()
+
+
+@pytest.fixture(name="count_people")
+def fixture_count_people(
+    people_counter_api,
+    cloud_run_job_manager: FakeCloudRunJobManager,
+    firestore_client: FakeFirestoreClient,
+) -> Callable[[List[str]], PeopleCounterOutput]:
+    storage_client = FakeStorageClient(
+        {"first.mp4": "first-hash", "second.mp4": "second-hash"}
+    )
+
+    def count_people(videos_storage_paths: List[str]) -> PeopleCounterOutput:
+        return people_counter_api.count_people(
+            people_counter_input=PeopleCounterInput(
+                videos_storage_paths=videos_storage_paths
+            ),
+            response=Response(),
+            config=config,
+            cloud_run_job_manager=cloud_run_job_manager,
+            storage_client=storage_client,
+            firestore_client=firestore_client,
+            firestore_jobs_collection="jobs",
+        )
+
+    return count_people
+
+
+@pytest.mark.parametrize(
+    "checkpoints_storage_directory", [None, "gs://checkpoints/people-counting"]
+)
+def test_count_people_passes_the_videos_ids_to_the_job(
+    people_counter_api,
+    count_people,
+    cloud_run_job_manager: FakeCloudRunJobManager,
+    firestore_client: FakeFirestoreClient,
+    monkeypatch,
+    checkpoints_storage_directory: Optional[str],
+):
+    monkeypatch.setattr(
+        people_counter_api,
+        "CHECKPOINTS_STORAGE_DIRECTORY",
+        checkpoints_storage_directory,
+    )
+
+    job_id = count_people(["gs://videos/first.mp4", "gs://videos/second.mp4"]).job_id
+
+    assert firestore_client.documents[job_id]["assets_ids"] == [
+        "first-hash",
+        "second-hash",
+    ]
+    assert cloud_run_job_manager.run_jobs_names == [f"count-people-{job_id}"]
+    environment_variables = cloud_run_job_manager.jobs_configs[
+        f"count-people-{job_id}"
+    ].environment_variables
+    assert environment_variables["ASSETS_IDS"] == "first-hash second-hash"
+    assert (
+        environment_variables.get("CHECKPOINTS_STORAGE_DIRECTORY")
+        == checkpoints_storage_directory
+    )
+
+
+@pytest.mark.parametrize(
+    "video_storage_path,detail",
+    [
+        ("gs://videos/image.jpg", "is not a video"),
+        ("gs://videos/missing.mp4", "has not been found"),
+    ],
+)
+def test_count_people_rejects_the_invalid_videos(
+    count_people,
+    cloud_run_job_manager: FakeCloudRunJobManager,
+    firestore_client: FakeFirestoreClient,
+    video_storage_path: str,
+    detail: str,
+):
+    with pytest.raises(HTTPException) as exception_info:
+        count_people(["gs://videos/first.mp4", video_storage_path])
+
+    assert exception_info.value.status_code == 400
+    assert detail in exception_info.value.detail
+    assert firestore_client.documents == {}
+    assert cloud_run_job_manager.run_jobs_names == []
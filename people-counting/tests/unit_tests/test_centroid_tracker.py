@@ -0,0 +1,70 @@
+import numpy as np
+
+from people_counting.centroid_tracker import CentroidTracker, Matching
+from people_counting.common import BoundingBox
+
+
+def make_box(x_center: int, y_center: int, half_size: int = 5) -> BoundingBox:
+    return BoundingBox(
+        x_min=x_center - half_size,
+        y_min=y_center - half_size,
+        x_max=x_center + half_size,
+        y_max=y_center + half_size,
+    )
+
+
+def test_update_registers_and_follows_objects():
+    centroid_tracker = CentroidTracker(max_disappeared=2, max_distance=20)
+
+    object_ids, centroids = centroid_tracker.update(
+        [make_box(10, 10), make_box(100, 10)]
+    )
+    assert object_ids.tolist() == [0, 1]
+
+    object_ids, centroids = centroid_tracker.update(
+        [make_box(105, 12), make_box(14, 10), make_box(300, 300)]
+    )
+    assert object_ids.tolist() == [0, 1, 2]
+    assert centroids.tolist() == [[14, 10], [105, 12], [300, 300]]
+
+
+def test_update_expires_disappeared_objects():
+    centroid_tracker = CentroidTracker(max_disappeared=2, max_distance=20)
+    centroid_tracker.update([make_box(10, 10), make_box(100, 10)])
+
+    for _ in range(2):
+        object_ids, _ = centroid_tracker.update([make_box(100, 12)])
+        assert object_ids.tolist() == [0, 1]
+
+    object_ids, _ = centroid_tracker.update([make_box(100, 12)])
+    assert object_ids.tolist() == [1]
+
+    for _ in range(3):
+        object_ids, _ = centroid_tracker.update([])
+    assert len(object_ids) == 0
+
+
+def test_update_leaves_previous_centroids_untouched():
+    centroid_tracker = CentroidTracker(max_disappeared=2, max_distance=20)
+    _, first_centroids = centroid_tracker.update([make_box(10, 10)])
+    centroid_tracker.update([make_box(15, 10)])
+
+    assert first_centroids.tolist() == [[10, 10]]
+
+
+def test_optimal_matching_is_one_to_one():
+    boxes = [make_box(10, 10), make_box(30, 10)]
+    next_boxes = [make_box(14, 10), make_box(19, 10)]
+
+    greedy_tracker = CentroidTracker(max_distance=50, matching=Matching.GREEDY)
+    greedy_tracker.update(boxes)
+    object_ids, _ = greedy_tracker.update(next_boxes)
+    # both inputs are closest to the same object, the other one is left unmatched
+    assert greedy_tracker.disappeared[object_ids == 1].tolist() == [1]
+
+    optimal_tracker = CentroidTracker(max_distance=50, matching=Matching.OPTIMAL)
+    optimal_tracker.update(boxes)
+    object_ids, centroids = optimal_tracker.update(next_boxes)
+    assert object_ids.tolist() == [0, 1]
+    assert centroids.tolist() == [[14, 10], [19, 10]]
+    assert np.all(optimal_tracker.disappeared == 0)
@@ -0,0 +1,154 @@
+import cv2 as cv
+import numpy as np
+import pytest
+from core.schemas.asset import VideoAsset
+from omegaconf import OmegaConf
+
+from people_counting.centroid_tracker import CentroidTracker
+from people_counting.checkpoint import CheckpointStore, is_resume_exact
+from people_counting.config import config
+from people_counting.crossing_counter import CrossingCounter
+from tests.unit_tests.fakes import create_fake_people_counter
+
+
+def make_crossing_counter() -> CrossingCounter:
+    return CrossingCounter(
+        centroid_tracker=CentroidTracker(max_disappeared=2, max_distance=30),
+        line_placement_ratio=0.5,
+        trajectory_history_size=4,
+    )
+
+
+def test_checkpoint_resumes_the_counting(tmp_path):
+    frames_bounding_boxes = [
+        np.array([[10, 10 + 10 * step, 20, 20 + 10 * step]]) for step in range(10)
+    ]
+
+    crossing_counter = make_crossing_counter()
+    for frame_number, bounding_boxes in enumerate(frames_bounding_boxes):
+        crossing_counter.update(
+            bounding_boxes, frame_height=100, time_offset=frame_number
+        )
+
+    checkpoint_store = CheckpointStore(str(tmp_path / "checkpoint.npz"))
+    assert checkpoint_store.load(make_crossing_counter()) == 0
+
+    interrupted_crossing_counter = make_crossing_counter()
+    for frame_number, bounding_boxes in enumerate(frames_bounding_boxes[:3]):
+        interrupted_crossing_counter.update(
+            bounding_boxes, frame_height=100, time_offset=frame_number
+        )
+    checkpoint_store.save(3, interrupted_crossing_counter)
+
+    resumed_crossing_counter = make_crossing_counter()
+    start_index = checkpoint_store.load(resumed_crossing_counter)
+    for frame_number, bounding_boxes in enumerate(
+        frames_bounding_boxes[start_index:], start=start_index
+    ):
+        resumed_crossing_counter.update(
+            bounding_boxes, frame_height=100, time_offset=frame_number
+        )
+
+    assert start_index == 3
+    assert resumed_crossing_counter.statistics.went_down_count == 1
+    assert (
+        resumed_crossing_counter.statistics.to_detections()
+        == crossing_counter.statistics.to_detections()
+    )
+    assert resumed_crossing_counter.track_table.get_trajectory(0).tolist() == [
+        [15, 75],
+        [15, 85],
+        [15, 95],
+        [15, 105],
+    ]
+
+
+class Interruption(Exception):
+    pass
+
+
+class InterruptingCheckpointStore(CheckpointStore):
+    """Interrupt the run once a checkpoint is saved from the given frame number"""
+
+    def __init__(self, checkpoint_path: str, interruption_frame_number: int):
+        super().__init__(checkpoint_path)
+        self.interruption_frame_number = interruption_frame_number
+        self.saved_frame_numbers = []
+
+    def save(self, frame_number: int, crossing_counter: CrossingCounter):
+        super().save(frame_number, crossing_counter)
+        self.saved_frame_numbers.append(frame_number)
+
+        if frame_number >= self.interruption_frame_number:
+            raise Interruption()
+
+
+def write_motion_gated_video(video_path: str):
+    """
+    Write a 10 FPS video of a white square going down through the line and standing
+    still from frame 15, so that keyframe 30 is skipped by the motion gate, then of
+    another one going up from frame 36
+    """
+    video_writer = cv.VideoWriter(
+        video_path, cv.VideoWriter_fourcc(*"MJPG"), 10, (64, 48)
+    )
+
+    for frame_number in range(60):
+        frame = np.zeros((48, 64, 3), dtype=np.uint8)
+        top = 2 * min(frame_number, 14) + 2
+        frame[top : top + 8, 8:16] = 255
+        if frame_number >= 36:
+            top = max(40 - 2 * (frame_number - 36), 2)
+            frame[top : top + 8, 40:48] = 255
+        video_writer.write(frame)
+
+    video_writer.release()
+
+
+def test_checkpoint_resumes_the_motion_gated_counting(tmp_path):
+    video_path = str(tmp_path / "video.avi")
+    write_motion_gated_video(video_path)
+    video_asset = VideoAsset(
+        asset_path=video_path, time_step=None, probes_directory=str(tmp_path)
+    )
+    algorithm_config = OmegaConf.merge(
+        config.algorithm,
+        {
+            "motion_gating": {"enabled": True},
+            "checkpointing": {"keyframes_interval": 1},
+        },
+    )
+    checkpoint_path = str(tmp_path / "checkpoint.npz")
+
+    statistics = create_fake_people_counter(algorithm_config=algorithm_config).run(
+        video_asset
+    )
+
+    interrupting_checkpoint_store = InterruptingCheckpointStore(
+        checkpoint_path, interruption_frame_number=30
+    )
+    with pytest.raises(Interruption):
+        create_fake_people_counter(algorithm_config=algorithm_config).run(
+            video_asset, checkpoint_store=interrupting_checkpoint_store
+        )
+
+    resumed_statistics = create_fake_people_counter(
+        algorithm_config=algorithm_config
+    ).run(video_asset, checkpoint_store=CheckpointStore(checkpoint_path))
+
+    # the checkpoint of the skipped keyframe 30 is postponed to the next detected one
+    assert interrupting_checkpoint_store.saved_frame_numbers == [15, 45]
+    assert (statistics.went_down_count, statistics.went_up_count) == (1, 1)
+    assert resumed_statistics.to_detections() == statistics.to_detections()
+
+
+@pytest.mark.parametrize(
+    "tracker_backend,is_exact",
+    [("dlib", True), ("optical_flow", True), ("kalman", False)],
+)
+def test_is_resume_exact(tracker_backend: str, is_exact: bool):
+    algorithm_config = OmegaConf.merge(
+        config.algorithm, {"tracker_backend": tracker_backend}
+    )
+
+    assert is_resume_exact(algorithm_config) is is_exact
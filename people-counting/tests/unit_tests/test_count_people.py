@@ -0,0 +1,171 @@
+import hashlib
+import importlib
+import os
+from functools import partial
+
+import pytest
+from omegaconf import OmegaConf
+
+from people_counting.config import config
+from tests.unit_tests.fakes import create_fake_people_counter, write_crossings_video
+
+JOB_ENVIRONMENT_VARIABLES = {
+    "PROJECT_ID": "project",
+    "REGION": "region",
+    "OBJECT_DETECTION_MODEL_NAME": "model",
+    "MODEL_INSTANTIATOR_HOST": "host",
+    "FIRESTORE_RESULTS_COLLECTION": "results",
+    "JOB_ID": "job",
+    "VIDEOS_STORAGE_PATHS": "gs://bucket/videos/video.avi",
+}
+
+
+class FakeStorageClient:
+    def __init__(self, blob_path: str):
+        with open(blob_path, "rb") as blob_file:
+            self.content = blob_file.read()
+
+    def iterate_blob_chunks(self, bucket_name: str, blob_name: str, chunk_size: int):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def get_blob_hash(self, bucket_name: str, blob_name: str) -> str:
+        return hashlib.md5(self.content).hexdigest()
+
+
+class FakeFirestoreClient:
+    def __init__(self):
+        self.documents = {}
+
+    def upload_document(self, collection_name: str, document_id: str, content: dict):
+        self.documents[document_id] = content
+
+
+@pytest.fixture(name="video_path")
+def fixture_video_path(tmp_path) -> str:
+    video_path = os.path.join(tmp_path, "video.avi")
+    write_crossings_video(video_path)
+
+    return video_path
+
+
+@pytest.fixture(name="count_people")
+def fixture_count_people(monkeypatch):
+    for name, value in JOB_ENVIRONMENT_VARIABLES.items():
+        monkeypatch.setenv(name, value)
+
+    count_people = importlib.import_module("people_counting.jobs.count_people")
+    monkeypatch.setattr(
+        count_people, "create_people_counter", create_fake_people_counter
+    )
+
+    return count_people
+
+
+def configure_job(
+    count_people, monkeypatch, video_path: str, segment_counting_enabled: bool
+) -> FakeFirestoreClient:
+    job_config = OmegaConf.merge(
+        config,
+        {
+            "preprocessing": {
+                "streamed_download": {
+                    "enabled": True,
+                    "chunk_bytes_number": 4096,
+                    "header_bytes_number": 4096,
+                }
+            },
+            "algorithm": {
+                "segment_counting": {
+                    "enabled": segment_counting_enabled,
+                    "segments_number": 2,
+                }
+            },
+        },
+    )
+    firestore_client = FakeFirestoreClient()
+    monkeypatch.setattr(count_people, "cfg", job_config)
+    monkeypatch.setattr(
+        count_people, "create_storage_client", lambda: FakeStorageClient(video_path)
+    )
+    monkeypatch.setattr(
+        count_people, "create_firestore_client", lambda: firestore_client
+    )
+
+    return firestore_client
+
+
+def run_asset_counting(
+    count_people, monkeypatch, video_path: str, segment_counting_enabled: bool
+) -> dict:
+    firestore_client = configure_job(
+        count_people, monkeypatch, video_path, segment_counting_enabled
+    )
+
+    count_people.run_asset_counting(
+        video_storage_path="gs://bucket/videos/video.avi",
+        counted_video_storage_path=None,
+        project_id="project",
+        region="region",
+        job_id="job",
+        object_detection_model_name="model",
+        model_instantiator_host="host",
+        firestore_results_collection="results",
+    )
+
+    (document,) = firestore_client.documents.values()
+
+    return document
+
+
+def test_run_asset_counting_by_segments_of_a_streamed_video(
+    count_people, monkeypatch, video_path: str
+):
+    document = run_asset_counting(
+        count_people, monkeypatch, video_path, segment_counting_enabled=True
+    )
+    sequential_document = run_asset_counting(
+        count_people, monkeypatch, video_path, segment_counting_enabled=False
+    )
+
+    assert [detection["direction"] for detection in document["detections"]] == [
+        "DOWN",
+        "UP",
+    ]
+    assert document["detections"] == sequential_document["detections"]
+
+
+def test_main_tracks_the_segments_in_separate_processes(
+    count_people, monkeypatch, video_path: str, tmp_path
+):
+    pids_path = str(tmp_path / "pids.txt")
+    # the videos would otherwise be counted in parallel processes on several CPUs
+    monkeypatch.setattr(os, "cpu_count", lambda: 4)
+    firestore_client = configure_job(
+        count_people, monkeypatch, video_path, segment_counting_enabled=True
+    )
+    monkeypatch.setattr(
+        count_people,
+        "create_people_counter",
+        partial(create_fake_people_counter, pids_path=pids_path),
+    )
+
+    count_people.main(
+        project_id="project",
+        region="region",
+        object_detection_model_name="model",
+        model_instantiator_host="host",
+        firestore_results_collection="results",
+        job_id="job",
+        videos_storage_paths=["gs://bucket/videos/video.avi"] * 2,
+        counted_videos_storage_paths=None,
+    )
+
+    with open(pids_path, encoding="utf-8") as pids_file:
+        pids = [int(line) for line in pids_file]
+
+    # the videos are counted by the job process, their two segments each being
+    # tracked by worker processes instead of threads of the job process
+    assert len(pids) == 6
+    assert pids.count(os.getpid()) == 2
+    assert len(firestore_client.documents) == 1
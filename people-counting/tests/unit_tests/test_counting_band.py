@@ -0,0 +1,118 @@
+from typing import List
+
+import numpy as np
+import pandas as pd
+import pytest
+from core.services.batch_size_controller import BatchSizeController
+from omegaconf import OmegaConf
+
+from people_counting.common import Status
+from people_counting.people_counter import PeopleCounter
+from people_counting.tracker_backends import TrackerBackend
+
+
+class FakeObjectDetectionClient:
+    """Detect a single box covering each whole image"""
+
+    def __init__(self):
+        self.batch_size_controller = BatchSizeController()
+        self.detection_cache = None
+        self.images_shapes: List[tuple] = []
+
+    def predict_batch(self, images: List[np.ndarray], **_) -> List[pd.DataFrame]:
+        self.images_shapes.extend(image.shape for image in images)
+
+        return [
+            pd.DataFrame(
+                [[0, 0, image.shape[1], image.shape[0]]],
+                columns=["x_min", "y_min", "x_max", "y_max"],
+            )
+            for image in images
+        ]
+
+
+class FakeTracker(TrackerBackend):
+    """Keep the boxes the tracking was started with"""
+
+    def __init__(self):
+        self.bounding_boxes = np.empty((0, 4), dtype=int)
+        self.frames_shapes: List[tuple] = []
+
+    def start(self, frame: np.ndarray, bounding_boxes: np.ndarray):
+        self.bounding_boxes = bounding_boxes.copy()
+        self.frames_shapes.append(frame.shape)
+
+    def update(self, frame: np.ndarray) -> np.ndarray:
+        self.frames_shapes.append(frame.shape)
+
+        return self.bounding_boxes.copy()
+
+
+def make_people_counter(
+    counting_band_enabled: bool, line_placement_ratio: float = 0.5
+) -> PeopleCounter:
+    algorithm_config = OmegaConf.create(
+        {
+            "line_placement_ratio": line_placement_ratio,
+            "inference_periodicity": 2,
+            "detection_prefetching": {"enabled": False},
+            "counting_band": {"enabled": counting_band_enabled, "height_ratio": 0.5},
+            "motion_gating": {"enabled": False},
+        }
+    )
+
+    return PeopleCounter(
+        object_detection_client=FakeObjectDetectionClient(),
+        algorithm_config=algorithm_config,
+        image_width=40,
+        confidence_threshold=0.5,
+    )
+
+
+@pytest.mark.parametrize(
+    "line_placement_ratio,counting_band",
+    [(0.5, (25, 75)), (0.9, (65, 100)), (0.1, (0, 35))],
+)
+def test_get_counting_band_is_clamped_to_the_frame(
+    line_placement_ratio: float, counting_band: tuple
+):
+    people_counter = make_people_counter(
+        counting_band_enabled=True, line_placement_ratio=line_placement_ratio
+    )
+
+    assert people_counter._get_counting_band(frame_height=100) == counting_band
+
+
+def test_get_counting_band_disabled():
+    people_counter = make_people_counter(counting_band_enabled=False)
+
+    assert people_counter._get_counting_band(frame_height=100) == (0, 100)
+
+
+@pytest.mark.parametrize(
+    "counting_band_enabled,top,bottom", [(True, 25, 75), (False, 0, 100)]
+)
+def test_track_frames_maps_the_band_boxes_back_to_the_frame(
+    counting_band_enabled: bool, top: int, bottom: int
+):
+    people_counter = make_people_counter(counting_band_enabled=counting_band_enabled)
+    tracker = FakeTracker()
+    people_counter._create_tracker_backend = lambda **_: tracker
+    frames = [np.zeros((100, 40, 3), dtype=np.uint8) for _ in range(4)]
+
+    results = list(people_counter.track_frames(enumerate(frames)))
+
+    assert [status for _, _, status, _ in results] == [
+        Status.DETECTING,
+        Status.TRACKING,
+        Status.DETECTING,
+        Status.TRACKING,
+    ]
+    # only the band is detected and tracked
+    client = people_counter.model.object_detection_client
+    assert client.images_shapes == [(bottom - top, 40, 3)] * 2
+    assert tracker.frames_shapes == [(bottom - top, 40, 3)] * 4
+
+    for frame_number, frame, _, bounding_boxes in results:
+        assert frame is frames[frame_number]
+        np.testing.assert_array_equal(bounding_boxes, [[0, top, 40, bottom]])
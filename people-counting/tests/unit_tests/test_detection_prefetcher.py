@@ -0,0 +1,83 @@
+from typing import List
+
+import numpy as np
+import pytest
+
+from people_counting.common import BoundingBox
+from people_counting.detection_prefetcher import KeyframeDetectionPrefetcher
+
+
+class FakeModel:
+    def __init__(self):
+        self.batches_sizes: List[int] = []
+
+    def predict_batch(self, images: List[np.ndarray]) -> List[List[BoundingBox]]:
+        self.batches_sizes.append(len(images))
+
+        # the frame value is used as a marker to check the detections ordering
+        return [
+            [BoundingBox(x_min=0, y_min=0, x_max=int(image[0, 0]), y_max=1)]
+            for image in images
+        ]
+
+
+@pytest.fixture(name="frames")
+def fixture_frames() -> List[np.ndarray]:
+    return [np.full((4, 4), frame_number, dtype=np.uint8) for frame_number in range(47)]
+
+
+def test_prefetch_keeps_order_and_detections(frames: List[np.ndarray]):
+    model = FakeModel()
+    prefetcher = KeyframeDetectionPrefetcher(
+        model=model, lookahead_keyframes=3, batch_size=2
+    )
+
+    results = list(
+        prefetcher.prefetch(
+            frames=enumerate(frames),
+            is_keyframe=lambda frame_number, _: frame_number % 5 == 0,
+        )
+    )
+
+    assert [frame_number for frame_number, _, _ in results] == list(range(len(frames)))
+
+    for frame_number, frame, detections in results:
+        assert frame is frames[frame_number]
+
+        if frame_number % 5 == 0:
+            assert detections[0].x_max == frame_number
+        else:
+            assert detections is None
+
+    assert model.batches_sizes == [2, 2, 2, 2, 2]
+
+
+def test_prefetch_rejects_lookahead_smaller_than_batch():
+    with pytest.raises(ValueError):
+        KeyframeDetectionPrefetcher(
+            model=FakeModel(), lookahead_keyframes=1, batch_size=2
+        )
+
+
+def test_prefetch_bounds_the_buffered_frames(frames: List[np.ndarray]):
+    model = FakeModel()
+    prefetcher = KeyframeDetectionPrefetcher(
+        model=model, lookahead_keyframes=3, batch_size=2, max_buffered_frames=4
+    )
+    read_frames_numbers = []
+
+    def read_frames():
+        for frame_number, frame in enumerate(frames):
+            read_frames_numbers.append(frame_number)
+            yield frame_number, frame
+
+    results = prefetcher.prefetch(
+        frames=read_frames(), is_keyframe=lambda frame_number, _: frame_number == 1
+    )
+
+    for frame_number, _, detections in results:
+        # the frames are released although there are no more keyframes to read
+        assert read_frames_numbers[-1] - frame_number <= 4
+        assert (detections is not None) == (frame_number == 1)
+
+    assert model.batches_sizes == [1]
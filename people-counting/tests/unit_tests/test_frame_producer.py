@@ -0,0 +1,103 @@
+import threading
+import time
+from typing import Iterator, List
+
+import numpy as np
+import pytest
+
+from people_counting.frame_producer import FrameProducer
+
+
+def make_frames(frames_number: int) -> List[np.ndarray]:
+    return [
+        np.full((4, 4), frame_number, dtype=np.uint8)
+        for frame_number in range(frames_number)
+    ]
+
+
+def is_producer_running() -> bool:
+    return any(thread.name == "frame-producer" for thread in threading.enumerate())
+
+
+def test_produce_keeps_order_and_transforms_the_frames():
+    frames = make_frames(50)
+    producer = FrameProducer(queue_size=4)
+
+    results = list(producer.produce(frames, transform=lambda frame: frame * 2))
+
+    assert [frame_number for frame_number, _ in results] == list(range(len(frames)))
+    for frame_number, frame in results:
+        # the frame value is used as a marker of the frame ordering
+        assert frame[0, 0] == 2 * frame_number
+    assert not is_producer_running()
+
+
+def test_produce_stops_the_producer_when_the_consumer_stops_early():
+    produced_frames_numbers: List[int] = []
+
+    def frames() -> Iterator[np.ndarray]:
+        for frame_number, frame in enumerate(make_frames(100)):
+            produced_frames_numbers.append(frame_number)
+            yield frame
+
+    producer = FrameProducer(queue_size=2, put_timeout=0.01)
+    produced_frames = producer.produce(frames())
+    for _ in range(3):
+        next(produced_frames)
+    # let the producer fill the queue and block on it
+    time.sleep(0.1)
+
+    # the consumer stops, closing the generator which waits for the producer thread
+    closing_thread = threading.Thread(target=produced_frames.close)
+    closing_thread.start()
+    closing_thread.join(timeout=5)
+
+    assert not closing_thread.is_alive()
+    assert not is_producer_running()
+    assert len(produced_frames_numbers) < 100
+
+
+def test_produce_raises_the_producer_exceptions_to_the_consumer():
+    def frames() -> Iterator[np.ndarray]:
+        yield from make_frames(3)
+        raise OSError("The video cannot be decoded")
+
+    producer = FrameProducer(queue_size=2)
+    consumed_frames_numbers: List[int] = []
+
+    with pytest.raises(OSError, match="cannot be decoded"):
+        for frame_number, _ in producer.produce(frames()):
+            consumed_frames_numbers.append(frame_number)
+
+    assert consumed_frames_numbers == [0, 1, 2]
+    assert not is_producer_running()
+
+
+def test_produce_metrics_of_a_slow_consumer():
+    producer = FrameProducer(queue_size=2)
+
+    for _ in producer.produce(make_frames(10)):
+        time.sleep(0.01)
+
+    assert producer.metrics.frames_number == 10
+    assert producer.metrics.queue_depth_max <= 2
+    assert producer.metrics.queue_depth_mean > 0
+    # the producer is blocked on the full queue while the consumer sleeps
+    assert producer.metrics.producer_stall_time > 0.05
+
+
+def test_produce_metrics_of_a_slow_producer():
+    def frames() -> Iterator[np.ndarray]:
+        for frame in make_frames(10):
+            time.sleep(0.01)
+            yield frame
+
+    producer = FrameProducer(queue_size=32)
+
+    for _ in producer.produce(frames()):
+        pass
+
+    assert producer.metrics.frames_number == 10
+    # the queue is never full, so the producer never stalls
+    assert producer.metrics.producer_stall_time == 0.0
+    assert producer.metrics.consumer_stall_time > 0.05
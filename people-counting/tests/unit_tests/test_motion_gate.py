@@ -0,0 +1,27 @@
+import numpy as np
+
+from people_counting.motion_gate import MotionGate
+
+
+def make_frame(square_position: int = None) -> np.ndarray:
+    frame = np.zeros((120, 160, 3), dtype=np.uint8)
+
+    if square_position is not None:
+        frame[40:60, square_position : square_position + 20] = 255
+
+    return frame
+
+
+def test_motion_gate_skips_unchanged_keyframes_and_detects_changes_early():
+    motion_gate = MotionGate(inference_periodicity=5)
+    frames = [make_frame()] * 12 + [make_frame(square_position=50)] * 8
+
+    detected_frames_numbers = [
+        frame_number
+        for frame_number, frame in enumerate(frames)
+        if motion_gate(frame_number, frame)
+    ]
+
+    # the square appearing after the skipped keyframes is detected right away
+    assert detected_frames_numbers == [0, 12]
+    assert motion_gate.skipped_keyframes_number == 3
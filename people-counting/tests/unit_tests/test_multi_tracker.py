@@ -0,0 +1,98 @@
+from typing import List
+
+import dlib
+import numpy as np
+import pytest
+
+from people_counting.benchmarks.multi_tracker import make_synthetic_frames
+from people_counting.multi_tracker import MultiTracker
+
+
+def track_sequentially(frames: List[np.ndarray], first_boxes: np.ndarray) -> list:
+    trackers = []
+    for x_min, y_min, x_max, y_max in first_boxes:
+        tracker = dlib.correlation_tracker()
+        tracker.start_track(
+            frames[0], dlib.rectangle(int(x_min), int(y_min), int(x_max), int(y_max))
+        )
+        trackers.append(tracker)
+
+    frames_bounding_boxes = []
+    for frame in frames[1:]:
+        bounding_boxes = []
+        for tracker in trackers:
+            tracker.update(frame)
+            position = tracker.get_position()
+            bounding_boxes.append(
+                [
+                    int(position.left()),
+                    int(position.top()),
+                    int(position.right()),
+                    int(position.bottom()),
+                ]
+            )
+        frames_bounding_boxes.append(bounding_boxes)
+
+    return frames_bounding_boxes
+
+
+@pytest.mark.parametrize("max_workers,workers_number", [(1, 0), (2, 2)])
+def test_multi_tracker_matches_the_sequential_tracking(
+    max_workers: int, workers_number: int
+):
+    frames, first_boxes = make_synthetic_frames(
+        persons_number=8, frames_number=6, frame_shape=(120, 160)
+    )
+    multi_tracker = MultiTracker(max_workers=max_workers, min_trackers_per_worker=2)
+
+    try:
+        multi_tracker.start(frames[0], first_boxes)
+        workers = list(multi_tracker._workers)
+        frames_bounding_boxes = [
+            multi_tracker.update(frame).tolist() for frame in frames[1:]
+        ]
+
+        assert len(multi_tracker) == len(first_boxes)
+        assert len(workers) == workers_number
+        assert multi_tracker.workers_trackers_numbers == [4, 4][:workers_number]
+        assert frames_bounding_boxes == track_sequentially(frames, first_boxes)
+    finally:
+        multi_tracker.close()
+
+    for worker in workers:
+        assert not worker.is_alive()
+        assert worker.exitcode == 0
+    assert multi_tracker._workers == []
+    assert multi_tracker._connections == []
+
+
+def test_multi_tracker_restarts_the_workers_trackers():
+    frames, first_boxes = make_synthetic_frames(
+        persons_number=8, frames_number=6, frame_shape=(120, 160)
+    )
+    multi_tracker = MultiTracker(max_workers=2, min_trackers_per_worker=2)
+
+    try:
+        multi_tracker.start(frames[0], first_boxes)
+        workers = list(multi_tracker._workers)
+        multi_tracker.update(frames[1])
+
+        # fewer boxes are tracked in the current process, the workers being kept
+        multi_tracker.start(frames[2], first_boxes[:2])
+        assert multi_tracker.workers_trackers_numbers == []
+        assert (
+            multi_tracker.update(frames[3]).tolist()
+            == track_sequentially(frames[2:4], first_boxes[:2])[0]
+        )
+
+        # the workers are reused when enough boxes are tracked again
+        multi_tracker.start(frames[2], first_boxes)
+        assert multi_tracker._workers == workers
+        assert (
+            multi_tracker.update(frames[3]).tolist()
+            == track_sequentially(frames[2:4], first_boxes)[0]
+        )
+    finally:
+        multi_tracker.close()
+
+    assert all(not worker.is_alive() for worker in workers)
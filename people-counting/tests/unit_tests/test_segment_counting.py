@@ -0,0 +1,56 @@
+from unittest import mock
+
+from omegaconf import OmegaConf
+
+from people_counting.segment_counting import (
+    compute_segments,
+    compute_tracker_max_workers,
+    is_segment_counting_exact,
+)
+
+
+def test_compute_segments_starts_on_keyframes():
+    segments = compute_segments(
+        frames_number=100, inference_periodicity=15, segments_number=3
+    )
+
+    assert segments[0][0] == 0
+    assert segments[-1][1] == 100
+    assert all(start_index % 15 == 0 for start_index, _ in segments)
+    assert all(
+        stop_index == next_start_index
+        for (_, stop_index), (next_start_index, _) in zip(segments, segments[1:])
+    )
+
+
+def test_compute_segments_is_limited_by_keyframes_number():
+    assert compute_segments(
+        frames_number=20, inference_periodicity=15, segments_number=8
+    ) == [(0, 15), (15, 20)]
+    assert compute_segments(
+        frames_number=5, inference_periodicity=15, segments_number=4
+    ) == [(0, 5)]
+
+
+def test_compute_tracker_max_workers_shares_cpus():
+    with mock.patch("os.cpu_count", return_value=8):
+        assert compute_tracker_max_workers(segments_number=4) == 2
+        assert compute_tracker_max_workers(segments_number=3) == 2
+        assert compute_tracker_max_workers(segments_number=16) == 1
+        assert compute_tracker_max_workers(segments_number=1, max_workers=3) == 3
+        assert compute_tracker_max_workers(segments_number=2, max_workers=6) == 4
+
+
+def test_is_segment_counting_exact():
+    def make_algorithm_config(motion_gating_enabled: bool, tracker_backend: str):
+        return OmegaConf.create(
+            {
+                "motion_gating": {"enabled": motion_gating_enabled},
+                "tracker_backend": tracker_backend,
+            }
+        )
+
+    assert is_segment_counting_exact(make_algorithm_config(False, "dlib"))
+    assert not is_segment_counting_exact(make_algorithm_config(True, "dlib"))
+    assert not is_segment_counting_exact(make_algorithm_config(False, "kalman"))
+    assert not is_segment_counting_exact(make_algorithm_config(False, "optical_flow"))
@@ -0,0 +1,44 @@
+from core.schemas.people_counting import Detection, Direction
+
+from people_counting.common import Statistics
+
+
+def test_statistics_counts_and_histogram():
+    statistics = Statistics(histogram_interval=60.0, capacity=1)
+
+    for timestamp in [10.0, 50.0, 130.0]:
+        statistics.add_went_up(timestamp)
+    statistics.add_went_down(70.0)
+
+    assert (statistics.went_up_count, statistics.went_down_count) == (3, 1)
+    assert statistics.to_df()["count"].tolist() == [Direction.UP] * 3 + [Direction.DOWN]
+    assert statistics.to_histogram().to_dict(orient="list") == {
+        "UP": [2, 0, 1],
+        "DOWN": [0, 1, 0],
+    }
+    assert [detection.timestamp for detection in statistics.to_detections()] == [
+        10.0,
+        50.0,
+        130.0,
+        70.0,
+    ]
+
+
+def test_statistics_detections_round_trip():
+    statistics = Statistics(histogram_interval=60.0, capacity=1)
+    statistics.add_went_up(10.0)
+    statistics.add_went_down(70.0)
+
+    detections = statistics.to_detections()
+
+    assert detections == [
+        Detection(timestamp=10.0, direction=Direction.UP),
+        Detection(timestamp=70.0, direction=Direction.DOWN),
+    ]
+    assert [Detection.parse_raw(detection.json()) for detection in detections] == (
+        detections
+    )
+    assert [detection.dict() for detection in detections] == [
+        {"timestamp": 10.0, "direction": Direction.UP},
+        {"timestamp": 70.0, "direction": Direction.DOWN},
+    ]
@@ -0,0 +1,102 @@
+import logging
+import threading
+import time
+
+import cv2 as cv
+import numpy as np
+from core.schemas.asset import VideoAsset
+
+from people_counting.stream_counting import StreamFrameSource, count_people_in_stream
+from tests.unit_tests.fakes import create_fake_people_counter, write_crossings_video
+
+
+def write_video(path: str, frames_number: int):
+    writer = cv.VideoWriter(path, cv.VideoWriter_fourcc(*"MJPG"), 10, (32, 24))
+
+    for frame_number in range(frames_number):
+        writer.write(np.full((24, 32, 3), frame_number * 10, dtype=np.uint8))
+
+    writer.release()
+
+
+def test_stream_frame_source_drops_the_oldest_frames(tmp_path):
+    video_path = str(tmp_path / "video.avi")
+    write_video(video_path, frames_number=20)
+    frame_source = StreamFrameSource(video_path, queue_size=2)
+
+    frames = iter(frame_source)
+    next(frames)
+    # the consumer stalls until the whole source is read
+    frame_source._thread.join()
+    time_offsets = [time_offset for time_offset, _ in frames]
+
+    # only the latest frames are left, the other ones being dropped
+    assert 1 <= len(time_offsets) <= 2
+    assert np.isclose(time_offsets[-1], 1.9)
+    assert frame_source.read_frames_number == 20
+    assert frame_source.dropped_frames_number == 20 - 1 - len(time_offsets)
+
+
+class BlockingFrameSource(StreamFrameSource):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.release_event = threading.Event()
+
+    def _read(self):
+        yield 0.0, np.zeros((24, 32, 3), dtype=np.uint8)
+        # a read blocked on the source, which is not interrupted by the closing
+        self.release_event.wait()
+
+
+def test_stream_frame_source_close_does_not_wait_for_a_blocked_read(caplog):
+    frame_source = BlockingFrameSource("rtsp://camera", close_timeout=0.1)
+    frames = iter(frame_source)
+    next(frames)
+
+    start_time = time.monotonic()
+    with caplog.at_level(logging.WARNING):
+        frame_source.close()
+
+    assert time.monotonic() - start_time < 2
+    assert frame_source._thread.is_alive()
+    assert "still blocked" in caplog.text
+
+    frame_source.release_event.set()
+    frame_source._thread.join(timeout=2)
+    assert not frame_source._thread.is_alive()
+
+
+class FakeFrameSource:
+    """Yield the full resolution frames of a video, as a stream would"""
+
+    def __init__(self, video_asset: VideoAsset):
+        self.source = video_asset.asset_path
+        self.video_asset = video_asset
+        self.read_frames_number = 0
+        self.dropped_frames_number = 0
+
+    def __iter__(self):
+        for frame_number, frame in enumerate(self.video_asset.get_frames()):
+            self.read_frames_number += 1
+
+            yield frame_number * self.video_asset.time_step, frame
+
+
+def test_count_people_in_stream_matches_the_video_counting(tmp_path):
+    video_path = str(tmp_path / "video.avi")
+    write_crossings_video(video_path, scale=4)
+    video_asset = VideoAsset(
+        asset_path=video_path, time_step=None, probes_directory=str(tmp_path)
+    )
+    crossings = []
+
+    statistics = count_people_in_stream(
+        people_counter=create_fake_people_counter(),
+        frame_source=FakeFrameSource(video_asset),
+        on_crossing=crossings.append,
+    )
+    video_statistics = create_fake_people_counter().run(video_asset)
+
+    assert (statistics.went_down_count, statistics.went_up_count) == (1, 1)
+    assert crossings == statistics.to_detections()
+    assert statistics.to_detections() == video_statistics.to_detections()
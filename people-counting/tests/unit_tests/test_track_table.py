@@ -0,0 +1,24 @@
+import numpy as np
+
+from people_counting.track_table import TrackTable
+
+
+def test_update_evicts_unregistered_objects():
+    track_table = TrackTable()
+    track_table.update(np.array([0, 1]), np.array([[10, 10], [20, 20]]))
+
+    tracked = track_table.update(np.array([1, 2]), np.array([[21, 21], [30, 30]]))
+
+    assert tracked.tolist() == [True, False]
+    assert track_table.object_ids.tolist() == [1, 2]
+    assert track_table.first_centroids.tolist() == [[20, 20], [30, 30]]
+    assert track_table.last_centroids.tolist() == [[21, 21], [30, 30]]
+
+
+def test_get_trajectory_keeps_the_last_centroids():
+    track_table = TrackTable(history_size=2)
+
+    for position in range(4):
+        track_table.update(np.array([0]), np.array([[position, position]]))
+
+    assert track_table.get_trajectory(0).tolist() == [[2, 2], [3, 3]]
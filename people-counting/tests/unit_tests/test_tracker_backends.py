@@ -0,0 +1,35 @@
+import numpy as np
+
+from people_counting.tracker_backends import KalmanTracker, OpticalFlowTracker
+
+
+def make_frame(x_position: int, y_position: int) -> np.ndarray:
+    random_generator = np.random.default_rng(0)
+    frame = np.zeros((100, 120), dtype=np.uint8)
+    frame[
+        y_position : y_position + 20, x_position : x_position + 20
+    ] = random_generator.integers(64, 256, (20, 20), dtype=np.uint8)
+
+    return frame
+
+
+def test_kalman_tracker_extrapolates_the_detections_velocity():
+    kalman_tracker = KalmanTracker(measurement_noise=0.01)
+    frame = make_frame(0, 0)
+
+    kalman_tracker.start(frame, np.array([[10, 10, 30, 30]]))
+    for _ in range(4):
+        kalman_tracker.update(frame)
+    kalman_tracker.start(frame, np.array([[15, 10, 35, 30]]))
+
+    # the detections moved by 1 pixel per frame along x
+    assert kalman_tracker.update(frame).tolist() == [[16, 10, 36, 30]]
+
+
+def test_optical_flow_tracker_follows_the_boxes():
+    optical_flow_tracker = OpticalFlowTracker()
+
+    optical_flow_tracker.start(make_frame(40, 30), np.array([[40, 30, 60, 50]]))
+    bounding_boxes = optical_flow_tracker.update(make_frame(43, 32))
+
+    assert bounding_boxes.tolist() == [[43, 32, 63, 52]]
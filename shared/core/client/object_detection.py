@@ -1,5 +1,8 @@
+import base64
 import random
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Any, Dict, List, Optional
 
 import numpy as np
@@ -15,12 +18,22 @@ from core.exceptions import DependencyError
 from core.google.vertex_ai_manager import VertexAIManager
 from core.schemas.object_detection import (
     PREDICTION_COLUMNS,
+    InputSampleMetadataSchema,
     InputSampleSchema,
     OutputSchema,
 )
 from core.serialization.array import array_from_string
-from core.serialization.image import image_to_string
-from core.tools import split_list_into_two_parts
+from core.serialization.detections import (
+    BINARY_CONTENT_TYPE,
+    BINARY_PROTOCOL_VERSION,
+    decode_detections,
+    decode_image_width,
+    detections_to_dataframe,
+    encode_samples,
+)
+from core.serialization.image import image_to_binary
+from core.services.batch_size_controller import BatchSizeController
+from core.services.detection_cache import DetectionCache
 
 
 class ObjectDetectionClient:
@@ -35,12 +48,39 @@ class ObjectDetectionClient:
         model_name: str,
         endpoint_retry_wait_time: int = 30,
         endpoint_retry_timeout: int = 2700,
+        max_concurrent_requests: int = 4,
+        protocol_version: Optional[int] = None,
+        detection_cache: Optional[DetectionCache] = None,
+        overridden_image_width: Optional[int] = None,
+        batch_size_controller: Optional[BatchSizeController] = None,
     ):
         self.vertex_ai_manager = vertex_ai_manager
         self.model_instantiator_client = model_instantiator_client
         self.model_name = model_name
         self.endpoint_retry_wait_time = endpoint_retry_wait_time
         self.endpoint_retry_timeout = endpoint_retry_timeout
+        # maximum number of chunks being predicted at the same time by the client
+        self.max_concurrent_requests = max(max_concurrent_requests, 1)
+
+        # the protocol is negotiated if none: the JSON protocol is used until the
+        # model handler advertises the binary one in its responses
+        self.protocol_version = protocol_version
+        self._is_binary_protocol_supported = False
+        # the images already predicted are looked up in this cache if given
+        self.detection_cache = detection_cache
+
+        # the images are sent at the width they are resized to by the model handler
+        # before inference, which is either overridden by the client or learnt from
+        # the responses of the model handler
+        self.overridden_image_width = overridden_image_width
+        self._served_image_width: Optional[int] = None
+
+        # the number of images of each request is adapted to what the endpoint
+        # sustains, across the calls of the client
+        self.batch_size_controller = batch_size_controller or BatchSizeController()
+
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
 
     def _create_endpoint(self) -> Optional[requests.Response]:
         return self.model_instantiator_client.instantiate(self.model_name)
@@ -77,12 +117,29 @@ class ObjectDetectionClient:
 
         return True
 
+    @property
+    def image_width(self) -> Optional[int]:
+        if self.overridden_image_width is not None:
+            return self.overridden_image_width
+
+        return self._served_image_width
+
     def _resize_images(self, images: List[np.ndarray]) -> List[np.ndarray]:
         """
-        If any dimension of an image if greater than self.MAX_SIZE (width, height),
-        then the image is going to be resized without changing the ratio,
-        with self.MAX_SIZE being the maximum.
+        If the inference width is known, the images wider than it are resized to it
+        without changing the ratio, the model handler resizing them to it anyway.
+        Otherwise, if any dimension of an image if greater than self.MAX_SIZE
+        (width, height), then the image is going to be resized without changing the
+        ratio, with self.MAX_SIZE being the maximum.
         """
+        if (image_width := self.image_width) is not None:
+            return [
+                resize(image=image, width=image_width)
+                if image.shape[1] > image_width
+                else image
+                for image in images
+            ]
+
         return [
             resize(
                 image=image,
@@ -97,36 +154,36 @@ class ObjectDetectionClient:
         ]
 
     def _split_into_chunks(
-        self, preprocessed_images: List[Dict[str, str]]
-    ) -> List[List[Dict[str, str]]]:
+        self, preprocessed_images: List[Dict[str, Any]]
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Split the images into chunks of at most the batch size of the controller,
+        whose sizes do not exceed self.MAX_BYTES
+        """
         if len(preprocessed_images) == 0:
             return []
 
         if len(preprocessed_images) == 1:
             return [preprocessed_images]
 
-        if (
-            sum(
-                len(preprocessed_image["data"])
-                for preprocessed_image in preprocessed_images
-            )
-            <= self.MAX_BYTES
-        ):
-            return [preprocessed_images]
+        batch_size = self.batch_size_controller.batch_size
+        chunks: List[List[Dict[str, Any]]] = []
+        bytes_current_chunk = 0
 
         for index, preprocessed_image in enumerate(preprocessed_images):
-            if (image_bytes := len(preprocessed_image["data"])) > self.MAX_BYTES:
+            if (
+                bytes_current_image := len(preprocessed_image["data"])
+            ) > self.MAX_BYTES:
                 raise ValueError(
                     f"Cannot proceed, image at index {index} is too large: "
-                    f"{image_bytes/1e6}MB"
+                    f"{bytes_current_image/1e6}MB"
                 )
 
-        chunks, bytes_current_chunk = [[preprocessed_images[0]]], len(
-            preprocessed_images[0]["data"]
-        )
-        for preprocessed_image in preprocessed_images[1:]:
-            bytes_current_image = len(preprocessed_image["data"])
-            if bytes_current_image + bytes_current_chunk <= self.MAX_BYTES:
+            if (
+                len(chunks) > 0
+                and len(chunks[-1]) < batch_size
+                and bytes_current_image + bytes_current_chunk <= self.MAX_BYTES
+            ):
                 chunks[-1].append(preprocessed_image)
                 bytes_current_chunk += bytes_current_image
                 continue
@@ -136,22 +193,108 @@ class ObjectDetectionClient:
 
         return chunks
 
+    @property
+    def uses_binary_protocol(self) -> bool:
+        if self.protocol_version is None:
+            return self._is_binary_protocol_supported
+
+        return self.protocol_version == BINARY_PROTOCOL_VERSION
+
+    def _predict_with_json(
+        self,
+        endpoint: aiplatform.Endpoint,
+        chunk_preprocessed_images: List[Dict[str, Any]],
+    ) -> List[pd.DataFrame]:
+        outputs = [
+            OutputSchema.parse_obj(raw_prediction)
+            for raw_prediction in endpoint.predict(
+                chunk_preprocessed_images
+            ).predictions
+        ]
+
+        if any(
+            BINARY_PROTOCOL_VERSION in (output.protocol_versions or [])
+            for output in outputs
+        ):
+            self._is_binary_protocol_supported = True
+
+        for output in outputs:
+            if output.image_width is not None:
+                self._served_image_width = output.image_width
+
+        return [
+            pd.DataFrame(array_from_string(output.results), columns=PREDICTION_COLUMNS)
+            for output in outputs
+        ]
+
+    def _predict_with_binary(
+        self,
+        endpoint: aiplatform.Endpoint,
+        chunk_preprocessed_images: List[Dict[str, Any]],
+    ) -> List[pd.DataFrame]:
+        response = endpoint.raw_predict(
+            body=encode_samples(
+                images=[sample["data"] for sample in chunk_preprocessed_images],
+                samples=[
+                    {key: value for key, value in sample.items() if key != "data"}
+                    for sample in chunk_preprocessed_images
+                ],
+            ),
+            headers={"Content-Type": BINARY_CONTENT_TYPE},
+        )
+
+        if response.status_code == requests.codes.service_unavailable:
+            raise ServiceUnavailable(response.text)
+        response.raise_for_status()
+
+        detections, class_names = decode_detections(response.content)
+        if (image_width := decode_image_width(response.content)) is not None:
+            self._served_image_width = image_width
+
+        return [
+            detections_to_dataframe(sample_detections, class_names)
+            for sample_detections in detections
+        ]
+
     def _predict_batch(
         self,
-        chunk_preprocessed_images: List[Dict[str, str]],
+        chunk_preprocessed_images: List[Dict[str, Any]],
         max_tries: int = 5,
         base_retry_delay: float = 1.0,
         max_retry_delay: float = 32.0,
         current_try: int = 0,
-    ) -> List[Any]:
+    ) -> List[pd.DataFrame]:
         if len(chunk_preprocessed_images) == 0:
             return []
 
+        # the chunks built before a decrease of the batch size are split again
+        if len(chunk_preprocessed_images) > self.batch_size_controller.batch_size:
+            return [
+                prediction
+                for chunk in self._split_into_chunks(chunk_preprocessed_images)
+                for prediction in self._predict_batch(
+                    chunk_preprocessed_images=chunk,
+                    max_tries=max_tries,
+                    current_try=current_try,
+                )
+            ]
+
         endpoint = self._try_get_endpoint()
+        start_time = time.perf_counter()
 
         try:
-            return endpoint.predict(chunk_preprocessed_images).predictions
+            # the images are binary for the binary protocol, base64 strings otherwise
+            if isinstance(chunk_preprocessed_images[0]["data"], bytes):
+                predictions = self._predict_with_binary(
+                    endpoint, chunk_preprocessed_images
+                )
+            else:
+                predictions = self._predict_with_json(
+                    endpoint, chunk_preprocessed_images
+                )
         except ServiceUnavailable as service_unavailable:
+            self.batch_size_controller.record_failure(len(chunk_preprocessed_images))
+
             current_try += 1
             if current_try > max_tries:
                 raise service_unavailable
@@ -162,23 +305,117 @@ class ObjectDetectionClient:
 
             time.sleep(delay_with_random)
 
-            # we divide the initial list into smaller chunks in case the size of the
-            # initial list was an issue to be handled properly by the endpoint
-            (
-                left_chunk_preprocessed_images,
-                right_chunk_preprocessed_images,
-            ) = split_list_into_two_parts(chunk_preprocessed_images)
-
+            # the chunk is split again at the batch size decreased by the controller,
+            # in case its size was an issue to be handled properly by the endpoint
             return self._predict_batch(
-                chunk_preprocessed_images=left_chunk_preprocessed_images,
-                max_tries=max_tries,
-                current_try=current_try,
-            ) + self._predict_batch(
-                chunk_preprocessed_images=right_chunk_preprocessed_images,
+                chunk_preprocessed_images=chunk_preprocessed_images,
                 max_tries=max_tries,
                 current_try=current_try,
             )
 
+        self.batch_size_controller.record_success(
+            len(chunk_preprocessed_images), time.perf_counter() - start_time
+        )
+
+        return predictions
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_concurrent_requests,
+                    thread_name_prefix="object-detection",
+                )
+
+            return self._executor
+
+    def _predict_chunks(
+        self, chunks_preprocessed_images: List[List[Dict[str, Any]]]
+    ) -> List[List[pd.DataFrame]]:
+        """
+        Predict the chunks concurrently, the predictions being returned in the order
+        of the chunks. At most max_concurrent_requests chunks are predicted at a time,
+        whatever the number of callers, and the requests share the connection of the
+        endpoint, which is retrieved once before sending them.
+        """
+        if len(chunks_preprocessed_images) == 0:
+            return []
+
+        self._try_get_endpoint()
+
+        return list(
+            self._get_executor().map(self._predict_batch, chunks_preprocessed_images)
+        )
+
+    def _predict_binary_images(
+        self, binary_images: List[bytes], sample_metadata: Dict[str, Any]
+    ) -> List[pd.DataFrame]:
+        if self.uses_binary_protocol:
+            preprocessed_images = [
+                {"data": binary_image, **sample_metadata}
+                for binary_image in binary_images
+            ]
+        else:
+            preprocessed_images = [
+                InputSampleSchema(
+                    data=base64.b64encode(binary_image).decode("utf-8"),
+                    **sample_metadata,
+                ).dict(exclude_none=True)
+                for binary_image in binary_images
+            ]
+
+        chunks_preprocessed_images = self._split_into_chunks(preprocessed_images)
+
+        return [
+            prediction
+            for chunk_predictions in self._predict_chunks(chunks_preprocessed_images)
+            for prediction in chunk_predictions
+        ]
+
+    def _predict_binary_images_with_cache(
+        self, binary_images: List[bytes], sample_metadata: Dict[str, Any]
+    ) -> List[pd.DataFrame]:
+        """
+        Only send the images missed by the detection cache, once each, and add their
+        predictions to the cache
+        """
+        keys = [
+            self.detection_cache.build_key(
+                binary_image=binary_image,
+                model_name=self.model_name,
+                sample_metadata=sample_metadata,
+            )
+            for binary_image in binary_images
+        ]
+        predictions: Dict[str, pd.DataFrame] = {}
+        missed_binary_images: Dict[str, bytes] = {}
+
+        for key, binary_image in zip(keys, binary_images):
+            if key in predictions or key in missed_binary_images:
+                continue
+
+            if (cached_predictions := self.detection_cache.get(key)) is not None:
+                predictions[key] = cached_predictions
+            else:
+                missed_binary_images[key] = binary_image
+
+        if len(missed_binary_images) > 0:
+            start_time = time.perf_counter()
+            missed_predictions = self._predict_binary_images(
+                list(missed_binary_images.values()), sample_metadata
+            )
+            self.detection_cache.add_misses_latency(
+                latency=time.perf_counter() - start_time,
+                images_number=len(missed_binary_images),
+            )
+
+            for key, prediction in zip(missed_binary_images, missed_predictions):
+                self.detection_cache.put(key, prediction)
+                predictions[key] = prediction
+
+        # the duplicated images of the batch do not share their predictions
+        return [predictions[key].copy() for key in keys]
+
     def predict_batch(
         self,
         images: List[np.ndarray],
@@ -191,33 +428,20 @@ class ObjectDetectionClient:
         if not self._are_shapes_correct(images):
             raise ValueError("Incorrect received shapes")
 
-        preprocessed_images = [
-            InputSampleSchema(
-                data=image_to_string(
-                    frame=image,
-                    extension=self.PREPROCESSING_IMAGE_TYPE,
-                ),
-                labels_to_predict=labels,
-                confidence_threshold=confidence_threshold,
-            ).dict(exclude_none=True)
+        sample_metadata = InputSampleMetadataSchema(
+            labels_to_predict=labels,
+            confidence_threshold=confidence_threshold,
+            overridden_image_width=self.overridden_image_width,
+        ).metadata_filtered
+        binary_images = [
+            image_to_binary(frame=image, extension=self.PREPROCESSING_IMAGE_TYPE)
             for image in self._resize_images(images=images)
         ]
-        chunks_preprocessed_images = self._split_into_chunks(preprocessed_images)
 
-        raw_chunked_predictions = [
-            self._predict_batch(chunk_preprocessed_images)
-            for chunk_preprocessed_images in chunks_preprocessed_images
-        ]
-        predictions = [
-            array_from_string(OutputSchema.parse_obj(raw_prediction).results)
-            for raw_predictions in raw_chunked_predictions
-            for raw_prediction in raw_predictions
-        ]
+        if self.detection_cache is None:
+            return self._predict_binary_images(binary_images, sample_metadata)
 
-        return [
-            pd.DataFrame(prediction, columns=PREDICTION_COLUMNS)
-            for prediction in predictions
-        ]
+        return self._predict_binary_images_with_cache(binary_images, sample_metadata)
 
     def predict_single(
         self,
@@ -1,14 +1,16 @@
+import base64
 import datetime
+import hashlib
 import json
 import logging
 import os
 import tempfile
 import time
-from typing import Dict, List, Optional, Tuple, Union
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
-from google.api_core.exceptions import Conflict, NotFound
+from google.api_core.exceptions import Conflict, NotFound, PreconditionFailed
 from google.cloud import storage
 from google.cloud.storage import Bucket
 from tqdm import tqdm
@@ -217,6 +219,78 @@ class StorageClient:
             f"{destination_file_name}"
         )
 
+    def get_blob_hash(self, bucket_name: str, blob_name: str) -> str:
+        """
+        Retrieve the hash of a blob from its metadata, without downloading it.
+
+        The hash is the MD5 hexadecimal digest of its content, as computed by
+        Asset.get_hash. The composite blobs not having an MD5 hash, theirs is derived
+        from their CRC32C checksum and generation.
+
+        :param bucket_name: The bucket name.
+        :param blob_name: The blob name.
+
+        :return: The blob hash.
+        """
+        bucket: Bucket = self.client.bucket(bucket_name)
+        blob = bucket.get_blob(blob_name)
+
+        if blob is None:
+            message = (
+                f"The blob {blob_name} has not been found in the bucket "
+                f"{bucket_name}"
+            )
+            logger.info(message)
+            raise DependencyError(message)
+
+        if blob.md5_hash is not None:
+            return base64.b64decode(blob.md5_hash).hex()
+
+        return hashlib.md5(f"{blob.crc32c}:{blob.generation}".encode()).hexdigest()
+
+    def iterate_blob_chunks(
+        self, bucket_name: str, blob_name: str, chunk_size: int = 2**23
+    ) -> Iterator[bytes]:
+        """
+        Download a blob by ranged reads, yielding its content chunk by chunk.
+
+        The ranges are read from the generation of the blob found first, so that the
+        chunks never mix several versions of it. They are not validated one by one, the
+        checksum of the whole content being left to the caller.
+
+        :param bucket_name: The bucket name.
+        :param blob_name: The blob name.
+        :param chunk_size: The number of bytes of each ranged read.
+
+        :return: An iterator over the chunks of the blob content.
+        """
+        bucket: Bucket = self.client.bucket(bucket_name)
+        blob = bucket.get_blob(blob_name)
+
+        if blob is None:
+            message = (
+                f"The blob {blob_name} has not been found in the bucket "
+                f"{bucket_name}"
+            )
+            logger.info(message)
+            raise DependencyError(message)
+
+        for start in range(0, blob.size, chunk_size):
+            try:
+                yield blob.download_as_bytes(
+                    start=start,
+                    end=min(start + chunk_size, blob.size) - 1,
+                    if_generation_match=blob.generation,
+                    checksum=None,
+                )
+            except (NotFound, PreconditionFailed) as exception:
+                message = (
+                    f"The blob {blob_name} of the bucket {bucket_name} has been "
+                    f"deleted or replaced while being downloaded"
+                )
+                logger.info(message)
+                raise DependencyError(message) from exception
+
     def download_blob(
         self, bucket_name: str, blob_name: str, as_json: bool = False
     ) -> Union[dict, bytes]:
@@ -4,3 +4,13 @@ from typing import List
 
 def combine_hashes(hashes: List[str]) -> str:
     return hashlib.md5("".join(sorted(hashes)).encode()).hexdigest()
+
+
+def hash_file(file_path: str, buffer_size: int = 2**24) -> str:
+    hash_md5 = hashlib.md5()
+
+    with open(file_path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(buffer_size), b""):
+            hash_md5.update(chunk)
+
+    return hash_md5.hexdigest()
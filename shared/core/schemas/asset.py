@@ -1,12 +1,15 @@
 from __future__ import annotations as type_annotations
 
+import bisect
 import contextlib
-import hashlib
+import io
+import mmap
 import os
+import struct
 import tempfile
 from abc import ABC
 from enum import Enum
-from typing import Any, Iterator, List, Optional, Type, Union
+from typing import Any, Iterator, List, Optional, Sequence, Tuple, Type, Union
 
 import cv2 as cv
 import librosa
@@ -14,7 +17,16 @@ import numpy as np
 from moviepy.audio.io.AudioFileClip import AudioFileClip
 from pydantic import BaseModel, root_validator, validator
 
+from core.hashing import hash_file
 from core.path import LocalPath
+from core.services.ffmpeg_reader import FfmpegFrameReader, build_sampling_expression
+from core.services.frame_cache import FrameCache
+from core.services.streamed_file import StreamedFile
+from core.services.video_probe import (
+    VIDEO_PROBES_DIRECTORY,
+    VideoProbeCache,
+    probe_video_header,
+)
 from core.tools import extract_file_extension, get_chunks_from_iterable
 
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png"}
@@ -63,6 +75,58 @@ def bgr_to_rgb(frame: np.ndarray) -> np.ndarray:
     return cv.cvtColor(frame, cv.COLOR_BGR2RGB)
 
 
+def resize_to_width(frame: np.ndarray, width: int) -> np.ndarray:
+    """Resize the frame to the given width, keeping its aspect ratio"""
+    height = int(frame.shape[0] * (width / frame.shape[1]))
+
+    return cv.resize(frame, (width, height), interpolation=cv.INTER_AREA)
+
+
+def build_array_header(
+    shape: Tuple[int, ...], header_bytes_number: Optional[int] = None
+) -> bytes:
+    """
+    Build the .npy header of a uint8 array of the given shape, padded to
+    header_bytes_number bytes if given so that it can replace a header in place.
+    """
+    header_file = io.BytesIO()
+    np.lib.format.write_array_header_1_0(
+        header_file,
+        {
+            "descr": np.lib.format.dtype_to_descr(np.dtype(np.uint8)),
+            "fortran_order": False,
+            "shape": shape,
+        },
+    )
+    header = header_file.getvalue()
+
+    if header_bytes_number is None:
+        return header
+
+    # the magic string and the version, the size of the dictionary, then the
+    # dictionary padded with spaces and ended by a newline
+    magic_string, dictionary = header[:8], header[10:].rstrip(b" \n")
+    if len(dictionary) + 11 > header_bytes_number:
+        raise ValueError(
+            f"The header of the shape {shape} does not fit in {header_bytes_number} "
+            f"bytes"
+        )
+
+    return (
+        magic_string
+        + struct.pack("<H", header_bytes_number - 10)
+        + dictionary.ljust(header_bytes_number - 11)
+        + b"\n"
+    )
+
+
+class VideoReaderBackend(str, Enum):
+    # decoding with OpenCV, the frames being resized afterwards if needed
+    OPENCV = "opencv"
+    # decoding with an ffmpeg subprocess sampling, scaling and converting the frames
+    FFMPEG = "ffmpeg"
+
+
 class AssetMeta(ABC, BaseModel):
     asset_type: AssetType
     width: int
@@ -90,6 +154,10 @@ class VideoAssetMeta(AssetMeta):
     frames_number: int
     sampled_frames_number: int
     initial_fps: float
+    # exact frame rate, initial_fps being truncated, and timestamp of the first frame,
+    # which convert the frame numbers to timestamps and back
+    frame_rate: Optional[float] = None
+    start_time: float = 0.0
     time_step: float
     # do not specify the duration, because it can be deduced from the other fields
     duration: float
@@ -131,6 +199,8 @@ def build_asset_meta(
 class Asset(BaseModel, ABC):
     asset_path: LocalPath
     delete: bool = False
+    # MD5 hash of the content, computed once
+    content_hash: Optional[str] = None
 
     @validator("asset_path", pre=True)
     # pylint: disable=no-self-argument
@@ -156,13 +226,10 @@ class Asset(BaseModel, ABC):
         raise NotImplementedError
 
     def get_hash(self, buffer_size: int = 2**24) -> str:
-        hash_md5 = hashlib.md5()
-
-        with open(self.asset_path, "rb") as fp:
-            for chunk in iter(lambda: fp.read(buffer_size), b""):
-                hash_md5.update(chunk)
+        if self.content_hash is None:
+            self.content_hash = hash_file(self.asset_path, buffer_size=buffer_size)
 
-        return hash_md5.hexdigest()
+        return self.content_hash
 
     def __del__(self):
         if self.delete and os.path.exists(self.asset_path):
@@ -223,6 +290,16 @@ class VideoAsset(VisualAsset):
     asset_meta: VideoAssetMeta
     time_step: float
     to_rgb: bool = True
+    # count the frames by decoding the video instead of trusting the container index
+    exact_frames_number: bool = False
+    probes_directory: str = VIDEO_PROBES_DIRECTORY
+    reader_backend: VideoReaderBackend = VideoReaderBackend.OPENCV
+    # the frames are resized to this width when read, keeping the aspect ratio
+    target_width: Optional[int] = None
+    # the read frames are cached on the local disk if given
+    frame_cache: Optional[FrameCache] = None
+    # the video file being downloaded, if it is read while it is downloaded
+    streamed_file: Optional[StreamedFile] = None
 
     @staticmethod
     def estimate_sampled_frames_number(
@@ -245,8 +322,13 @@ class VideoAsset(VisualAsset):
             video_capture.release()
 
     @classmethod
-    def _read(cls, asset_path: str, to_rgb: bool = False) -> Iterator[np.ndarray]:
+    def _read(
+        cls, asset_path: str, to_rgb: bool = False, start_frame_number: int = 0
+    ) -> Iterator[np.ndarray]:
         with cls._capture_video(asset_path) as video_capture:
+            if start_frame_number > 0:
+                video_capture.set(cv.CAP_PROP_POS_FRAMES, start_frame_number)
+
             while video_capture.isOpened():
                 is_read, frame = video_capture.read()
                 if not is_read:
@@ -264,16 +346,45 @@ class VideoAsset(VisualAsset):
     def fill_metadata(cls, values: dict) -> dict:
         asset_path = values["asset_path"]
 
-        with cls._capture_video(asset_path) as video_capture:
-            initial_fps = int(video_capture.get(cv.CAP_PROP_FPS))
-            width = int(video_capture.get(cv.CAP_PROP_FRAME_WIDTH))
-            height = int(video_capture.get(cv.CAP_PROP_FRAME_HEIGHT))
-            # the exact number of frames cannot be properly retrieved using
-            # cv.CAP_PROP_FRAME_COUNT because it does not take into account
-            # unreadable/corrupted frames, resulting in a potential small difference
-            # between the cv.CAP_PROP_FRAME_COUNT value and the actual number of frames
-            # read subsequently
-            frames_number = sum(1 for _ in cls._read(asset_path))
+        if not os.path.exists(asset_path):
+            raise ValueError(f"The following asset path is not existing: {asset_path}")
+
+        streamed_file = values.get("streamed_file")
+        video_probe = None
+
+        # a video being downloaded is probed from its header, unless it is required to
+        # be hashed or its frames to be counted exactly
+        if (
+            streamed_file is not None
+            and values.get("content_hash") is not None
+            and values.get("exact_frames_number", False) is False
+        ):
+            video_probe = probe_video_header(asset_path)
+
+        if video_probe is None:
+            if streamed_file is not None:
+                streamed_file.wait_for()
+
+            if values.get("content_hash") is None:
+                values["content_hash"] = hash_file(asset_path)
+
+            # the metadata are read from the container and cached by content hash, the
+            # frames are only decoded to count them exactly when it is required
+            video_probe = VideoProbeCache(
+                values.get("probes_directory", VIDEO_PROBES_DIRECTORY)
+            ).get_or_probe(
+                asset_path,
+                content_hash=values["content_hash"],
+                exact=values.get("exact_frames_number", False),
+            )
+        initial_fps = int(video_probe.initial_fps)
+        width = video_probe.width
+        height = video_probe.height
+        frames_number = (
+            video_probe.frames_number
+            if video_probe.exact_frames_number is None
+            else video_probe.exact_frames_number
+        )
 
         if values["time_step"] is None:
             values["time_step"] = 1 / initial_fps
@@ -290,43 +401,339 @@ class VideoAsset(VisualAsset):
             height=height,
             frames_number=frames_number,
             initial_fps=initial_fps,
+            frame_rate=video_probe.initial_fps,
+            start_time=video_probe.start_time,
             sampled_frames_number=sampled_frames_number,
             time_step=values["time_step"],
         )
 
         return values
 
-    def _get_frames(self) -> Iterator[np.ndarray]:
+    @property
+    def sampled_frames_offsets(self) -> Tuple[int, ...]:
+        """The frame numbers of the sampled frames, in the initial video"""
         duration = self.asset_meta.frames_number / self.asset_meta.initial_fps
 
-        sampled_frames_offsets = tuple(
+        return tuple(
             int(time_offset * self.asset_meta.initial_fps)
             for time_offset in np.arange(0, duration, self.time_step)
         )
 
-        sampled_frames_index = 0
-        for frame_number, frame in enumerate(self._read(self.asset_path, self.to_rgb)):
-            while (
-                sampled_frames_index < len(sampled_frames_offsets)
-                and frame_number == sampled_frames_offsets[sampled_frames_index]
-            ):
+    @classmethod
+    def _read_frames_at(
+        cls,
+        asset_path: str,
+        frames_numbers: Sequence[int],
+        to_rgb: bool = False,
+        seek_frames_threshold: int = 256,
+        keyframes: Optional[Sequence[int]] = None,
+        keyframe_seek_frames_threshold: int = 32,
+    ) -> Iterator[np.ndarray]:
+        """
+        Yield the frames at the given non-decreasing frame numbers.
+
+        The skipped frames are only grabbed, which spares their conversion. A seek
+        decodes from the keyframe preceding the frame, and costs about as much as
+        decoding a few dozens of frames. Given the sorted keyframes numbers, the video
+        is seeked when it spares decoding more than keyframe_seek_frames_threshold
+        frames. Otherwise, it is seeked when more than seek_frames_threshold frames are
+        skipped, which only pays off for gaps longer than the typical group of
+        pictures (250 frames for the x264 defaults). Only the yielded frames are
+        converted to RGB.
+        """
+        with cls._capture_video(asset_path) as video_capture:
+            if not video_capture.isOpened():
+                raise ValueError(f"Could not open the following asset: {asset_path}")
+
+            # number of the next frame of the capture
+            position = 0
+            frame = None
+
+            for frame_number in frames_numbers:
+                # the same frame may be sampled several times
+                if frame_number == position - 1 and frame is not None:
+                    yield frame
+                    continue
+
+                if keyframes is None:
+                    should_seek = frame_number - position > seek_frames_threshold or (
+                        position == 0 and frame_number > 0
+                    )
+                else:
+                    keyframe_index = bisect.bisect_right(keyframes, frame_number) - 1
+                    should_seek = (
+                        keyframe_index >= 0
+                        and keyframes[keyframe_index] - position
+                        > keyframe_seek_frames_threshold
+                    )
+
+                if should_seek:
+                    video_capture.set(cv.CAP_PROP_POS_FRAMES, frame_number)
+                    position = frame_number
+
+                while position < frame_number:
+                    if not video_capture.grab():
+                        return
+                    position += 1
+
+                is_read, frame = video_capture.read()
+                if not is_read:
+                    return
+                position += 1
+
+                if to_rgb is True:
+                    frame = bgr_to_rgb(frame)
+
                 yield frame
 
-                sampled_frames_index += 1
+    def __del__(self):
+        # the download is stopped before its file is deleted
+        if self.streamed_file is not None:
+            self.streamed_file.close()
+
+        super().__del__()
+
+    @property
+    def is_streamed(self) -> bool:
+        """Whether the video is still being downloaded"""
+        return self.streamed_file is not None and not self.streamed_file.is_complete
+
+    @property
+    def keyframes(self) -> List[int]:
+        """The keyframes numbers, indexed once and persisted with the video probe"""
+        if self.streamed_file is not None:
+            self.streamed_file.wait_for()
+
+        return (
+            VideoProbeCache(self.probes_directory)
+            .get_or_probe(
+                self.asset_path, content_hash=self.get_hash(), with_keyframes=True
+            )
+            .keyframes
+        )
+
+    def _read_frames_with_ffmpeg(
+        self, frames_numbers: Sequence[int], width: Optional[int] = None
+    ) -> Iterator[np.ndarray]:
+        if len(frames_numbers) == 0:
+            return
+
+        start_frame_number = frames_numbers[0]
+        # a video being downloaded can only be fed to ffmpeg from its start
+        input_chunks = None
+        if self.is_streamed and start_frame_number == 0:
+            input_chunks = self.streamed_file.iterate_chunks()
+        elif self.streamed_file is not None:
+            self.streamed_file.wait_for()
+
+        frame_reader = FfmpegFrameReader(
+            self.asset_path,
+            source_width=self.asset_meta.width,
+            source_height=self.asset_meta.height,
+            width=width,
+            to_rgb=self.to_rgb,
+        )
+        # ffmpeg samples the frames itself, after seeking a frame before the first one
+        # so that the seek does not depend on the timestamps rounding, the timestamps
+        # being converted at the exact frame rate
+        frame_rate = self.asset_meta.frame_rate or self.asset_meta.initial_fps
+        frames = frame_reader.read(
+            select_expression=build_sampling_expression(
+                time_step=self.time_step,
+                initial_fps=self.asset_meta.initial_fps,
+                start_frame_number=start_frame_number,
+                frame_rate=frame_rate,
+                start_time=self.asset_meta.start_time,
+            ),
+            start_time=(
+                (start_frame_number - 1) / frame_rate
+                if start_frame_number > 0
+                else None
+            ),
+            input_chunks=input_chunks,
+        )
+
+        with contextlib.closing(frames):
+            previous_frame_number = None
+
+            for frame_number in frames_numbers:
+                # the same frame may be sampled several times
+                if frame_number != previous_frame_number:
+                    frame = next(frames, None)
+                    if frame is None:
+                        return
+                    previous_frame_number = frame_number
+
+                yield frame
+
+    def _read_frames(
+        self,
+        frames_numbers: Sequence[int],
+        width: Optional[int],
+        reader_backend: VideoReaderBackend,
+    ) -> Iterator[np.ndarray]:
+        if reader_backend == VideoReaderBackend.FFMPEG:
+            yield from self._read_frames_with_ffmpeg(frames_numbers, width=width)
+            return
+
+        if self.streamed_file is not None:
+            self.streamed_file.wait_for()
+
+        for frame in self._read_frames_at(
+            self.asset_path,
+            frames_numbers,
+            to_rgb=self.to_rgb,
+            keyframes=self.keyframes,
+        ):
+            yield frame if width is None else resize_to_width(frame, width)
+
+    def _get_frames(
+        self,
+        start_index: int = 0,
+        stop_index: Optional[int] = None,
+        width: Optional[int] = None,
+        reader_backend: Optional[VideoReaderBackend] = None,
+        frame_cache: Optional[FrameCache] = None,
+    ) -> Iterator[np.ndarray]:
+        width = width or self.target_width
+        reader_backend = reader_backend or self.reader_backend
+        frame_cache = frame_cache or self.frame_cache
+
+        frames = self._read_frames(
+            self.sampled_frames_offsets[start_index:stop_index],
+            width=width,
+            reader_backend=reader_backend,
+        )
+
+        if frame_cache is None:
+            return frames
+
+        return frame_cache.get_frames(
+            key=frame_cache.build_key(
+                content_hash=self.get_hash(),
+                time_step=self.time_step,
+                width=width,
+                color_space="rgb" if self.to_rgb else "bgr",
+                reader_backend=reader_backend.value,
+            ),
+            read_frames=frames,
+            start_index=start_index,
+            stop_index=stop_index,
+        )
 
     @property
     def content(self) -> Iterator[np.ndarray]:
         return self._get_frames()
 
+    def get_frames(
+        self,
+        start_index: int = 0,
+        stop_index: Optional[int] = None,
+        width: Optional[int] = None,
+        reader_backend: Optional[VideoReaderBackend] = None,
+        frame_cache: Optional[FrameCache] = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Iterate over the sampled frames from start_index (included) to stop_index
+        (excluded), seeking the video to the first one instead of decoding the
+        preceding frames. The width, the reader backend and the frame cache default to
+        the ones of the asset.
+        """
+        return self._get_frames(
+            start_index=start_index,
+            stop_index=stop_index,
+            width=width,
+            reader_backend=reader_backend,
+            frame_cache=frame_cache,
+        )
+
     @property
     def binary_content(self) -> Iterator[bytes]:
         for frame in self._get_frames():
             yield self.to_binary(frame)
 
+    def to_array(
+        self,
+        width: Optional[int] = None,
+        grayscale: bool = False,
+        array_path: Optional[str] = None,
+        flush_bytes_number: int = 2**26,
+    ) -> np.ndarray:
+        """
+        Store the sampled frames in a (T, H, W, C) array, or (T, H, W) if grayscale,
+        memory-mapped to a .npy file. The file is preallocated and filled one frame at
+        a time, the written pages being flushed and released every flush_bytes_number
+        bytes, so that the frames are never all held in memory.
+
+        :param width: The width the frames are resized to, keeping the aspect ratio.
+        :param grayscale: Whether the frames are converted to grayscale.
+        :param array_path: The path of the .npy file, which is kept. If not given, a
+        temporary file is used and deleted right away, the memory mapping remaining
+        valid until the array is released.
+        :param flush_bytes_number: The number of bytes written between two flushes.
+        """
+        frame_width = width or self.asset_meta.width
+        frame_height = int(
+            self.asset_meta.height * (frame_width / self.asset_meta.width)
+        )
+        frame_shape = (
+            (frame_height, frame_width) if grayscale else (frame_height, frame_width, 3)
+        )
+        shape = (self.asset_meta.sampled_frames_number,) + frame_shape
+        color_to_gray = cv.COLOR_RGB2GRAY if self.to_rgb else cv.COLOR_BGR2GRAY
+
+        is_temporary = array_path is None
+        if is_temporary:
+            file_descriptor, array_path = tempfile.mkstemp(suffix=".npy")
+            os.close(file_descriptor)
+
+        try:
+            with open(array_path, "w+b") as array_file:
+                array_file.write(build_array_header(shape))
+                offset = array_file.tell()
+                array_file.truncate(offset + int(np.prod(shape)))
+                frames_mmap = mmap.mmap(array_file.fileno(), 0)
+        finally:
+            if is_temporary:
+                os.unlink(array_path)
+
+        frames_array = np.ndarray(
+            shape, dtype=np.uint8, buffer=frames_mmap, offset=offset
+        )
+        flush_frames_number = max(flush_bytes_number // int(np.prod(frame_shape)), 1)
+
+        frames_number = 0
+        for frame in self.get_frames(width=width):
+            if frames_number == len(frames_array):
+                break
+
+            frames_array[frames_number] = (
+                cv.cvtColor(frame, color_to_gray) if grayscale else frame
+            )
+            frames_number += 1
+
+            # the written pages are read back from the file when accessed again
+            if frames_number % flush_frames_number == 0:
+                frames_mmap.flush()
+                frames_mmap.madvise(mmap.MADV_DONTNEED)
+
+        # the container may announce more frames than the decodable ones, the kept
+        # file is then cut to the decoded frames, which do not move
+        if frames_number < len(frames_array) and not is_temporary:
+            frames_mmap[:offset] = build_array_header(
+                (frames_number,) + frame_shape, header_bytes_number=offset
+            )
+            frames_mmap.flush()
+            os.truncate(array_path, offset + frames_number * int(np.prod(frame_shape)))
+        else:
+            frames_mmap.flush()
+
+        return frames_array[:frames_number]
+
     @property
     def as_array_content(self) -> np.ndarray:
-        """Convert the frames as a single 4-D (T, W, H, C) NumPy array."""
-        return np.array(list(self.content))
+        """Convert the frames as a single 4-D (T, H, W, C) memory-mapped array."""
+        return self.to_array()
 
     @property
     def frame_offsets(self) -> List[int]:
@@ -343,12 +750,11 @@ class VideoAsset(VisualAsset):
     def get_frame_at_index(
         self, index: int, as_binary: bool = False
     ) -> Union[np.ndarray, bytes]:
-        for current_index, frame in enumerate(self.content):
-            if current_index == index:
-                if as_binary:
-                    return self.to_binary(frame)
+        if not 0 <= index < self.asset_meta.sampled_frames_number:
+            raise IndexError(f"index={index} is out of range")
 
-                return frame
+        for frame in self.get_frame_at_indexes([index], as_binary=as_binary):
+            return frame
 
         raise IndexError(f"index={index} is out of range")
 
@@ -366,13 +772,20 @@ class VideoAsset(VisualAsset):
         ):
             raise ValueError("Received some out of range indexes")
 
-        for current_index, frame in enumerate(self.content):
-            if current_index in indexes:
-                if as_binary:
-                    yield self.to_binary(frame)
+        sampled_frames_offsets = self.sampled_frames_offsets
 
-                else:
-                    yield frame
+        # the frames are read in a single pass, seeking to the keyframes preceding them
+        for frame in self._read_frames_at(
+            self.asset_path,
+            [sampled_frames_offsets[index] for index in indexes],
+            to_rgb=self.to_rgb,
+            keyframes=self.keyframes,
+        ):
+            if as_binary:
+                yield self.to_binary(frame)
+
+            else:
+                yield frame
 
 
 class AudioContent(Asset):
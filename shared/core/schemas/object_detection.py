@@ -19,8 +19,7 @@ class Device(str, Enum):
     CUDA = "cuda"
 
 
-class InputSampleSchema(BaseModel):
-    data: str
+class InputSampleMetadataSchema(BaseModel):
     labels_to_predict: Optional[List[str]] = None
     confidence_threshold: Optional[float] = None
     overridden_image_width: Optional[int] = None
@@ -44,39 +43,59 @@ class InputSampleSchema(BaseModel):
         }
 
 
-class InputSchema(BaseModel):
-    samples: List[InputSampleSchema]
-
-    @validator("samples")
-    # pylint: disable=no-self-argument
-    def validate_metadata_batch_unicity(
-        cls, samples: List[InputSampleSchema]
-    ) -> List[InputSampleSchema]:
-        if len(samples) == 0:
-            return []
+class InputSampleSchema(InputSampleMetadataSchema):
+    data: str
 
-        first_sample = samples[0]
-        first_sample_metadata_filtered = first_sample.metadata_filtered
 
-        error_message = (
-            "If some metadata is specified for one sample, it has to be "
-            "equally specified for every samples"
-        )
+def validate_metadata_batch_unicity(
+    samples: List[InputSampleMetadataSchema],
+) -> List[InputSampleMetadataSchema]:
+    if len(samples) == 0:
+        return []
 
-        if len(first_sample_metadata_filtered) == 0:
-            if any(len(sample.metadata_filtered) > 0 for sample in samples):
-                raise ValueError(error_message)
+    first_sample = samples[0]
+    first_sample_metadata_filtered = first_sample.metadata_filtered
 
-            return samples
+    error_message = (
+        "If some metadata is specified for one sample, it has to be "
+        "equally specified for every samples"
+    )
 
-        if any(
-            sample.metadata_filtered != first_sample_metadata_filtered
-            for sample in samples
-        ):
+    if len(first_sample_metadata_filtered) == 0:
+        if any(len(sample.metadata_filtered) > 0 for sample in samples):
             raise ValueError(error_message)
 
         return samples
 
+    if any(
+        sample.metadata_filtered != first_sample_metadata_filtered for sample in samples
+    ):
+        raise ValueError(error_message)
+
+    return samples
+
+
+class InputSchema(BaseModel):
+    samples: List[InputSampleSchema]
+
+    _validate_samples = validator("samples", allow_reuse=True)(
+        validate_metadata_batch_unicity
+    )
+
+
+class BinaryInputSchema(BaseModel):
+    """The samples of a request of the binary protocol, the images being apart"""
+
+    samples: List[InputSampleMetadataSchema]
+
+    _validate_samples = validator("samples", allow_reuse=True)(
+        validate_metadata_batch_unicity
+    )
+
 
 class OutputSchema(BaseModel):
     results: str
+    # the protocol versions supported by the model handler, none if only JSON
+    protocol_versions: Optional[List[int]] = None
+    # the width the images are resized to before inference, none if not advertised
+    image_width: Optional[int] = None
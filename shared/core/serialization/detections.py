@@ -0,0 +1,187 @@
+"""
+Binary protocol of the object detection predictions, which spares the base64 encoding
+of the images and the pickling of the results of the JSON protocol.
+
+A message is made of a fixed prefix (the magic bytes, the protocol version and the
+size of the header), a JSON header, then the payload:
+- a request carries the encoded images one after the other, the header giving their
+  sizes and the parameters of each sample
+- a response carries the detections of every sample as a single structured array, the
+  header giving the number of detections of each sample, the names of the classes and
+  the width of the images at inference if advertised
+"""
+import json
+import struct
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from core.schemas.object_detection import PREDICTION_COLUMNS
+
+JSON_PROTOCOL_VERSION = 1
+BINARY_PROTOCOL_VERSION = 2
+
+BINARY_CONTENT_TYPE = "application/octet-stream"
+
+MAGIC_BYTES = b"NNOD"
+# magic bytes, protocol version and header size, little-endian
+PREFIX_FORMAT = "<4sBI"
+PREFIX_SIZE = struct.calcsize(PREFIX_FORMAT)
+
+DETECTIONS_DTYPE = np.dtype(
+    [
+        ("x_min", "<f4"),
+        ("y_min", "<f4"),
+        ("x_max", "<f4"),
+        ("y_max", "<f4"),
+        ("score", "<f4"),
+        ("class_id", "<i4"),
+    ]
+)
+
+
+def is_binary_message(content: Any) -> bool:
+    return isinstance(content, (bytes, bytearray)) and content[:4] == MAGIC_BYTES
+
+
+def _encode_message(header: Dict[str, Any], payload: bytes) -> bytes:
+    encoded_header = json.dumps(header, separators=(",", ":")).encode("utf-8")
+
+    return (
+        struct.pack(
+            PREFIX_FORMAT, MAGIC_BYTES, BINARY_PROTOCOL_VERSION, len(encoded_header)
+        )
+        + encoded_header
+        + payload
+    )
+
+
+def _decode_message(content: bytes) -> Tuple[Dict[str, Any], memoryview]:
+    if len(content) < PREFIX_SIZE:
+        raise ValueError("The binary message is truncated")
+
+    magic_bytes, version, header_size = struct.unpack_from(PREFIX_FORMAT, content)
+
+    if magic_bytes != MAGIC_BYTES:
+        raise ValueError("The content is not a binary message")
+
+    if version != BINARY_PROTOCOL_VERSION:
+        raise ValueError(f"Unsupported binary protocol version: {version}")
+
+    content = memoryview(content)
+    header = json.loads(bytes(content[PREFIX_SIZE : PREFIX_SIZE + header_size]))
+
+    return header, content[PREFIX_SIZE + header_size :]
+
+
+def encode_samples(images: List[bytes], samples: List[Dict[str, Any]]) -> bytes:
+    """
+    Encode the images, such as JPEG images, along with the parameters of each sample
+    as given by InputSampleMetadataSchema.
+    """
+    return _encode_message(
+        header={"sizes": [len(image) for image in images], "samples": samples},
+        payload=b"".join(images),
+    )
+
+
+def decode_samples(content: bytes) -> Tuple[List[bytes], List[Dict[str, Any]]]:
+    header, payload = _decode_message(content)
+    images, offset = [], 0
+
+    for size in header["sizes"]:
+        images.append(bytes(payload[offset : offset + size]))
+        offset += size
+
+    if offset != len(payload) or len(images) != len(header["samples"]):
+        raise ValueError("The binary request does not match its header")
+
+    return images, header["samples"]
+
+
+def encode_detections(
+    detections: List[np.ndarray],
+    class_names: Dict[int, str],
+    image_width: Optional[int] = None,
+) -> bytes:
+    """
+    Encode the detections of each sample, as DETECTIONS_DTYPE arrays, along with the
+    names of their classes and the width of the images at inference.
+    """
+    header: Dict[str, Any] = {
+        "counts": [len(sample_detections) for sample_detections in detections],
+        "class_names": {
+            str(class_id): class_name for class_id, class_name in class_names.items()
+        },
+    }
+
+    if image_width is not None:
+        header["image_width"] = image_width
+
+    return _encode_message(
+        header=header,
+        payload=b"".join(
+            np.ascontiguousarray(sample_detections, dtype=DETECTIONS_DTYPE).tobytes()
+            for sample_detections in detections
+        ),
+    )
+
+
+def decode_detections(content: bytes) -> Tuple[List[np.ndarray], Dict[int, str]]:
+    header, payload = _decode_message(content)
+    all_detections = np.frombuffer(payload, dtype=DETECTIONS_DTYPE)
+
+    if len(all_detections) != sum(header["counts"]):
+        raise ValueError("The binary response does not match its header")
+
+    class_names = {
+        int(class_id): class_name
+        for class_id, class_name in header["class_names"].items()
+    }
+
+    if len(header["counts"]) == 0:
+        return [], class_names
+
+    return (
+        np.split(all_detections, np.cumsum(header["counts"])[:-1]),
+        class_names,
+    )
+
+
+def decode_image_width(content: bytes) -> Optional[int]:
+    header, _ = _decode_message(content)
+
+    return header.get("image_width")
+
+
+def detections_to_dataframe(
+    detections: np.ndarray, class_names: Dict[int, str]
+) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            **{column: detections[column] for column in detections.dtype.names},
+            "class_name": [
+                class_names[class_id] for class_id in detections["class_id"]
+            ],
+        },
+        columns=PREDICTION_COLUMNS,
+    )
+
+
+def dataframe_to_detections(
+    predictions: pd.DataFrame,
+) -> Tuple[np.ndarray, Dict[int, str]]:
+    """
+    Inverse of detections_to_dataframe, the coordinates and scores becoming float32
+    """
+    detections = np.empty(len(predictions), dtype=DETECTIONS_DTYPE)
+
+    for column in DETECTIONS_DTYPE.names:
+        detections[column] = predictions[column].to_numpy(
+            dtype=DETECTIONS_DTYPE[column]
+        )
+
+    return detections, dict(
+        zip(detections["class_id"].tolist(), predictions["class_name"])
+    )
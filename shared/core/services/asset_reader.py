@@ -1,4 +1,6 @@
 import logging
+import os
+import tempfile
 from functools import partial
 from typing import List, Optional, Tuple, Union
 
@@ -6,13 +8,15 @@ import cv2 as cv
 import numpy as np
 
 from core.google.storage_client import StorageClient
-from core.path import build_path, build_paths
+from core.path import GSPath, build_path, build_paths
 from core.schemas.asset import AssetType, ImageAsset, VideoAsset, VisualAsset
 from core.services.reader_common import (
     infer_asset_type,
     is_path_asset_type_coherent,
     retrieve_asset_locally,
 )
+from core.services.streamed_file import StreamedFile
+from core.tools import extract_file_extension
 
 logger = logging.getLogger(__name__)
 
@@ -76,6 +80,76 @@ def make_assets(
     ]
 
 
+def make_streamed_video_asset(
+    asset_path: str,
+    storage_client: Optional[StorageClient] = None,
+    time_step: Optional[float] = None,
+    chunk_size: int = 2**23,
+    header_bytes_number: int = 2**23,
+) -> VideoAsset:
+    """
+    Read a GCS video while it is being downloaded by ranged reads, instead of once it
+    is fully downloaded. The other videos are read as by make_asset.
+
+    :param asset_path: The path of the video to be read.
+    :param storage_client: A GCP storage client, only needed if the video is not
+    stored locally.
+    :param time_step: The time step between two consecutive sampled frames.
+    :param chunk_size: The number of bytes of each ranged read.
+    :param header_bytes_number: The number of bytes downloaded before probing the
+    video from the header of its container. The videos whose header does not give
+    their metadata are only read once fully downloaded.
+
+    :return: A VideoAsset object, whose frames are decoded while the video is
+    downloaded by the ffmpeg reader backend. The other reader backend waits for the
+    end of the download.
+    """
+    asset_path = build_path(asset_path)
+
+    if not isinstance(asset_path, GSPath):
+        return make_asset(
+            asset_path=asset_path,
+            asset_type=AssetType.VIDEO,
+            storage_client=storage_client,
+            time_step=time_step,
+        )
+
+    if storage_client is None:
+        raise ValueError("A storage client must be passed for cloud located assets")
+
+    if is_path_asset_type_coherent(asset_path, asset_type=AssetType.VIDEO) is False:
+        raise ValueError("asset_path not coherent with the video asset type")
+
+    bucket_name, blob_name = asset_path.to_bucket_and_blob_names()
+
+    with tempfile.NamedTemporaryFile(
+        suffix=extract_file_extension(asset_path), delete=False
+    ) as temporary_file:
+        local_asset_path = temporary_file.name
+
+    streamed_file = StreamedFile(
+        storage_client.iterate_blob_chunks(
+            bucket_name, blob_name, chunk_size=chunk_size
+        ),
+        file_path=local_asset_path,
+    )
+
+    try:
+        streamed_file.wait_for(header_bytes_number)
+
+        return VideoAsset(
+            asset_path=local_asset_path,
+            time_step=time_step,
+            delete=True,
+            content_hash=storage_client.get_blob_hash(bucket_name, blob_name),
+            streamed_file=streamed_file,
+        )
+    except Exception:
+        streamed_file.close()
+        os.unlink(local_asset_path)
+        raise
+
+
 def must_be_resized(image: np.ndarray, max_allowed_size: int) -> bool:
     buf = VisualAsset.to_binary(image)
     return len(buf) > max_allowed_size
@@ -0,0 +1,121 @@
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+
+@dataclass
+class BatchSizeStatistics:
+    requests_number: int = 0
+    failures_number: int = 0
+    # sum of the latencies of the successful requests
+    latency_sum: float = 0.0
+
+    @property
+    def failure_rate(self) -> float:
+        if self.requests_number == 0:
+            return 0.0
+
+        return self.failures_number / self.requests_number
+
+    @property
+    def mean_latency(self) -> Optional[float]:
+        successes_number = self.requests_number - self.failures_number
+
+        if successes_number == 0:
+            return None
+
+        return self.latency_sum / successes_number
+
+
+@dataclass
+class BatchSizeOperatingPoint:
+    batch_size: int
+    requests_number: int
+    failure_rate: float
+    mean_latency: Optional[float]
+    # number of images predicted per second by a request of the batch size
+    throughput: Optional[float]
+
+
+class BatchSizeController:
+    """
+    Adapt the number of images sent in a request to what the endpoint sustains, by
+    additive increase and multiplicative decrease (AIMD).
+
+    The batch size is increased by additive_increase after each successful request of
+    at least the batch size, and multiplied by multiplicative_decrease after a failed
+    request, or a request slower than latency_target if given. The controller is meant
+    to be shared by all the requests to an endpoint, so that its limits are not learnt
+    again on each call.
+    """
+
+    def __init__(
+        self,
+        initial_batch_size: int = 32,
+        min_batch_size: int = 1,
+        max_batch_size: int = 64,
+        additive_increase: float = 1.0,
+        multiplicative_decrease: float = 0.5,
+        latency_target: Optional[float] = None,
+    ):
+        self.min_batch_size = max(min_batch_size, 1)
+        self.max_batch_size = max(max_batch_size, self.min_batch_size)
+        self.additive_increase = additive_increase
+        self.multiplicative_decrease = multiplicative_decrease
+        self.latency_target = latency_target
+
+        self._batch_size = float(
+            min(max(initial_batch_size, self.min_batch_size), self.max_batch_size)
+        )
+        self._lock = threading.Lock()
+
+        self.statistics: Dict[int, BatchSizeStatistics] = {}
+
+    @property
+    def batch_size(self) -> int:
+        return int(self._batch_size)
+
+    def _decrease(self, batch_size: int):
+        # the decrease is relative to the size of the request, so that the concurrent
+        # requests failing at the same size only decrease the batch size once
+        self._batch_size = max(
+            min(self._batch_size, batch_size * self.multiplicative_decrease),
+            self.min_batch_size,
+        )
+
+    def record_success(self, batch_size: int, latency: float):
+        with self._lock:
+            statistics = self.statistics.setdefault(batch_size, BatchSizeStatistics())
+            statistics.requests_number += 1
+            statistics.latency_sum += latency
+
+            if self.latency_target is not None and latency > self.latency_target:
+                self._decrease(batch_size)
+            elif batch_size >= self.batch_size:
+                self._batch_size = min(
+                    self._batch_size + self.additive_increase, self.max_batch_size
+                )
+
+    def record_failure(self, batch_size: int):
+        with self._lock:
+            statistics = self.statistics.setdefault(batch_size, BatchSizeStatistics())
+            statistics.requests_number += 1
+            statistics.failures_number += 1
+
+            self._decrease(batch_size)
+
+    @property
+    def operating_point(self) -> BatchSizeOperatingPoint:
+        with self._lock:
+            batch_size = self.batch_size
+            statistics = self.statistics.get(batch_size, BatchSizeStatistics())
+
+        mean_latency = statistics.mean_latency
+
+        return BatchSizeOperatingPoint(
+            batch_size=batch_size,
+            requests_number=statistics.requests_number,
+            failure_rate=statistics.failure_rate,
+            mean_latency=mean_latency,
+            throughput=batch_size / mean_latency if mean_latency else None,
+        )
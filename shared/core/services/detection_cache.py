@@ -0,0 +1,226 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from core.serialization.detections import (
+    dataframe_to_detections,
+    decode_detections,
+    detections_to_dataframe,
+    encode_detections,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionCache:
+    """
+    Keep the predictions of the object detection model, keyed by the hash of the
+    encoded image sent to the endpoint along with the model name and the parameters
+    of the sample, so that the images already predicted are not sent again.
+
+    The predictions are kept in memory, the least recently used ones being evicted once
+    they exceed max_bytes_number. If a cache directory is given, they are also written
+    to the local disk, which can be shared between the processes of a machine, the
+    least recently used files being evicted once they exceed max_disk_bytes_number.
+    """
+
+    # the disk usage is only checked every this number of written entries
+    DISK_EVICTION_PERIOD = 256
+
+    def __init__(
+        self,
+        max_bytes_number: int = 2**26,
+        cache_directory: Optional[str] = None,
+        max_disk_bytes_number: int = 2**30,
+    ):
+        self.max_bytes_number = max_bytes_number
+        self.cache_directory = cache_directory
+        self.max_disk_bytes_number = max_disk_bytes_number
+
+        self._entries: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._entries_bytes_number: Dict[str, int] = {}
+        self._bytes_number = 0
+        self._written_entries_number = 0
+        self._lock = threading.Lock()
+
+        self.memory_hits_number = 0
+        self.disk_hits_number = 0
+        self.misses_number = 0
+        # time spent predicting the missed images, and their number
+        self.misses_latency = 0.0
+        self.predicted_images_number = 0
+
+    @staticmethod
+    def build_key(
+        binary_image: bytes, model_name: str, sample_metadata: Dict[str, Any]
+    ) -> str:
+        key_hash = hashlib.blake2b(digest_size=16)
+        key_hash.update(
+            json.dumps([model_name, sample_metadata], sort_keys=True).encode()
+        )
+        key_hash.update(binary_image)
+
+        return key_hash.hexdigest()
+
+    @property
+    def hits_number(self) -> int:
+        return self.memory_hits_number + self.disk_hits_number
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups_number = self.hits_number + self.misses_number
+
+        return self.hits_number / lookups_number if lookups_number > 0 else 0.0
+
+    @property
+    def saved_latency(self) -> float:
+        """
+        Estimated time saved by the hits, at the mean latency of the images predicted
+        since the cache was created
+        """
+        if self.predicted_images_number == 0:
+            return 0.0
+
+        return self.hits_number * self.misses_latency / self.predicted_images_number
+
+    def add_misses_latency(self, latency: float, images_number: int):
+        with self._lock:
+            self.misses_latency += latency
+            self.predicted_images_number += images_number
+
+    def _get_entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_directory, key[:2], f"{key}.bin")
+
+    def _put_in_memory(self, key: str, predictions: pd.DataFrame):
+        bytes_number = int(predictions.memory_usage(deep=True).sum())
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+
+            self._entries[key] = predictions
+            self._entries_bytes_number[key] = bytes_number
+            self._bytes_number += bytes_number
+
+            # the least recently used entries are evicted first
+            while self._bytes_number > self.max_bytes_number and self._entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._bytes_number -= self._entries_bytes_number.pop(evicted_key)
+
+    def _read_from_disk(self, key: str) -> Optional[pd.DataFrame]:
+        entry_path = self._get_entry_path(key)
+
+        try:
+            with open(entry_path, "rb") as entry_file:
+                content = entry_file.read()
+            # the modification time orders the entries by last use
+            os.utime(entry_path)
+        except OSError:
+            return None
+
+        try:
+            (detections,), class_names = decode_detections(content)
+        except ValueError:
+            logger.warning(f"Ignoring the corrupted detection cache entry {key}")
+            return None
+
+        return detections_to_dataframe(detections, class_names)
+
+    def _write_to_disk(self, key: str, predictions: pd.DataFrame):
+        entry_path = self._get_entry_path(key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        detections, class_names = dataframe_to_detections(predictions)
+
+        # the entry is written to a temporary file first, so that the other processes
+        # never read a partial entry
+        file_descriptor, temporary_path = tempfile.mkstemp(
+            suffix=".tmp", dir=os.path.dirname(entry_path)
+        )
+        try:
+            with os.fdopen(file_descriptor, "wb") as entry_file:
+                entry_file.write(encode_detections([detections], class_names))
+            os.replace(temporary_path, entry_path)
+        finally:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+        with self._lock:
+            self._written_entries_number += 1
+            is_eviction_due = (
+                self._written_entries_number % self.DISK_EVICTION_PERIOD == 0
+            )
+
+        if is_eviction_due:
+            self._evict_from_disk()
+
+    def _evict_from_disk(self):
+        entries = []
+
+        for root, _, file_names in os.walk(self.cache_directory):
+            for file_name in file_names:
+                if not file_name.endswith(".bin"):
+                    continue
+
+                try:
+                    entry_stat = os.stat(entry_path := os.path.join(root, file_name))
+                except OSError:
+                    continue
+
+                entries.append((entry_stat.st_mtime, entry_stat.st_size, entry_path))
+
+        cache_bytes_number = sum(bytes_number for _, bytes_number, _ in entries)
+
+        # the least recently used entries are evicted first
+        for _, bytes_number, entry_path in sorted(entries):
+            if cache_bytes_number <= self.max_disk_bytes_number:
+                break
+
+            try:
+                os.remove(entry_path)
+            except OSError:
+                pass
+            cache_bytes_number -= bytes_number
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """Return a copy of the cached predictions of the key, none if missed"""
+        with self._lock:
+            predictions = self._entries.get(key)
+
+            if predictions is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits_number += 1
+
+                return predictions.copy()
+
+        if self.cache_directory is not None:
+            predictions = self._read_from_disk(key)
+
+            if predictions is not None:
+                self._put_in_memory(key, predictions)
+
+                with self._lock:
+                    self.disk_hits_number += 1
+
+                return predictions.copy()
+
+        with self._lock:
+            self.misses_number += 1
+
+        return None
+
+    def put(self, key: str, predictions: pd.DataFrame):
+        self._put_in_memory(key, predictions.copy())
+
+        if self.cache_directory is not None:
+            try:
+                self._write_to_disk(key, predictions)
+            except OSError as os_error:
+                logger.warning(f"Failed to write the detection cache entry: {os_error}")
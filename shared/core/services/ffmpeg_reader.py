@@ -0,0 +1,209 @@
+import subprocess
+import threading
+from typing import Iterable, Iterator, Optional
+
+import ffmpeg
+import numpy as np
+
+
+def build_sampling_expression(
+    time_step: float,
+    initial_fps: float,
+    start_frame_number: int = 0,
+    frame_rate: Optional[float] = None,
+    start_time: float = 0.0,
+) -> str:
+    """
+    Build the expression of the ffmpeg select filter keeping the frames numbered
+    int(k * time_step * initial_fps) from start_frame_number, as sampled by
+    VideoAsset. The candidate k values are the ones around the frame number divided by
+    the sampling ratio, the products being computed in the same order and double
+    precision as NumPy.
+
+    The frames are numbered by the filter when the video is read from the start. When
+    it is seeked, they are numbered from their timestamps, which are kept by the
+    reader, at the exact frame_rate (initial_fps if none) from the start_time of the
+    stream: the frame rate is then assumed to be constant.
+    """
+    frame_rate = repr(float(frame_rate or initial_fps))
+    time_step, initial_fps = repr(float(time_step)), repr(float(initial_fps))
+    frame_number = (
+        "n"
+        if start_frame_number == 0
+        else f"round((t-{float(start_time)!r})*{frame_rate})"
+    )
+    closest_k = f"ceil({frame_number}/({time_step}*{initial_fps}))"
+
+    expression = "+".join(
+        f"eq(trunc(({closest_k}{k_shift})*{time_step}*{initial_fps}),{frame_number})"
+        for k_shift in ("-1", "", "+1")
+    )
+
+    if start_frame_number == 0:
+        return expression
+
+    # the seek may start on a frame preceding the first one
+    return f"gte({frame_number},{start_frame_number})*({expression})"
+
+
+class FfmpegFrameReader:
+    """
+    Decode a video with an ffmpeg subprocess which samples, scales and converts the
+    frames itself, the raw frames being read from its standard output straight into
+    preallocated NumPy buffers.
+
+    The frames are read into chunks of chunk_size frames, each frame being a view on
+    its chunk: a chunk is only allocated every chunk_size frames, and is freed once
+    none of its frames is referenced anymore.
+
+    The video may also be fed to the subprocess through its standard input, for it to
+    be decoded while it is being downloaded. It must then be readable sequentially,
+    such as an MP4 video whose index precedes the frames.
+    """
+
+    def __init__(
+        self,
+        video_path: str,
+        source_width: int,
+        source_height: int,
+        width: Optional[int] = None,
+        to_rgb: bool = True,
+        chunk_size: int = 16,
+    ):
+        self.video_path = video_path
+        self.source_width = source_width
+        self.source_height = source_height
+        # the frames are scaled to the given width, keeping the aspect ratio
+        self.width = width or source_width
+        self.height = int(source_height * (self.width / source_width))
+        self.to_rgb = to_rgb
+        self.chunk_size = max(chunk_size, 1)
+
+    def _build_command(
+        self,
+        select_expression: Optional[str],
+        start_time: Optional[float],
+        is_piped: bool = False,
+    ) -> list:
+        # the timestamps are kept when seeking, for the frames to be numbered from them
+        input_options = {} if start_time is None else {"ss": start_time, "copyts": None}
+        stream = ffmpeg.input("pipe:" if is_piped else self.video_path, **input_options)
+
+        if select_expression is not None:
+            stream = stream.filter("select", select_expression)
+
+        if self.width != self.source_width:
+            stream = stream.filter("scale", self.width, self.height, flags="area")
+
+        return (
+            stream.output(
+                "pipe:",
+                format="rawvideo",
+                pix_fmt="rgb24" if self.to_rgb else "bgr24",
+                # the selected frames must not be duplicated to keep a constant rate
+                vsync="passthrough",
+            )
+            .global_args("-loglevel", "error", "-nostdin")
+            .compile()
+        )
+
+    @staticmethod
+    def _read_into(stream, buffer: np.ndarray) -> bool:
+        """Fill the buffer from the stream, return False if the stream ended before"""
+        view = memoryview(buffer).cast("B")
+        filled_bytes_number = 0
+
+        while filled_bytes_number < len(view):
+            read_bytes_number = stream.readinto(view[filled_bytes_number:])
+
+            if not read_bytes_number:
+                return False
+
+            filled_bytes_number += read_bytes_number
+
+        return True
+
+    @staticmethod
+    def _feed(stream, input_chunks: Iterable[bytes], exceptions: list):
+        try:
+            for chunk in input_chunks:
+                stream.write(chunk)
+        except BrokenPipeError:
+            # the process has been stopped before reading the whole input
+            pass
+        except Exception as exception:  # pylint: disable=broad-except
+            exceptions.append(exception)
+        finally:
+            try:
+                stream.close()
+            except BrokenPipeError:
+                pass
+
+    def read(
+        self,
+        select_expression: Optional[str] = None,
+        start_time: Optional[float] = None,
+        input_chunks: Optional[Iterable[bytes]] = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Yield the (height, width, 3) frames selected by the ffmpeg select expression,
+        after seeking to start_time (in seconds) if given. If input_chunks is given,
+        the video is read from these chunks, fed on a background thread, instead of
+        video_path.
+        """
+        is_piped = input_chunks is not None
+        process = subprocess.Popen(
+            self._build_command(select_expression, start_time, is_piped=is_piped),
+            stdin=subprocess.PIPE if is_piped else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        feeding_exceptions: list = []
+        feeding_thread = None
+
+        if is_piped:
+            feeding_thread = threading.Thread(
+                target=self._feed,
+                args=(process.stdin, input_chunks, feeding_exceptions),
+                daemon=True,
+            )
+            feeding_thread.start()
+
+        chunk = np.empty((0, self.height, self.width, 3), dtype=np.uint8)
+        chunk_index = 0
+
+        try:
+            while True:
+                if chunk_index == len(chunk):
+                    chunk = np.empty(
+                        (self.chunk_size, self.height, self.width, 3), dtype=np.uint8
+                    )
+                    chunk_index = 0
+
+                if not self._read_into(process.stdout, chunk[chunk_index]):
+                    break
+
+                yield chunk[chunk_index]
+                chunk_index += 1
+
+            # the errors are small enough not to fill the pipe before the end
+            errors = process.stderr.read()
+
+            if feeding_thread is not None:
+                feeding_thread.join()
+                # a truncated input would otherwise end the frames silently
+                if feeding_exceptions:
+                    raise feeding_exceptions[0]
+
+            if process.wait() != 0:
+                raise ValueError(
+                    f"ffmpeg could not read the following asset: {self.video_path}, "
+                    f"{errors.decode(errors='replace').strip()}"
+                )
+        finally:
+            # the process is stopped when the frames are not all consumed
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.stderr.close()
+            process.wait()
@@ -0,0 +1,171 @@
+import hashlib
+import itertools
+import logging
+import os
+import shutil
+import tempfile
+from typing import Iterator, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FRAME_CACHE_DIRECTORY = os.path.join(tempfile.gettempdir(), "frame_cache")
+
+
+class FrameCache:
+    """
+    Keep the preprocessed frames of the videos on the local disk, so that the same
+    video read again with the same parameters is not decoded and resized again.
+
+    The frames of each entry are stored in .npy chunks of chunk_size frames, which are
+    memory-mapped when read. An entry is only added once all the frames of the video
+    have been read, and the least recently used entries are evicted once the cache
+    exceeds max_bytes_number.
+    """
+
+    def __init__(
+        self,
+        cache_directory: str = FRAME_CACHE_DIRECTORY,
+        max_bytes_number: int = 2**32,
+        chunk_size: int = 64,
+    ):
+        self.cache_directory = cache_directory
+        self.max_bytes_number = max_bytes_number
+        self.chunk_size = max(chunk_size, 1)
+
+        self.hits_number = 0
+        self.misses_number = 0
+
+    @staticmethod
+    def build_key(
+        content_hash: str,
+        time_step: float,
+        width: Optional[int],
+        color_space: str,
+        reader_backend: str,
+    ) -> str:
+        return hashlib.md5(
+            repr((content_hash, time_step, width, color_space, reader_backend)).encode()
+        ).hexdigest()
+
+    def _get_entry_directory(self, key: str) -> str:
+        return os.path.join(self.cache_directory, key)
+
+    @staticmethod
+    def _get_chunk_path(entry_directory: str, chunk_index: int) -> str:
+        return os.path.join(entry_directory, f"{chunk_index:06d}.npy")
+
+    def _read(self, entry_directory: str, start_index: int) -> Iterator[np.ndarray]:
+        chunk_index, frame_index = divmod(start_index, self.chunk_size)
+
+        while os.path.exists(
+            chunk_path := self._get_chunk_path(entry_directory, chunk_index)
+        ):
+            # the frames are copied on write, the cached ones being left untouched
+            yield from np.load(chunk_path, mmap_mode="c")[frame_index:]
+
+            chunk_index += 1
+            frame_index = 0
+
+    def _write(self, key: str, frames: Iterator[np.ndarray]) -> Iterator[np.ndarray]:
+        """
+        Yield the frames while writing them to a temporary entry, which is added to
+        the cache once the frames are exhausted
+        """
+        os.makedirs(self.cache_directory, exist_ok=True)
+        temporary_directory = tempfile.mkdtemp(
+            prefix=f"{key}.", suffix=".tmp", dir=self.cache_directory
+        )
+        chunk: Optional[np.ndarray] = None
+        chunk_index = frame_index = 0
+
+        def save_chunk(frames_number: int):
+            np.save(
+                self._get_chunk_path(temporary_directory, chunk_index),
+                chunk[:frames_number],
+            )
+
+        try:
+            for frame in frames:
+                if chunk is None:
+                    chunk = np.empty((self.chunk_size,) + frame.shape, frame.dtype)
+
+                chunk[frame_index] = frame
+                frame_index += 1
+
+                if frame_index == self.chunk_size:
+                    save_chunk(frame_index)
+                    chunk_index += 1
+                    frame_index = 0
+
+                yield frame
+
+            if frame_index > 0:
+                save_chunk(frame_index)
+
+            try:
+                os.replace(temporary_directory, self._get_entry_directory(key))
+            except OSError:
+                logger.info(f"The frame cache entry {key} was added concurrently")
+
+            self._evict()
+        finally:
+            if os.path.exists(temporary_directory):
+                shutil.rmtree(temporary_directory, ignore_errors=True)
+
+    def _evict(self):
+        entries = []
+
+        for entry in os.scandir(self.cache_directory):
+            if not entry.is_dir() or entry.name.endswith(".tmp"):
+                continue
+
+            entries.append(
+                (
+                    entry.stat().st_mtime,
+                    sum(chunk.stat().st_size for chunk in os.scandir(entry.path)),
+                    entry.path,
+                )
+            )
+
+        cache_bytes_number = sum(bytes_number for _, bytes_number, _ in entries)
+
+        # the least recently used entries are evicted first
+        for _, bytes_number, entry_directory in sorted(entries):
+            if cache_bytes_number <= self.max_bytes_number:
+                break
+
+            logger.info(f"Evicting the frame cache entry: {entry_directory}")
+            shutil.rmtree(entry_directory, ignore_errors=True)
+            cache_bytes_number -= bytes_number
+
+    def get_frames(
+        self,
+        key: str,
+        read_frames: Iterator[np.ndarray],
+        start_index: int = 0,
+        stop_index: Optional[int] = None,
+    ) -> Iterator[np.ndarray]:
+        """
+        Yield the frames from start_index to stop_index of the entry if it is cached,
+        else the read frames, which are cached if they are all the frames.
+        """
+        entry_directory = self._get_entry_directory(key)
+
+        if os.path.isdir(entry_directory):
+            self.hits_number += 1
+            # the modification time orders the entries by last use
+            os.utime(entry_directory)
+
+            return itertools.islice(
+                self._read(entry_directory, start_index),
+                None if stop_index is None else max(stop_index - start_index, 0),
+            )
+
+        self.misses_number += 1
+
+        if start_index > 0 or stop_index is not None:
+            return read_frames
+
+        return self._write(key, read_frames)
@@ -0,0 +1,103 @@
+import hashlib
+import threading
+from typing import Iterable, Iterator, Optional
+
+
+class StreamedFile:
+    """
+    Write the chunks of a remote file, such as the ranged reads of a blob, to a local
+    file on a background thread, so that the file can be read while it is still being
+    downloaded. The MD5 hash of the content is computed along the way.
+
+    The download is stopped by close, the readers waiting for the rest of the file
+    getting a ConnectionAbortedError.
+    """
+
+    def __init__(self, chunks: Iterable[bytes], file_path: str):
+        self.file_path = file_path
+
+        self._condition = threading.Condition()
+        self._bytes_number = 0
+        self._is_complete = False
+        self._exception: Optional[BaseException] = None
+        self._md5 = hashlib.md5()
+        self._is_closed = threading.Event()
+
+        # the file is created before returning, for the readers to be able to open it
+        file = open(file_path, "wb")  # pylint: disable=consider-using-with
+        self._thread = threading.Thread(
+            target=self._download, args=(chunks, file), daemon=True
+        )
+        self._thread.start()
+
+    def _download(self, chunks: Iterable[bytes], file):
+        chunks = iter(chunks)
+
+        try:
+            with file:
+                for chunk in chunks:
+                    if self._is_closed.is_set():
+                        raise ConnectionAbortedError(
+                            f"The download of {self.file_path} has been cancelled"
+                        )
+
+                    file.write(chunk)
+                    file.flush()
+                    self._md5.update(chunk)
+
+                    with self._condition:
+                        self._bytes_number += len(chunk)
+                        self._condition.notify_all()
+        except Exception as exception:  # pylint: disable=broad-except
+            self._exception = exception
+        finally:
+            # the pending requests of a generator of chunks are released
+            if hasattr(chunks, "close"):
+                chunks.close()
+
+            with self._condition:
+                self._is_complete = True
+                self._condition.notify_all()
+
+    def close(self):
+        """Stop the download before the next chunk, if it is not complete yet"""
+        self._is_closed.set()
+
+    @property
+    def is_complete(self) -> bool:
+        with self._condition:
+            return self._is_complete
+
+    def wait_for(self, bytes_number: Optional[int] = None) -> int:
+        """
+        Wait until bytes_number bytes have been downloaded, the whole file if None, and
+        return the number of bytes downloaded so far. The exception raised by the
+        download, if any, is raised again.
+        """
+        with self._condition:
+            self._condition.wait_for(
+                lambda: self._is_complete
+                or (bytes_number is not None and self._bytes_number >= bytes_number)
+            )
+
+            if self._exception is not None:
+                raise self._exception
+
+            return self._bytes_number
+
+    def iterate_chunks(self, chunk_size: int = 2**20) -> Iterator[bytes]:
+        """Yield the content of the file from the start, as it is being downloaded"""
+        with open(self.file_path, "rb") as file:
+            position = 0
+
+            while (bytes_number := self.wait_for(position + 1)) > position:
+                chunk = file.read(min(bytes_number - position, chunk_size))
+                position += len(chunk)
+
+                yield chunk
+
+    def get_hash(self) -> str:
+        """The MD5 hash of the content, once it has been fully downloaded"""
+        self.wait_for()
+
+        return self._md5.hexdigest()
@@ -0,0 +1,242 @@
+import logging
+import os
+import tempfile
+from fractions import Fraction
+from typing import List, Optional
+
+import cv2 as cv
+import ffmpeg
+from ffmpeg import Error as FfmpegError
+from pydantic import BaseModel
+
+logger = logging.getLogger(__name__)
+
+VIDEO_PROBES_DIRECTORY = os.path.join(tempfile.gettempdir(), "video_probes")
+
+
+class VideoProbe(BaseModel):
+    width: int
+    height: int
+    initial_fps: float
+    # timestamp of the first frame in seconds, which is not always zero
+    start_time: float = 0.0
+    # number of frames indexed by the container, which may differ slightly from the
+    # number of frames actually decodable when some of them are corrupted
+    frames_number: int
+    # number of frames actually decoded, only counted when requested
+    exact_frames_number: Optional[int] = None
+    # numbers of the keyframes, only indexed when requested
+    keyframes: Optional[List[int]] = None
+
+
+def _probe_with_ffprobe(video_path: str) -> VideoProbe:
+    # the packets are counted by demuxing the video stream, without decoding it
+    stream = ffmpeg.probe(
+        video_path,
+        select_streams="v:0",
+        count_packets=None,
+        show_entries=(
+            "stream=width,height,avg_frame_rate,r_frame_rate,start_time,"
+            "nb_read_packets"
+        ),
+    )["streams"][0]
+
+    return VideoProbe(
+        width=stream["width"],
+        height=stream["height"],
+        initial_fps=_get_frame_rate(stream),
+        start_time=_get_start_time(stream),
+        frames_number=int(stream["nb_read_packets"]),
+    )
+
+
+def _get_frame_rate(stream: dict) -> float:
+    frame_rate = stream.get("avg_frame_rate", "0/0")
+    if frame_rate.endswith("/0"):
+        frame_rate = stream["r_frame_rate"]
+
+    return float(Fraction(frame_rate))
+
+
+def _get_start_time(stream: dict) -> float:
+    try:
+        return float(stream.get("start_time", 0.0))
+    except ValueError:
+        # the start time is "N/A" when the container does not give it
+        return 0.0
+
+
+def _probe_with_opencv(video_path: str) -> VideoProbe:
+    video_capture = cv.VideoCapture(video_path)
+
+    try:
+        if not video_capture.isOpened():
+            raise ValueError(f"Could not open the following asset: {video_path}")
+
+        return VideoProbe(
+            width=int(video_capture.get(cv.CAP_PROP_FRAME_WIDTH)),
+            height=int(video_capture.get(cv.CAP_PROP_FRAME_HEIGHT)),
+            initial_fps=video_capture.get(cv.CAP_PROP_FPS),
+            frames_number=max(int(video_capture.get(cv.CAP_PROP_FRAME_COUNT)), 0),
+        )
+    finally:
+        video_capture.release()
+
+
+def probe_video(video_path: str) -> VideoProbe:
+    """
+    Read the metadata of the video from its container, without decoding the frames.
+    ffprobe is used when available, OpenCV otherwise.
+    """
+    try:
+        return _probe_with_ffprobe(video_path)
+    except (FileNotFoundError, FfmpegError, KeyError, IndexError, ValueError):
+        logger.debug(f"Could not probe {video_path} with ffprobe, using OpenCV")
+
+    return _probe_with_opencv(video_path)
+
+
+def probe_video_header(video_path: str) -> Optional[VideoProbe]:
+    """
+    Read the metadata of the video from the header of its container only, which is
+    enough for a video still being written as long as its index precedes its frames.
+    Return None if the header does not give them.
+    """
+    try:
+        stream = ffmpeg.probe(
+            video_path,
+            select_streams="v:0",
+            show_entries=(
+                "stream=width,height,avg_frame_rate,r_frame_rate,start_time,nb_frames"
+            ),
+        )["streams"][0]
+
+        if int(stream["nb_frames"]) > 0:
+            return VideoProbe(
+                width=stream["width"],
+                height=stream["height"],
+                initial_fps=_get_frame_rate(stream),
+                start_time=_get_start_time(stream),
+                frames_number=int(stream["nb_frames"]),
+            )
+    except (FileNotFoundError, FfmpegError, KeyError, IndexError, ValueError):
+        logger.debug(f"Could not probe the header of {video_path}")
+
+    return None
+
+
+def count_video_frames(video_path: str) -> int:
+    """
+    Count the frames which can actually be decoded, the frames being grabbed without
+    being converted.
+    """
+    video_capture = cv.VideoCapture(video_path)
+
+    try:
+        if not video_capture.isOpened():
+            raise ValueError(f"Could not open the following asset: {video_path}")
+
+        frames_number = 0
+        while video_capture.grab():
+            frames_number += 1
+
+        return frames_number
+    finally:
+        video_capture.release()
+
+
+def index_video_keyframes(video_path: str) -> List[int]:
+    """
+    Return the numbers of the keyframes of the video, the packets being demuxed
+    without being decoded. The packets are numbered in decoding order, which only
+    differs from the presentation order around reordered frames.
+    """
+    video_capture = cv.VideoCapture(video_path)
+
+    try:
+        if not video_capture.isOpened():
+            raise ValueError(f"Could not open the following asset: {video_path}")
+
+        # the capture returns the raw packets instead of the decoded frames
+        video_capture.set(cv.CAP_PROP_FORMAT, -1)
+
+        keyframes = []
+        frame_number = 0
+        while video_capture.grab():
+            if video_capture.get(cv.CAP_PROP_LRF_HAS_KEY_FRAME):
+                keyframes.append(frame_number)
+            frame_number += 1
+
+        return keyframes
+    finally:
+        video_capture.release()
+
+
+class VideoProbeCache:
+    """
+    Keep the probes of the videos in sidecar JSON files named after the hash of the
+    video content, so that a video is probed at most once whatever its path.
+    """
+
+    def __init__(self, probes_directory: str = VIDEO_PROBES_DIRECTORY):
+        self.probes_directory = probes_directory
+
+    def _get_probe_path(self, content_hash: str) -> str:
+        return os.path.join(self.probes_directory, f"{content_hash}.json")
+
+    def get(self, content_hash: str) -> Optional[VideoProbe]:
+        probe_path = self._get_probe_path(content_hash)
+
+        if not os.path.exists(probe_path):
+            return None
+
+        try:
+            return VideoProbe.parse_file(probe_path)
+        except ValueError:
+            logger.warning(f"Ignoring the invalid video probe: {probe_path}")
+            return None
+
+    def put(self, content_hash: str, video_probe: VideoProbe):
+        os.makedirs(self.probes_directory, exist_ok=True)
+
+        # the probe may be read concurrently, so it is replaced atomically
+        probe_path = self._get_probe_path(content_hash)
+        with tempfile.NamedTemporaryFile(
+            "w", dir=self.probes_directory, suffix=".tmp", delete=False
+        ) as temporary_file:
+            temporary_file.write(video_probe.json())
+        os.replace(temporary_file.name, probe_path)
+
+    def get_or_probe(
+        self,
+        video_path: str,
+        content_hash: str,
+        exact: bool = False,
+        with_keyframes: bool = False,
+    ) -> VideoProbe:
+        """
+        Return the probe of the video, probing it on the first call. The frames are
+        only counted by decoding the video when exact is set and they have not been
+        counted yet, or when the container does not index them. The keyframes are
+        indexed when with_keyframes is set and they have not been indexed yet.
+        """
+        video_probe = self.get(content_hash)
+        is_updated = video_probe is None
+
+        if video_probe is None:
+            video_probe = probe_video(video_path)
+
+        if video_probe.exact_frames_number is None and (
+            exact or video_probe.frames_number == 0
+        ):
+            video_probe.exact_frames_number = count_video_frames(video_path)
+            is_updated = True
+
+        if video_probe.keyframes is None and with_keyframes:
+            video_probe.keyframes = index_video_keyframes(video_path)
+            is_updated = True
+
+        if is_updated:
+            self.put(content_hash, video_probe)
+
+        return video_probe
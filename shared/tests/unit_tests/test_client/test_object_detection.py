@@ -0,0 +1,229 @@
+import threading
+import time
+from types import SimpleNamespace
+from typing import Optional
+from unittest import mock
+
+import numpy as np
+import requests
+from google.api_core.exceptions import ServiceUnavailable
+
+from core.client.object_detection import ObjectDetectionClient
+from core.serialization.array import array_to_string
+from core.serialization.detections import (
+    BINARY_PROTOCOL_VERSION,
+    DETECTIONS_DTYPE,
+    JSON_PROTOCOL_VERSION,
+    decode_samples,
+    encode_detections,
+)
+from core.serialization.image import image_from_binary, image_from_string
+from core.services.batch_size_controller import BatchSizeController
+from core.services.detection_cache import DetectionCache
+
+
+def make_results(score: float) -> np.ndarray:
+    return np.array([[0, 0, 1, 1, score, 0, "person"]], dtype=object)
+
+
+class FakeEndpoint:
+    def __init__(self, protocol_versions: list, image_width: Optional[int] = None):
+        self.protocol_versions = protocol_versions
+        self.image_width = image_width
+        self.received_image_widths = []
+        self.lock = threading.Lock()
+        self.in_flight_requests_number = 0
+        self.max_in_flight_requests_number = 0
+        self.raw_requests_number = 0
+
+    def predict(self, instances: list) -> SimpleNamespace:
+        with self.lock:
+            self.in_flight_requests_number += 1
+            self.max_in_flight_requests_number = max(
+                self.max_in_flight_requests_number, self.in_flight_requests_number
+            )
+
+        # the last chunks are answered first
+        time.sleep(0.01 / (instances[0]["confidence_threshold"] + 1))
+
+        with self.lock:
+            self.in_flight_requests_number -= 1
+            self.received_image_widths += [
+                image_from_string(instance["data"]).shape[1]
+                for instance in instances
+                if instance["data"]
+            ]
+
+        return SimpleNamespace(
+            predictions=[
+                {
+                    "results": array_to_string(
+                        make_results(score=instance["confidence_threshold"])
+                    ),
+                    "protocol_versions": self.protocol_versions,
+                    "image_width": self.image_width,
+                }
+                for instance in instances
+            ]
+        )
+
+    def raw_predict(self, body: bytes, headers: dict) -> requests.Response:
+        self.raw_requests_number += 1
+        binary_images, samples = decode_samples(body)
+        self.received_image_widths += [
+            image_from_binary(binary_image).shape[1] for binary_image in binary_images
+        ]
+
+        response = requests.Response()
+        response.status_code = 200
+        response._content = encode_detections(
+            [
+                np.array(
+                    [(0, 0, 1, 1, sample["confidence_threshold"], 0)],
+                    dtype=DETECTIONS_DTYPE,
+                )
+                for sample in samples
+            ],
+            {0: "person"},
+            image_width=self.image_width,
+        )
+
+        return response
+
+
+def make_object_detection_client(
+    endpoint: FakeEndpoint, max_concurrent_requests: int = 4
+) -> ObjectDetectionClient:
+    object_detection_client = ObjectDetectionClient(
+        vertex_ai_manager=mock.Mock(),
+        model_instantiator_client=mock.Mock(),
+        model_name="model",
+        max_concurrent_requests=max_concurrent_requests,
+    )
+    object_detection_client._try_get_endpoint = lambda: endpoint
+
+    return object_detection_client
+
+
+def test_predict_chunks():
+    endpoint = FakeEndpoint(protocol_versions=None)
+    object_detection_client = make_object_detection_client(
+        endpoint, max_concurrent_requests=3
+    )
+    chunks = [
+        [
+            {"data": "", "confidence_threshold": 2 * index},
+            {"data": "", "confidence_threshold": 2 * index + 1},
+        ]
+        for index in range(10)
+    ]
+
+    predictions = object_detection_client._predict_chunks(chunks)
+
+    assert [
+        [prediction.score[0] for prediction in chunk_predictions]
+        for chunk_predictions in predictions
+    ] == [[sample["confidence_threshold"] for sample in chunk] for chunk in chunks]
+    assert 1 < endpoint.max_in_flight_requests_number <= 3
+    assert object_detection_client.uses_binary_protocol is False
+
+
+def test_protocol_negotiation():
+    endpoint = FakeEndpoint(
+        protocol_versions=[JSON_PROTOCOL_VERSION, BINARY_PROTOCOL_VERSION]
+    )
+    object_detection_client = make_object_detection_client(endpoint)
+    images = [np.zeros((8, 8, 3), dtype=np.uint8)] * 2
+
+    json_predictions = object_detection_client.predict_batch(
+        images, confidence_threshold=0.5
+    )
+
+    assert object_detection_client.uses_binary_protocol is True
+    binary_predictions = object_detection_client.predict_batch(
+        images, confidence_threshold=0.5
+    )
+
+    assert endpoint.raw_requests_number == 1
+    for json_prediction, binary_prediction in zip(json_predictions, binary_predictions):
+        np.testing.assert_array_equal(
+            json_prediction.iloc[:, :6].astype(float), binary_prediction.iloc[:, :6]
+        )
+        assert list(json_prediction.class_name) == list(binary_prediction.class_name)
+
+
+def test_detection_cache():
+    endpoint = FakeEndpoint(protocol_versions=None)
+    object_detection_client = make_object_detection_client(endpoint)
+    object_detection_client.detection_cache = DetectionCache()
+    images = [np.zeros((8, 8, 3), dtype=np.uint8), np.ones((8, 8, 3), dtype=np.uint8)]
+
+    with mock.patch.object(endpoint, "predict", wraps=endpoint.predict) as predict_mock:
+        first_predictions = object_detection_client.predict_batch(
+            images + images[:1], confidence_threshold=0.5
+        )
+        second_predictions = object_detection_client.predict_batch(
+            images[::-1], confidence_threshold=0.5
+        )
+
+    # the duplicated and the cached images are not sent again
+    assert [len(call.args[0]) for call in predict_mock.call_args_list] == [2]
+    assert len(first_predictions) == 3 and len(second_predictions) == 2
+    assert object_detection_client.detection_cache.hit_ratio == 0.5
+
+
+def test_image_width_negotiation():
+    endpoint = FakeEndpoint(
+        protocol_versions=[JSON_PROTOCOL_VERSION, BINARY_PROTOCOL_VERSION],
+        image_width=4,
+    )
+    object_detection_client = make_object_detection_client(endpoint)
+    images = [np.zeros((8, 16, 3), dtype=np.uint8), np.zeros((8, 2, 3), np.uint8)]
+
+    for _ in range(2):
+        object_detection_client.predict_batch(images, confidence_threshold=0.5)
+
+    # the images are sent at the inference width once learnt, without upscaling
+    assert endpoint.received_image_widths == [16, 2, 4, 2]
+
+    object_detection_client.overridden_image_width = 8
+    object_detection_client.predict_batch(images, confidence_threshold=0.5)
+
+    assert endpoint.received_image_widths[-2:] == [8, 2]
+
+
+def test_batch_size_control():
+    endpoint = FakeEndpoint(protocol_versions=None)
+    predict = endpoint.predict
+    sent_batch_sizes = []
+
+    def predict_at_most_three(instances: list) -> SimpleNamespace:
+        sent_batch_sizes.append(len(instances))
+        if len(instances) > 3:
+            raise ServiceUnavailable("Too many instances")
+
+        return predict(instances)
+
+    endpoint.predict = predict_at_most_three
+    object_detection_client = make_object_detection_client(
+        endpoint, max_concurrent_requests=1
+    )
+    object_detection_client.batch_size_controller = BatchSizeController(
+        initial_batch_size=8
+    )
+    images = [np.zeros((8, 8, 3), dtype=np.uint8)] * 8
+
+    with mock.patch("core.client.object_detection.random.uniform", return_value=0):
+        first_predictions = object_detection_client.predict_batch(
+            images, confidence_threshold=0.5
+        )
+        first_sent_batch_sizes = list(sent_batch_sizes)
+        second_predictions = object_detection_client.predict_batch(
+            images, confidence_threshold=0.5
+        )
+
+    assert len(first_predictions) == len(second_predictions) == 8
+    assert first_sent_batch_sizes == [8, 4, 2, 2, 3, 1]
+    # the limit of the endpoint is not learnt again by the second call
+    assert sent_batch_sizes[len(first_sent_batch_sizes)] == 4
+    assert object_detection_client.batch_size_controller.statistics[8].failure_rate == 1
@@ -0,0 +1,59 @@
+import base64
+import hashlib
+from types import SimpleNamespace
+from typing import Optional
+from unittest import mock
+
+import pytest
+
+from core.exceptions import DependencyError
+from core.google.storage_client import StorageClient
+
+
+def make_storage_client(blob: Optional[SimpleNamespace]) -> StorageClient:
+    with mock.patch("core.google.storage_client.storage.Client"):
+        storage_client = StorageClient()
+
+    storage_client.client.bucket.return_value.get_blob.return_value = blob
+
+    return storage_client
+
+
+def test_get_blob_hash_is_the_md5_digest_of_the_content():
+    content = b"video content"
+    storage_client = make_storage_client(
+        SimpleNamespace(
+            md5_hash=base64.b64encode(hashlib.md5(content).digest()).decode(),
+            crc32c="crc32c",
+            generation=1,
+        )
+    )
+
+    blob_hash = storage_client.get_blob_hash("bucket", "video.mp4")
+
+    # the same hash as the one computed by Asset.get_hash from the content
+    assert blob_hash == hashlib.md5(content).hexdigest()
+    storage_client.client.bucket.assert_called_once_with("bucket")
+    storage_client.client.bucket.return_value.get_blob.assert_called_once_with(
+        "video.mp4"
+    )
+
+
+def test_get_blob_hash_of_a_composite_blob_depends_on_its_generation():
+    blobs_hashes = [
+        make_storage_client(
+            SimpleNamespace(md5_hash=None, crc32c="crc32c", generation=generation)
+        ).get_blob_hash("bucket", "video.mp4")
+        for generation in [1, 1, 2]
+    ]
+
+    assert blobs_hashes[0] == hashlib.md5(b"crc32c:1").hexdigest()
+    assert blobs_hashes[1] == blobs_hashes[0]
+    assert blobs_hashes[2] != blobs_hashes[0]
+
+
+def test_get_blob_hash_of_a_missing_blob():
+    storage_client = make_storage_client(None)
+
+    with pytest.raises(DependencyError, match="has not been found"):
+        storage_client.get_blob_hash("bucket", "video.mp4")
@@ -0,0 +1,175 @@
+import os
+import shutil
+from typing import Optional
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+from core.schemas.asset import VideoAsset, VideoReaderBackend
+
+
+@pytest.fixture(name="video_path")
+def fixture_video_path(tmp_path) -> str:
+    video_path = os.path.join(tmp_path, "video.avi")
+    video_writer = cv.VideoWriter(
+        video_path, cv.VideoWriter_fourcc(*"MJPG"), 10, (32, 24)
+    )
+
+    for frame_number in range(40):
+        video_writer.write(np.full((24, 32, 3), frame_number * 6, dtype=np.uint8))
+    video_writer.release()
+
+    return video_path
+
+
+@pytest.mark.parametrize(
+    "frames_numbers,seek_frames_threshold,keyframes",
+    [
+        ([0, 3, 3, 7, 8, 39], 256, None),
+        ([5, 6, 30, 31], 256, None),
+        ([2, 20, 20, 38], 4, None),
+        ([10, 45], 4, None),
+        ([1, 2, 30, 39], 256, [0, 10, 20, 30]),
+        ([0, 35, 36, 36], 256, [0, 35]),
+    ],
+)
+def test_read_frames_at(
+    video_path: str,
+    frames_numbers: list,
+    seek_frames_threshold: int,
+    keyframes: Optional[list],
+):
+    all_frames = list(VideoAsset._read(video_path, to_rgb=True))
+
+    frames = list(
+        VideoAsset._read_frames_at(
+            video_path,
+            frames_numbers,
+            to_rgb=True,
+            seek_frames_threshold=seek_frames_threshold,
+            keyframes=keyframes,
+            keyframe_seek_frames_threshold=4,
+        )
+    )
+
+    expected_frames = [
+        all_frames[frame_number]
+        for frame_number in frames_numbers
+        if frame_number < len(all_frames)
+    ]
+    assert len(frames) == len(expected_frames)
+    for frame, expected_frame in zip(frames, expected_frames):
+        np.testing.assert_array_equal(frame, expected_frame)
+
+
+def test_get_frame_at_indexes(video_path: str, tmp_path):
+    video_asset = VideoAsset(
+        asset_path=video_path, time_step=0.2, probes_directory=str(tmp_path)
+    )
+    frames = list(video_asset.content)
+
+    # the frames of a motion JPEG video are all keyframes
+    assert video_asset.keyframes == list(range(40))
+    np.testing.assert_array_equal(video_asset.get_frame_at_index(19), frames[19])
+    for frame, index in zip(video_asset.get_frame_at_indexes([3, 4, 18]), [3, 4, 18]):
+        np.testing.assert_array_equal(frame, frames[index])
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+@pytest.mark.parametrize("start_index,stop_index", [(0, None), (3, 8)])
+def test_get_frames_with_ffmpeg(
+    video_path: str, tmp_path, start_index: int, stop_index: Optional[int]
+):
+    video_asset = VideoAsset(
+        asset_path=video_path, time_step=0.3, probes_directory=str(tmp_path)
+    )
+
+    frames = list(
+        video_asset.get_frames(
+            start_index=start_index,
+            stop_index=stop_index,
+            width=16,
+            reader_backend=VideoReaderBackend.FFMPEG,
+        )
+    )
+
+    # the frames are identified by their uniform value
+    assert [round(frame.mean() / 6) for frame in frames] == list(
+        video_asset.sampled_frames_offsets[start_index:stop_index]
+    )
+    assert frames[0].shape == (12, 16, 3)
+
+
+def test_to_array(video_path: str, tmp_path):
+    video_asset = VideoAsset(
+        asset_path=video_path, time_step=0.3, probes_directory=str(tmp_path)
+    )
+    array_path = os.path.join(tmp_path, "frames.npy")
+
+    frames_array = video_asset.to_array(
+        width=16, grayscale=True, array_path=array_path, flush_bytes_number=1
+    )
+
+    assert frames_array.shape == (video_asset.asset_meta.sampled_frames_number, 12, 16)
+    np.testing.assert_array_equal(np.load(array_path), frames_array)
+    for frame, frame_array in zip(video_asset.get_frames(width=16), frames_array):
+        np.testing.assert_array_equal(
+            cv.cvtColor(frame, cv.COLOR_RGB2GRAY), frame_array
+        )
+
+    np.testing.assert_array_equal(
+        video_asset.as_array_content, np.stack(list(video_asset.content))
+    )
+
+
+def test_to_array_with_over_announced_frames(video_path: str, tmp_path):
+    # the cut container still announces its 40 frames
+    with open(video_path, "rb") as video_file:
+        content = video_file.read()
+    cut_video_path = os.path.join(tmp_path, "cut_video.avi")
+    with open(cut_video_path, "wb") as cut_video_file:
+        cut_video_file.write(content[: len(content) // 2])
+
+    video_asset = VideoAsset(
+        asset_path=cut_video_path, time_step=0.3, probes_directory=str(tmp_path)
+    )
+    array_path = os.path.join(tmp_path, "frames.npy")
+
+    frames_array = video_asset.to_array(grayscale=True, array_path=array_path)
+
+    assert 0 < len(frames_array) < video_asset.asset_meta.sampled_frames_number
+    # the kept file only holds the decoded frames
+    loaded_frames_array = np.load(array_path, mmap_mode="r")
+    np.testing.assert_array_equal(loaded_frames_array, frames_array)
+    assert os.path.getsize(array_path) == (
+        loaded_frames_array.offset + frames_array.nbytes
+    )
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_get_frames_with_ffmpeg_at_ntsc_frame_rate(tmp_path):
+    video_path = os.path.join(tmp_path, "video.avi")
+    video_writer = cv.VideoWriter(
+        video_path, cv.VideoWriter_fourcc(*"MJPG"), 30000 / 1001, (32, 24)
+    )
+    for frame_number in range(120):
+        video_writer.write(np.full((24, 32, 3), frame_number * 2, dtype=np.uint8))
+    video_writer.release()
+
+    video_asset = VideoAsset(
+        asset_path=video_path, time_step=0.3, probes_directory=str(tmp_path)
+    )
+    frames = list(video_asset.get_frames(reader_backend=VideoReaderBackend.FFMPEG))
+
+    # the frames read after a seek are the ones read sequentially
+    for start_index in (1, 7, len(frames) - 2):
+        seeked_frames = list(
+            video_asset.get_frames(
+                start_index=start_index, reader_backend=VideoReaderBackend.FFMPEG
+            )
+        )
+
+        assert len(seeked_frames) == len(frames) - start_index
+        for seeked_frame, frame in zip(seeked_frames, frames[start_index:]):
+            np.testing.assert_array_equal(seeked_frame, frame)
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from core.serialization.detections import (
+    DETECTIONS_DTYPE,
+    decode_detections,
+    decode_samples,
+    encode_detections,
+    encode_samples,
+    is_binary_message,
+)
+
+
+def test_samples_binary():
+    images = [b"\xff\xd8first", b"", b"\xff\xd8third"]
+    samples = [{"confidence_threshold": 0.5, "labels_to_predict": ["person"]}] * 3
+
+    content = encode_samples(images=images, samples=samples)
+
+    assert is_binary_message(content)
+    assert decode_samples(content) == (images, samples)
+
+    with pytest.raises(ValueError):
+        decode_samples(content[:-1])
+
+
+def test_detections_binary():
+    detections = [
+        np.array(
+            [(1, 2, 3, 4, 0.5, 0), (5, 6, 7, 8, 0.25, 16)], dtype=DETECTIONS_DTYPE
+        ),
+        np.empty(0, dtype=DETECTIONS_DTYPE),
+        np.array([(9, 10, 11, 12, 0.75, 0)], dtype=DETECTIONS_DTYPE),
+    ]
+    class_names = {0: "person", 16: "dog"}
+
+    decoded_detections, decoded_class_names = decode_detections(
+        encode_detections(detections, class_names)
+    )
+
+    assert decoded_class_names == class_names
+    assert len(decoded_detections) == len(detections)
+    for decoded_sample_detections, sample_detections in zip(
+        decoded_detections, detections
+    ):
+        np.testing.assert_array_equal(decoded_sample_detections, sample_detections)
+
+    assert decode_detections(encode_detections([], {})) == ([], {})
+    assert not is_binary_message(b'{"instances": []}')
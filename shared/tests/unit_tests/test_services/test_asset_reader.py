@@ -0,0 +1,70 @@
+import hashlib
+import os
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+from core.services.asset_reader import make_streamed_video_asset
+
+
+@pytest.fixture(name="video_path")
+def fixture_video_path(tmp_path) -> str:
+    video_path = os.path.join(tmp_path, "video.avi")
+    video_writer = cv.VideoWriter(
+        video_path, cv.VideoWriter_fourcc(*"MJPG"), 10, (32, 24)
+    )
+
+    for frame_number in range(20):
+        video_writer.write(np.full((24, 32, 3), frame_number * 10, dtype=np.uint8))
+    video_writer.release()
+
+    return video_path
+
+
+class FakeStorageClient:
+    def __init__(self, blob_path: str):
+        with open(blob_path, "rb") as blob_file:
+            self.content = blob_file.read()
+        self.downloaded_blobs = []
+
+    def iterate_blob_chunks(self, bucket_name: str, blob_name: str, chunk_size: int):
+        self.downloaded_blobs.append((bucket_name, blob_name))
+
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start : start + chunk_size]
+
+    def get_blob_hash(self, bucket_name: str, blob_name: str) -> str:
+        return hashlib.md5(self.content).hexdigest()
+
+
+def test_make_streamed_video_asset(video_path: str):
+    storage_client = FakeStorageClient(video_path)
+
+    video_asset = make_streamed_video_asset(
+        "gs://bucket/videos/video.avi",
+        storage_client=storage_client,
+        time_step=0.2,
+        chunk_size=1000,
+        header_bytes_number=1000,
+    )
+    local_asset_path = video_asset.asset_path
+
+    assert storage_client.downloaded_blobs == [("bucket", "videos/video.avi")]
+    assert video_asset.streamed_file.get_hash() == video_asset.get_hash()
+    assert video_asset.asset_meta.sampled_frames_number == 10
+    assert [round(frame.mean() / 10) for frame in video_asset.content] == list(
+        range(0, 20, 2)
+    )
+
+    # the downloaded video is deleted along with its asset
+    del video_asset
+    assert not os.path.exists(local_asset_path)
+
+
+def test_make_streamed_video_asset_with_incoherent_path(video_path: str):
+    with pytest.raises(ValueError):
+        make_streamed_video_asset(
+            "gs://bucket/videos/video.png",
+            storage_client=FakeStorageClient(video_path),
+        )
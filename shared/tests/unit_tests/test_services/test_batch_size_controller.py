@@ -0,0 +1,32 @@
+from core.services.batch_size_controller import BatchSizeController
+
+
+def test_batch_size_controller():
+    batch_size_controller = BatchSizeController(
+        initial_batch_size=8, max_batch_size=10, latency_target=1.0
+    )
+
+    for _ in range(4):
+        batch_size_controller.record_success(
+            batch_size=batch_size_controller.batch_size, latency=0.5
+        )
+
+    assert batch_size_controller.batch_size == 10
+
+    # the concurrent failures at the same size only decrease the batch size once
+    batch_size_controller.record_failure(batch_size=10)
+    batch_size_controller.record_failure(batch_size=10)
+    assert batch_size_controller.batch_size == 5
+
+    # the smaller requests do not increase the batch size, the slow ones decrease it
+    batch_size_controller.record_success(batch_size=2, latency=0.5)
+    assert batch_size_controller.batch_size == 5
+    batch_size_controller.record_success(batch_size=5, latency=2.0)
+    assert batch_size_controller.batch_size == 2
+
+    batch_size_controller.record_success(batch_size=2, latency=0.5)
+    operating_point = batch_size_controller.operating_point
+
+    assert operating_point.batch_size == 3
+    assert batch_size_controller.statistics[2].mean_latency == 0.5
+    assert batch_size_controller.statistics[10].failure_rate == 0.5
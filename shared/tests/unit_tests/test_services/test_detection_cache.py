@@ -0,0 +1,52 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from core.schemas.object_detection import PREDICTION_COLUMNS
+from core.services.detection_cache import DetectionCache
+
+
+def make_predictions(score: float) -> pd.DataFrame:
+    return pd.DataFrame(
+        [[0.0, 0.0, 1.0, 1.0, score, 0, "person"]], columns=PREDICTION_COLUMNS
+    )
+
+
+def test_detection_cache(tmp_path):
+    cache_directory = os.path.join(tmp_path, "detection_cache")
+    keys = [
+        DetectionCache.build_key(
+            binary_image=bytes([index]),
+            model_name="model",
+            sample_metadata={"confidence_threshold": 0.5},
+        )
+        for index in range(3)
+    ]
+    entry_bytes_number = make_predictions(0.0).memory_usage(deep=True).sum()
+    detection_cache = DetectionCache(
+        max_bytes_number=2 * entry_bytes_number, cache_directory=cache_directory
+    )
+
+    assert detection_cache.get(keys[0]) is None
+    for index, key in enumerate(keys):
+        detection_cache.put(key, make_predictions(index / 4))
+    detection_cache.add_misses_latency(latency=3.0, images_number=3)
+
+    # the first entry is evicted from the memory, not from the disk
+    assert keys[0] not in detection_cache._entries
+    assert detection_cache.get(keys[2]).score[0] == 0.5
+    assert detection_cache.get(keys[0]).score[0] == 0.0
+    assert detection_cache.memory_hits_number == 1
+    assert detection_cache.disk_hits_number == 1
+    assert detection_cache.hit_ratio == 2 / 3
+    assert detection_cache.saved_latency == 2.0
+
+    # the disk entries are shared with the other caches of the directory
+    other_detection_cache = DetectionCache(cache_directory=cache_directory)
+    np.testing.assert_array_equal(
+        other_detection_cache.get(keys[1]).iloc[:, :6].astype(float),
+        make_predictions(0.25).iloc[:, :6].astype(float),
+    )
+    assert other_detection_cache.get(keys[1]).class_name[0] == "person"
+    assert other_detection_cache.misses_number == 0
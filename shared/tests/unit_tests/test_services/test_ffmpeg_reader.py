@@ -0,0 +1,74 @@
+import os
+import shutil
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+from core.services.ffmpeg_reader import FfmpegFrameReader
+
+
+@pytest.fixture(name="video_path")
+def fixture_video_path(tmp_path) -> str:
+    video_path = os.path.join(tmp_path, "video.avi")
+    video_writer = cv.VideoWriter(
+        video_path, cv.VideoWriter_fourcc(*"MJPG"), 10, (32, 24)
+    )
+
+    for frame_number in range(20):
+        video_writer.write(np.full((24, 32, 3), frame_number * 10, dtype=np.uint8))
+    video_writer.release()
+
+    return video_path
+
+
+def iterate_file_chunks(file_path: str, chunk_size: int = 1000):
+    with open(file_path, "rb") as file:
+        while chunk := file.read(chunk_size):
+            yield chunk
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_read_input_chunks(video_path: str):
+    frame_reader = FfmpegFrameReader(
+        video_path, source_width=32, source_height=24, width=16
+    )
+
+    frames = [frame.copy() for frame in frame_reader.read()]
+    piped_frames = [
+        frame.copy()
+        for frame in frame_reader.read(input_chunks=iterate_file_chunks(video_path))
+    ]
+
+    assert len(frames) == 20
+    assert frames[0].shape == (12, 16, 3)
+    for piped_frame, frame in zip(piped_frames, frames):
+        np.testing.assert_array_equal(piped_frame, frame)
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_read_truncated_input_chunks(video_path: str):
+    def iterate_truncated_chunks():
+        chunks = iterate_file_chunks(video_path)
+        yield next(chunks)
+        yield next(chunks)
+        raise ConnectionError("The download failed")
+
+    frame_reader = FfmpegFrameReader(video_path, source_width=32, source_height=24)
+
+    # the frames decoded before the failure are yielded, then the failure is raised
+    with pytest.raises(ConnectionError):
+        for _ in frame_reader.read(input_chunks=iterate_truncated_chunks()):
+            pass
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+def test_read_truncated_input(video_path: str):
+    with open(video_path, "rb") as video_file:
+        content = video_file.read()
+
+    frame_reader = FfmpegFrameReader(video_path, source_width=32, source_height=24)
+
+    with pytest.raises(ValueError):
+        for _ in frame_reader.read(input_chunks=[content[: len(content) // 2]]):
+            pass
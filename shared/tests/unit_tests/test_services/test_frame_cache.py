@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+
+from core.services.frame_cache import FrameCache
+
+
+def make_frames(frames_number: int, value: int = 0) -> list:
+    return [
+        np.full((4, 6, 3), value + frame_index, dtype=np.uint8)
+        for frame_index in range(frames_number)
+    ]
+
+
+def test_frame_cache(tmp_path):
+    frame_cache = FrameCache(cache_directory=str(tmp_path), chunk_size=4)
+    frames = make_frames(10)
+
+    # partial reads are not cached
+    assert len(list(frame_cache.get_frames("key", iter(frames[2:5]), 2, 5))) == 3
+    assert list(frame_cache.get_frames("key", iter(frames))) == frames
+
+    cached_frames = list(frame_cache.get_frames("key", iter([])))
+    np.testing.assert_array_equal(cached_frames, frames)
+    np.testing.assert_array_equal(
+        list(frame_cache.get_frames("key", iter([]), 3, 9)), frames[3:9]
+    )
+    assert (frame_cache.hits_number, frame_cache.misses_number) == (2, 2)
+
+
+def test_frame_cache_eviction(tmp_path):
+    frame_cache = FrameCache(
+        cache_directory=str(tmp_path), max_bytes_number=5000, chunk_size=4
+    )
+
+    for key in ("first", "second"):
+        list(frame_cache.get_frames(key, iter(make_frames(20))))
+    # the least recently used entry is evicted when a third one is added
+    list(frame_cache.get_frames("first", iter([])))
+    list(frame_cache.get_frames("third", iter(make_frames(20))))
+
+    assert frame_cache.hits_number == 1
+    assert sorted(os.listdir(tmp_path)) == ["first", "third"]
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import threading
+
+import pytest
+
+from core.services.streamed_file import StreamedFile
+
+
+def test_streamed_file(tmp_path):
+    chunks = [bytes([chunk_index]) * 10 for chunk_index in range(5)]
+    released_chunks = threading.Semaphore(2)
+
+    def iterate_chunks():
+        for chunk in chunks:
+            released_chunks.acquire()
+            yield chunk
+
+    file_path = os.path.join(tmp_path, "video.mp4")
+    streamed_file = StreamedFile(iterate_chunks(), file_path=file_path)
+
+    # the file can be read before the end of the download
+    assert streamed_file.wait_for(20) == 20
+    assert streamed_file.is_complete is False
+
+    read_chunks = streamed_file.iterate_chunks(chunk_size=15)
+    assert next(read_chunks) == b"".join(chunks)[:15]
+
+    for _ in range(3):
+        released_chunks.release()
+
+    assert b"".join(read_chunks) == b"".join(chunks)[15:]
+    assert streamed_file.get_hash() == hashlib.md5(b"".join(chunks)).hexdigest()
+    assert streamed_file.is_complete is True
+
+
+def test_streamed_file_error(tmp_path):
+    def iterate_chunks():
+        yield b"content"
+        raise ConnectionError("download failed")
+
+    streamed_file = StreamedFile(
+        iterate_chunks(), file_path=os.path.join(tmp_path, "video.mp4")
+    )
+
+    with pytest.raises(ConnectionError):
+        b"".join(streamed_file.iterate_chunks())
+
+
+def test_streamed_file_close(tmp_path):
+    released_chunks = threading.Semaphore(1)
+    is_chunks_iterator_closed = threading.Event()
+
+    def iterate_chunks():
+        try:
+            for chunk_index in range(5):
+                released_chunks.acquire()
+                yield bytes([chunk_index]) * 10
+        finally:
+            is_chunks_iterator_closed.set()
+
+    streamed_file = StreamedFile(
+        iterate_chunks(), file_path=os.path.join(tmp_path, "video.mp4")
+    )
+    assert streamed_file.wait_for(10) == 10
+
+    streamed_file.close()
+    released_chunks.release()
+
+    # the download stops before writing the next chunk
+    with pytest.raises(ConnectionAbortedError):
+        streamed_file.wait_for()
+    assert is_chunks_iterator_closed.wait(timeout=5)
+    assert os.path.getsize(streamed_file.file_path) == 10
@@ -0,0 +1,126 @@
+import os
+import shutil
+import subprocess
+
+import cv2 as cv
+import numpy as np
+import pytest
+
+from core.services import video_probe
+from core.services.video_probe import VideoProbe, VideoProbeCache, probe_video_header
+
+
+@pytest.fixture(name="video_path")
+def fixture_video_path(tmp_path) -> str:
+    video_path = os.path.join(tmp_path, "video.avi")
+    video_writer = cv.VideoWriter(
+        video_path, cv.VideoWriter_fourcc(*"MJPG"), 10, (32, 24)
+    )
+
+    for frame_number in range(15):
+        video_writer.write(np.full((24, 32, 3), frame_number, dtype=np.uint8))
+    video_writer.release()
+
+    return video_path
+
+
+def test_probe_with_ffprobe(monkeypatch):
+    monkeypatch.setattr(
+        video_probe.ffmpeg,
+        "probe",
+        lambda *args, **kwargs: {
+            "streams": [
+                {
+                    "width": 1280,
+                    "height": 720,
+                    "avg_frame_rate": "30000/1001",
+                    "r_frame_rate": "30000/1001",
+                    "start_time": "1.5",
+                    "nb_read_packets": "300",
+                }
+            ]
+        },
+    )
+
+    assert video_probe.probe_video("video.mp4") == VideoProbe(
+        width=1280,
+        height=720,
+        initial_fps=30000 / 1001,
+        start_time=1.5,
+        frames_number=300,
+    )
+
+
+def test_video_probe_cache(video_path: str, tmp_path, monkeypatch):
+    def probe_without_ffprobe(*args, **kwargs):
+        raise FileNotFoundError("ffprobe")
+
+    # OpenCV is used when ffprobe is not installed
+    monkeypatch.setattr(video_probe.ffmpeg, "probe", probe_without_ffprobe)
+    video_probe_cache = VideoProbeCache(os.path.join(tmp_path, "probes"))
+
+    probe = video_probe_cache.get_or_probe(video_path, content_hash="hash")
+    assert (probe.width, probe.height, probe.initial_fps) == (32, 24, 10)
+    assert probe.exact_frames_number is None
+
+    probe = video_probe_cache.get_or_probe(video_path, content_hash="hash", exact=True)
+    assert probe.exact_frames_number == 15
+
+    # the cached probe is returned without reading the video
+    monkeypatch.setattr(video_probe, "probe_video", None)
+    monkeypatch.setattr(video_probe, "count_video_frames", None)
+    assert video_probe_cache.get("hash") == probe
+    assert (
+        video_probe_cache.get_or_probe(video_path, content_hash="hash", exact=True)
+        == probe
+    )
+
+
+def test_probe_video_header(monkeypatch):
+    stream = {
+        "width": 1280,
+        "height": 720,
+        "avg_frame_rate": "25/1",
+        "nb_frames": "250",
+    }
+    monkeypatch.setattr(
+        video_probe.ffmpeg, "probe", lambda *args, **kwargs: {"streams": [stream]}
+    )
+
+    assert probe_video_header("video.mp4") == VideoProbe(
+        width=1280, height=720, initial_fps=25, frames_number=250
+    )
+
+    # the frames are not indexed by the header
+    stream["nb_frames"] = "0"
+    assert probe_video_header("video.mp4") is None
+
+
+@pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+    reason="ffmpeg is not installed",
+)
+@pytest.mark.parametrize("is_faststart", [True, False])
+def test_probe_truncated_video_header(tmp_path, is_faststart: bool):
+    video_path = os.path.join(tmp_path, "video.mp4")
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-f", "lavfi"]
+        + ["-i", "testsrc2=size=64x48:rate=10:duration=3", "-c:v", "libx264"]
+        + (["-movflags", "faststart"] if is_faststart else [])
+        + [video_path],
+        check=True,
+    )
+    truncated_video_path = os.path.join(tmp_path, "truncated_video.mp4")
+    with open(video_path, "rb") as video_file, open(
+        truncated_video_path, "wb"
+    ) as truncated_video_file:
+        content = video_file.read()
+        truncated_video_file.write(content[: len(content) // 2])
+
+    probe = probe_video_header(truncated_video_path)
+
+    # the index of the frames only precedes them in a faststart video
+    if is_faststart:
+        assert (probe.width, probe.height, probe.frames_number) == (64, 48, 30)
+    else:
+        assert probe is None